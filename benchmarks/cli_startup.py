@@ -0,0 +1,70 @@
+"""
+
+Measure the startup time of each saxs-bluesky CLI subcommand
+
+Each subcommand is run with --help so that nothing talks to the beamline,
+which still exercises all of the imports click needs to build the command.
+
+    python benchmarks/cli_startup.py --repeats 10
+
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+SUBCOMMANDS = {
+    "version": ["--version"],
+    "gui": ["gui", "--help"],
+    "login": ["login", "--help"],
+    "scripts": ["scripts", "--help"],
+    "save_panda": ["save_panda", "--help"],
+    "snapshot": ["snapshot", "--help"],
+}
+
+
+def time_subcommand(args: list[str], repeats: int) -> list[float]:
+    timings = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "saxs_bluesky", *args],
+            check=True,
+            capture_output=True,
+        )
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="Exit non-zero if the median of any subcommand is slower than this",
+    )
+    opts = parser.parse_args()
+
+    failed = False
+
+    print(f"{'subcommand':<12} {'median (s)':>10} {'min (s)':>10}")
+    for name, args in SUBCOMMANDS.items():
+        timings = time_subcommand(args, opts.repeats)
+        median = statistics.median(timings)
+        print(f"{name:<12} {median:>10.3f} {min(timings):>10.3f}")
+
+        if (opts.max_seconds is not None) and (median > opts.max_seconds):
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+
+Tasks per second, and events per second delivered to callbacks, through
+BlueAPIPythonClient against the in-process FakeBlueAPIServer.
+
+With callback=True each run waits for its task and every event goes through
+the client's callbacks. With callback=False runs only create and start the
+task, so the next run usually finds the worker busy and is retried, the retry
+counts are printed alongside.
+
+    python benchmarks/client_throughput.py --tasks 100 --events 50
+
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from saxs_bluesky.testing.fake_blueapi import FakeBlueAPIServer
+from saxs_bluesky.utils.beamline_client import RETRYABLE_ERRORS
+from saxs_bluesky.utils.retry import RetryPolicy
+
+
+def run_tasks(server: FakeBlueAPIServer, n_tasks: int, callback: bool) -> dict:
+    retry_policy = RetryPolicy(
+        RETRYABLE_ERRORS, max_attempts=1000, base_delay=0.001, deadline=None
+    )
+    client = server.client(callback=callback, timeout=60, retry_policy=retry_policy)
+
+    n_events = 0
+
+    def count(event):
+        nonlocal n_events
+        n_events += 1
+
+    client.add_callback(count)
+
+    start = time.perf_counter()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        for _ in range(n_tasks):
+            client.run("count")
+    elapsed = time.perf_counter() - start
+
+    return {
+        "tasks/s": n_tasks / elapsed,
+        "events/s": n_events / elapsed,
+        "retries": client.retry_metrics["retries"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(f"{'callback':>9} {'tasks/s':>9} {'events/s':>10} {'retries':>8}")
+
+    for callback in (True, False):
+        with FakeBlueAPIServer(
+            events_per_task=args.events, latency=args.latency, seed=0
+        ) as server:
+            result = run_tasks(server, args.tasks, callback)
+
+        print(
+            f"{callback!s:>9} {result['tasks/s']:>9.1f} "
+            f"{result['events/s']:>10.1f} {result['retries']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
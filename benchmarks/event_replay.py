@@ -0,0 +1,67 @@
+"""
+
+Replay an event log through BlueAPIPythonClient's task callbacks as fast as
+possible, with and without the BestEffortCallback live plot, and report how
+long the callbacks took.
+
+Pass a log recorded on the beamline (client.record_directory) to profile a
+real run, otherwise one is recorded from the in-process FakeBlueAPIServer.
+
+    python benchmarks/event_replay.py [--log count_....jsonl.gz] [--events 200]
+
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from saxs_bluesky.testing.fake_blueapi import FakeBlueAPIServer
+
+
+def record_log(directory: Path, n_events: int) -> tuple[Path, FakeBlueAPIServer]:
+    server = FakeBlueAPIServer(events_per_task=n_events, seed=0).start()
+    client = server.client(
+        callback=True, timeout=60, best_effort=False, record_directory=directory
+    )
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        client.run("count")
+
+    (path,) = directory.glob("count_*.jsonl.gz")
+    return path, server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--log", type=Path, default=None)
+    parser.add_argument("--events", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path, server = record_log(Path(directory), args.events)
+        log = args.log or path
+
+        print(f"{'best effort':>12} {'events':>7} {'time (s)':>9} {'events/s':>9}")
+
+        for best_effort in (False, True):
+            client = server.client(best_effort=best_effort)
+
+            output = io.StringIO()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                count = client.replay(log, speed=None)
+            elapsed = time.perf_counter() - start
+
+            print(
+                f"{best_effort!s:>12} {count:>7} {elapsed:>9.3f} "
+                f"{count / elapsed:>9.1f}"
+            )
+
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
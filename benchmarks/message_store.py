@@ -0,0 +1,66 @@
+"""
+
+Time adding messages to the log panel's MessageStore and filtering them, for
+stores of increasing size. Filters on an index only look at the entries in
+it, a text search builds each entry's text once and refining it only checks
+the previous matches. Each store is made large enough to keep every message,
+rather than capped at DEFAULT_MAX_ENTRIES, so the sizes reported are real.
+
+    python benchmarks/message_store.py
+
+"""
+
+import time
+
+from saxs_bluesky.logging.message_store import LogFilter, MessageStore
+
+
+def message(n: int) -> dict:
+    task_id = f"task-{n // 1000}"
+    if n % 1000 == 999:
+        return {
+            "state": "IDLE",
+            "task_status": {"task_id": task_id, "task_failed": n % 7 == 0},
+            "errors": ["plan failed"] if n % 7 == 0 else [],
+        }
+    return {
+        "name": "event",
+        "task_id": task_id,
+        "doc": {"seq_num": n % 1000, "data": {"saxs": float(n), "base-x": 1.0}},
+    }
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    print(
+        f"{'messages':>9} {'kept':>8} {'add (s)':>8} {'task (s)':>9} "
+        f"{'errors (s)':>11} {'search (s)':>11} {'refine (s)':>11}"
+    )
+
+    for n_messages in (10_000, 100_000, 500_000):
+        messages = [message(n) for n in range(n_messages)]
+        store = MessageStore(max_entries=n_messages)
+
+        add_time, _ = timed(lambda: [store.add(m) for m in messages])  # noqa: B023
+        task_time, _ = timed(lambda: store.query(LogFilter(task_id="task-5")))  # noqa: B023
+        error_time, _ = timed(lambda: store.query(LogFilter(level="error")))  # noqa: B023
+        search_time, matches = timed(
+            lambda: store.query(LogFilter(text="seq_num: 12"))  # noqa: B023
+        )
+        refine_time, _ = timed(
+            lambda: store.query(LogFilter(text="seq_num: 123"), within=matches)  # noqa: B023
+        )
+
+        print(
+            f"{n_messages:>9} {len(store):>8} {add_time:>8.3f} {task_time:>9.4f} "
+            f"{error_time:>11.4f} {search_time:>11.3f} {refine_time:>11.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
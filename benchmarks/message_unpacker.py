@@ -0,0 +1,97 @@
+"""
+
+Compare the old MessageUnpacker, which appended every line to one class-level
+deque and returned all of it, with the per-message generator, on blueapi
+event messages with deeply nested documents.
+
+The old version's output, and the time to log it, grew with every message
+received. The new one only ever returns the lines of the current message.
+
+    python benchmarks/message_unpacker.py
+
+"""
+
+import time
+from collections import deque
+
+from saxs_bluesky.logging.bluesky_messenger import MessageUnpacker
+
+
+class OldMessageUnpacker:
+    messages = deque()
+
+    @staticmethod
+    def unpack_dict(unpacked: dict):
+        for key, value in unpacked.items():
+            if isinstance(value, dict):
+                OldMessageUnpacker.unpack_dict(value)
+            else:
+                OldMessageUnpacker.messages.append(f"{key}: {value}")
+
+        return OldMessageUnpacker.messages
+
+
+def nested_config(depth: int, width: int) -> dict:
+    config: dict = {f"value{n}": n * 0.5 for n in range(width)}
+    for level in range(depth):
+        config = {f"level{level}": config, "units": "mm", "precision": 3}
+    return config
+
+
+def event_message(seq_num: int, depth: int, n_points: int) -> dict:
+    """A blueapi DataEvent of an event document, as received over STOMP"""
+    return {
+        "name": "event",
+        "task_id": "a1b2c3",
+        "doc": {
+            "uid": f"uid-{seq_num}",
+            "seq_num": seq_num,
+            "time": time.time(),
+            "data": {
+                "saxs-stats-total": float(seq_num),
+                "saxs-profile": list(range(n_points)),
+                "base-x": 1.0,
+            },
+            "timestamps": {"saxs-stats-total": time.time(), "base-x": time.time()},
+            "configuration": nested_config(depth, width=10),
+        },
+    }
+
+
+def main():
+    print(
+        f"{'depth':>6} {'points':>7} {'messages':>9} "
+        f"{'old (s)':>8} {'old lines':>10} {'new (s)':>8} {'new lines':>10}"
+    )
+
+    for depth, n_points, n_messages in (
+        (2, 10, 1000),
+        (8, 10, 1000),
+        (32, 10, 1000),
+        (8, 10_000, 200),
+    ):
+        messages = [event_message(n, depth, n_points) for n in range(n_messages)]
+        OldMessageUnpacker.messages.clear()
+
+        # the log panel logs every line returned for each message
+        start = time.perf_counter()
+        old_lines = 0
+        for message in messages:
+            old_lines += sum(1 for _ in OldMessageUnpacker.unpack_dict(message))
+        old_time = time.perf_counter() - start
+
+        unpacker = MessageUnpacker()
+        start = time.perf_counter()
+        new_lines = 0
+        for message in messages:
+            new_lines += sum(1 for _ in unpacker.lines(message))
+        new_time = time.perf_counter() - start
+
+        print(
+            f"{depth:>6} {n_points:>7} {n_messages:>9} "
+            f"{old_time:>8.3f} {old_lines:>10} {new_time:>8.3f} {new_lines:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
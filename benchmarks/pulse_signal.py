@@ -0,0 +1,97 @@
+"""
+
+Compare the frame by frame pulse signal generation with the vectorised
+ProfilePlotter.generate_pulse_signals, for increasing frames and groups.
+
+The loop scales with the total number of frames. The vectorised version only
+loops over groups in python, the per-frame work is np.repeat and np.cumsum.
+
+    python benchmarks/pulse_signal.py
+
+"""
+
+import time
+
+from saxs_bluesky.utils.plotter import ProfilePlotter
+from saxs_bluesky.utils.profile_groups import Group, Profile
+
+PULSES = [0, 1, 2, 3]
+
+
+def make_profile(n_groups: int, frames_per_group: int) -> Profile:
+    groups = [
+        Group(
+            frames=frames_per_group,
+            trigger="IMMEDIATE",
+            wait_time=10,
+            wait_units="MS",
+            run_time=100,
+            run_units="MS",
+            wait_pulses=[n % 2, 0, 0, 0],
+            run_pulses=[1, 1, 1, 1],
+        )
+        for n in range(n_groups)
+    ]
+    return Profile(groups=groups)
+
+
+def loop_pulse_signal(profile: Profile, pulse: int):
+    current_time = 0.0
+    trigger_time = [current_time]
+    signal = [0]
+
+    for group in profile.groups:
+        for _frame in range(group.frames):
+            current_time += group.wait_time_s
+            trigger_time.append(current_time)
+            signal.append(group.wait_pulses[pulse])
+
+            current_time += group.run_time_s
+            trigger_time.append(current_time)
+            signal.append(group.run_pulses[pulse])
+
+    trigger_time.append(current_time + (current_time) / 10)
+    signal.append(0)
+
+    return trigger_time, signal
+
+
+def best_of(func, repeats: int = 3) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    print(f"{'groups':>7} {'frames':>9} {'loop (s)':>10} {'vector (s)':>11}")
+
+    for n_groups, frames_per_group in (
+        (10, 10),
+        (10, 1_000),
+        (10, 10_000),
+        (100, 1_000),
+        (1_000, 100),
+        (4_096, 25),
+    ):
+        profile = make_profile(n_groups, frames_per_group)
+
+        loop_time = best_of(
+            lambda profile=profile: [loop_pulse_signal(profile, p) for p in PULSES]
+        )
+        vector_time = best_of(
+            lambda profile=profile: ProfilePlotter.generate_pulse_signals(
+                profile, PULSES
+            )
+        )
+
+        print(
+            f"{n_groups:>7} {profile.total_frames:>9} "
+            f"{loop_time:>10.4f} {vector_time:>11.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
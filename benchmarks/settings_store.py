@@ -0,0 +1,78 @@
+"""
+
+Time resolving and diffing PandA modes from a base + overlay SettingsStore,
+against parsing the full yamls that YamlSettingsProvider would read
+
+    python benchmarks/settings_store.py --repeats 100
+
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from itertools import combinations
+
+import yaml
+
+import saxs_bluesky
+from saxs_bluesky.utils.settings_store import SettingsStore
+
+PANDA_YAML_DIR = os.path.join(
+    os.path.dirname(saxs_bluesky.__file__), "ophyd_panda_yamls"
+)
+
+MODES = [
+    "i22_panda1",
+    "i22_PandaTrigger_panda1",
+    "i22_TFG_Trigger_panda1",
+    "i22_USAXS_panda1",
+]
+
+
+def time_per_call(func, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=50)
+    opts = parser.parse_args()
+
+    yaml_files = {mode: os.path.join(PANDA_YAML_DIR, f"{mode}.yaml") for mode in MODES}
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = SettingsStore.from_yaml_files(store_dir, yaml_files)
+
+        for mode in MODES:
+            overlay = store.modes[mode]
+            print(f"{mode:<26} overlay keys: {len(overlay['changed']):>4}")
+
+        def parse_yaml():
+            with open(yaml_files["i22_TFG_Trigger_panda1"]) as file:
+                yaml.safe_load(file)
+
+        def resolve():
+            store.resolve("i22_TFG_Trigger_panda1")
+
+        def diff_all():
+            for mode_a, mode_b in combinations(MODES, 2):
+                store.diff(mode_a, mode_b)
+
+        n_pairs = len(list(combinations(MODES, 2)))
+
+        print(
+            f"yaml parse:        {time_per_call(parse_yaml, opts.repeats) * 1e3:.3f} ms"
+        )
+        print(f"store resolve:     {time_per_call(resolve, opts.repeats) * 1e3:.3f} ms")
+        print(
+            f"store diff (pair): "
+            f"{time_per_call(diff_all, opts.repeats) / n_pairs * 1e3:.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+
+Messages per second from the in-process FakeStompBroker through
+StompMessenger's listener queue, and how long the messenger takes to
+reconnect and resubscribe after the broker drops its connections, restarts or
+stops answering (detected by heart beats).
+
+    python benchmarks/stomp_messenger.py --messages 20000 --heartbeat 200
+
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+
+from saxs_bluesky.logging.bluesky_messenger import CONNECT_ERRORS, StompMessenger
+from saxs_bluesky.logging.message_queue import TopicPolicy
+from saxs_bluesky.testing.fake_stomp import FakeStompBroker
+from saxs_bluesky.utils.retry import RetryPolicy
+
+TOPIC = "/topic/public.worker.event"
+
+
+def wait_until(condition, timeout: float = 30.0) -> bool:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.001)
+    return False
+
+
+def throughput(broker: FakeStompBroker, messenger: StompMessenger, n: int) -> float:
+    body = json.dumps({"name": "event", "doc": {"seq_num": 1, "data": {"saxs": 1.0}}})
+    received = messenger.metrics["received"]
+
+    start = time.perf_counter()
+    for _ in range(n):
+        broker.publish(TOPIC, body)
+    wait_until(lambda: messenger.metrics["received"] - received >= n)
+    return n / (time.perf_counter() - start)
+
+
+def recovery(broker: FakeStompBroker, messenger: StompMessenger, failure) -> float:
+    reconnects = messenger.reconnects
+    start = time.perf_counter()
+    failure()
+    wait_until(lambda: messenger.reconnects > reconnects)
+    wait_until(lambda: broker.subscribers(TOPIC) > 0)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--heartbeat", type=int, default=200, help="milliseconds")
+    args = parser.parse_args()
+
+    heartbeats = (args.heartbeat, args.heartbeat)
+
+    output = io.StringIO()
+    with FakeStompBroker(heartbeats=heartbeats) as broker:
+        with contextlib.redirect_stdout(output):
+            messenger = StompMessenger(
+                host=broker.host,
+                port=broker.port,
+                destination=[TOPIC],
+                heartbeats=heartbeats,
+                connect_timeout=1.0,
+                topic_policies={TOPIC: TopicPolicy(maxlen=args.messages)},
+                reconnect_policy=RetryPolicy(
+                    max_attempts=1000,
+                    base_delay=0.05,
+                    max_delay=1.0,
+                    deadline=None,
+                    retry_on=CONNECT_ERRORS,
+                ),
+            )
+        broker.wait_for_subscribers(TOPIC)
+
+        rate = throughput(broker, messenger, args.messages)
+        print(f"throughput: {rate:,.0f} messages/s")
+
+        def hang():
+            broker.freeze()
+            wait_until(lambda: not messenger.connected.is_set())
+            broker.freeze(False)
+
+        with contextlib.redirect_stdout(output):
+            dropped = recovery(broker, messenger, broker.drop_connections)
+            restarted = recovery(broker, messenger, lambda: broker.restart(0.5))
+            hung = recovery(broker, messenger, hang)
+
+        print(f"reconnected after dropped connections in {dropped:.3f} s")
+        print(f"reconnected after a 0.5 s broker restart in {restarted:.3f} s")
+        print(f"reconnected after a hung broker in {hung:.3f} s")
+
+        rate = throughput(broker, messenger, args.messages)
+        print(f"throughput after reconnecting: {rate:,.0f} messages/s")
+
+        with contextlib.redirect_stdout(output):
+            messenger.disconnect()
+
+
+if __name__ == "__main__":
+    main()
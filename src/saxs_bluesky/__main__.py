@@ -1,15 +1,13 @@
-"""Interface for ``python -m saxs_bluesky``."""
+"""Interface for ``python -m saxs_bluesky``.
+
+Subcommands import what they need when they are invoked, so that
+``--version``, ``login`` and ``save_panda`` do not pay for tkinter, matplotlib,
+the plans and the beamline config that only the GUI needs.
+"""
 
 import click
 
 from saxs_bluesky._version import __version__
-from saxs_bluesky.gui.panda_gui import PandAGUI
-from saxs_bluesky.utils.utils import (
-    authenticate,
-    load_beamline_config,
-    open_scripting,
-    save_panda_cli,
-)
 
 __all__ = ["main"]
 
@@ -24,24 +22,48 @@ def main(ctx: click.Context) -> None:
 
 @main.command(name="gui")
 def gui():
+    from saxs_bluesky.gui.panda_gui import PandAGUI
+    from saxs_bluesky.utils.utils import load_beamline_config
+
     config = load_beamline_config()
     PandAGUI(configuration=config.DEFAULT_EXPERIMENT)
 
 
 @main.command(name="login")
 def login():
+    from saxs_bluesky.utils.utils import authenticate
+
     authenticate()
 
 
 @main.command(name="scripts")
 def scripts():
+    from saxs_bluesky.utils.utils import open_scripting
+
     open_scripting()
 
 
 @main.command(name="save_panda")
 def save_panda():
+    from saxs_bluesky.utils.utils import save_panda_cli
+
     save_panda_cli()
 
 
+@main.command(name="snapshot")
+@click.option(
+    "-d",
+    "--detector",
+    "detectors",
+    multiple=True,
+    help="Detector to snapshot alongside the PandAs, can be given more than once",
+)
+@click.option("--directory", default=None, help="Directory to store snapshots in")
+def snapshot(detectors: tuple[str, ...], directory: str | None):
+    from saxs_bluesky.utils.utils import snapshot_cli
+
+    snapshot_cli(detectors=list(detectors), snapshot_dir=directory)
+
+
 if __name__ == "__main__":
     main()
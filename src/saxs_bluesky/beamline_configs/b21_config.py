@@ -87,6 +87,10 @@ DEFAULT_SEQ = 2
 
 SETTINGS_NAME = "PandaTriggerWithCounterAndPCAP"
 
+# send processing messages for the files written by run_panda_triggering
+NOTIFY_PROCESSING = False
+PROCESSING_UPDATE_INTERVAL = 1.0  # least seconds between updates for a file
+
 
 """
 
@@ -86,6 +86,10 @@ PULSE_CONNECTIONS = {
 DEFAULT_SEQ = 1
 SETTINGS_NAME = "PandaTrigge"
 
+# send processing messages for the files written by run_panda_triggering
+NOTIFY_PROCESSING = False
+PROCESSING_UPDATE_INTERVAL = 1.0  # least seconds between updates for a file
+
 
 """
 
@@ -76,6 +76,10 @@ PULSE_CONNECTIONS = {
 DEFAULT_SEQ = 1  # default sequencer is this one, pandas can have 2
 SETTINGS_NAME = "PandaTrigger"
 
+# send processing messages for the files written by run_panda_triggering
+NOTIFY_PROCESSING = False
+PROCESSING_UPDATE_INTERVAL = 1.0  # least seconds between updates for a file
+
 
 """
 # DEFAULT PROFILES
@@ -638,19 +638,13 @@ class ProfileTab(ttk.Frame):
     def commit_and_plot(self):
         self.edit_config_for_profile()
 
-        if not hasattr(self, "plotter"):
-            self.plotter = ProfilePlotter(self.profile, CONFIG.PULSE_BLOCK_NAMES)
-            self.plotter.plot_pulses()
-            self.plotter.show(block=False)
-        elif hasattr(self, "plotter") and not self.plotter.open:
-            del self.plotter
+        if hasattr(self, "plotter") and self.plotter.open:
+            # update the open figure in place rather than rebuilding it
+            self.plotter.update_profile(self.profile)
+        else:
             self.plotter = ProfilePlotter(self.profile, CONFIG.PULSE_BLOCK_NAMES)
-            self.plotter.profile = self.profile
             self.plotter.plot_pulses()
             self.plotter.show(block=False)
-        elif hasattr(self, "plotter") and self.plotter.open:
-            self.plotter.profile = self.profile
-            self.plotter.plot_pulses()
 
     # Fucntion that will be called when entry is changed
     def entry_changed(self, *args):
@@ -1,8 +1,20 @@
-import time
+import bisect
 from datetime import datetime
-from tkinter import Text, Tk, ttk
+from tkinter import StringVar, Text, Tk, ttk
 
 from saxs_bluesky.logging.bluesky_messenger import MessageUnpacker, StompMessenger
+from saxs_bluesky.logging.message_store import (
+    DEFAULT_MAX_ENTRIES,
+    LEVELS,
+    LogEntry,
+    LogFilter,
+    MessageStore,
+)
+
+DEFAULT_MAX_LINES = 10_000
+DEFAULT_BATCH_SIZE = 500
+
+MESSAGE_END = "--------MESSAGE END----------"
 
 
 class BlueskyLogPanel:
@@ -12,14 +24,37 @@ class BlueskyLogPanel:
         update_interval=0.025,
         rabbitmq_messenger: StompMessenger | None = None,
         window: Tk | None = None,
+        max_lines: int = DEFAULT_MAX_LINES,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
         **kwargs,
     ):
-        """A simple log panel to display bluesky messages from RabbitMQ."""
+        """
+        A simple log panel to display bluesky messages from RabbitMQ.
+
+        Messages queued by the STOMP listener are taken every update_interval
+        seconds from the Tk event loop, up to batch_size at a time, and their
+        lines inserted together. Only the last max_lines lines are kept.
+
+        Every message is also kept in a MessageStore, so the panel can be
+        filtered by task, kind of message, level and text, redrawing only the
+        entries that match. The store keeps the last max_entries messages.
+        """
 
         self.update_interval = update_interval  # seconds
+        self.max_lines = max_lines
+        self.batch_size = batch_size
         self.run = True
         self.last_message = ""
         self.color = "red"
+        self.unpacker = MessageUnpacker()
+        self.line_count = 0
+        self._after_id: str | None = None
+
+        self.store = MessageStore(max_entries=max_entries, unpacker=self.unpacker)
+        self.log_filter = LogFilter()
+        # the entries matching log_filter, None when nothing is filtered out
+        self.matches: list[LogEntry] | None = None
 
         ################# GUI SETUP #################
 
@@ -35,6 +70,8 @@ class BlueskyLogPanel:
         elif len(kwargs) > 0:
             self.messenger = StompMessenger(**kwargs)
 
+        self.build_filter_bar()
+
         self.logs = Text(self.window, state="disabled", font=("Helvetica", 10))
         self.logs.pack(fill="both", expand=True, side="left", anchor="w")
 
@@ -52,52 +89,220 @@ class BlueskyLogPanel:
         self.logs.bind("<Key>", lambda e: self.ctrl_event(e))
 
         if start:
-            self.run_loop()
+            self.start()
+
+    def build_filter_bar(self):
+        self.filter_frame = ttk.Frame(self.window)
+        self.filter_frame.pack(fill="x", side="top")
+
+        self.search_var = StringVar(self.window)
+        self.task_var = StringVar(self.window)
+        self.kind_var = StringVar(self.window)
+        self.level_var = StringVar(self.window)
+
+        ttk.Label(self.filter_frame, text="Search").pack(side="left", padx=5)
+        ttk.Entry(self.filter_frame, textvariable=self.search_var, width=40).pack(
+            side="left", padx=5
+        )
+
+        for label, var, values in (
+            ("Task", self.task_var, lambda: ["", *self.store.values("task_id")]),
+            ("Kind", self.kind_var, lambda: ["", *self.store.values("kind")]),
+            ("Level", self.level_var, lambda: ["", *LEVELS]),
+        ):
+            ttk.Label(self.filter_frame, text=label).pack(side="left", padx=5)
+            combobox = ttk.Combobox(self.filter_frame, textvariable=var, width=20)
+            # the choices are filled in from the store as the list is opened
+            combobox.configure(
+                postcommand=lambda c=combobox, v=values: c.configure(values=v())
+            )
+            combobox.pack(side="left", padx=5)
+
+        for var in (self.search_var, self.task_var, self.kind_var, self.level_var):
+            var.trace_add("write", lambda *args: self.on_filter_changed())
+
+    def on_filter_changed(self):
+        self.set_filter(
+            LogFilter(
+                task_id=self.task_var.get() or None,
+                kind=self.kind_var.get() or None,
+                level=self.level_var.get() or None,
+                text=self.search_var.get(),
+            )
+        )
+
+    def set_filter(self, log_filter: LogFilter):
+        """Show only the entries matching log_filter"""
+        if log_filter == LogFilter():
+            matches = None
+        elif (self.matches is not None) and log_filter.refines(self.log_filter):
+            # eg. another character typed in the search, only the entries
+            # already shown need checking
+            matches = self.store.query(log_filter, within=self.matches)
+        else:
+            matches = self.store.query(log_filter)
+
+        self.log_filter = log_filter
+        self.matches = matches
+        self.render(self.store.entries if matches is None else matches)
+
+    def render(self, entries: list[LogEntry]):
+        """Redraw the log with the newest of the entries that fit in max_lines"""
+        chunks: list[tuple[str, str]] = []
+        n_lines = 0
+
+        for entry in reversed(entries):
+            entry_chunks = self.entry_chunks(entry)
+            n_lines += sum(text.count("\n") for text, _ in entry_chunks)
+            if n_lines > self.max_lines:
+                break
+            chunks[:0] = entry_chunks
+
+        self.logs.config(state="normal")
+        self.logs.delete("1.0", "end")
+        self.logs.config(state="disabled")
+        self.line_count = 0
+
+        self.insert_chunks(chunks)
+
+    def entry_chunks(self, entry: LogEntry) -> list[tuple[str, str]]:
+        """The text of an entry, and the tag it is shown with"""
+        timestamp = datetime.fromtimestamp(entry.time).strftime("%Y-%m-%d %H:%M:%S")
+        tag = "log" if entry.level == "info" else entry.level
+
+        text = "".join(
+            f"[{timestamp}] {line}\n" for line in self.unpacker.lines(entry.message)
+        )
+        return [(text, tag), (f"{MESSAGE_END}\n", "log")]
+
+    def start(self):
+        """Poll for messages from the Tk event loop, which must be running"""
+        self.run = True
+        self.schedule()
+
+    def schedule(self):
+        self._after_id = self.window.after(
+            int(self.update_interval * 1000), self.on_tick
+        )
+
+    def stop(self):
+        self.run = False
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+            self._after_id = None
+
+    def on_tick(self):
+        self._after_id = None
+        if not self.run:
+            return
+
+        self.process_messages()
+        self.schedule()
 
     def run_loop(self, maxiter=None):
-        self.window.update_idletasks()
-        self.window.update()
-        self.run_listener(maxiter=maxiter)
+        """
+        Start polling from the Tk event loop, or with maxiter, process that
+        many batches of messages straight away.
+        """
+        if maxiter is None:
+            self.start()
+            return
+
+        for _ in range(maxiter):
+            if not self.run:
+                break
+            self.process_messages()
+            self.window.update_idletasks()
+            self.window.update()
+
+    @staticmethod
+    def timestamp() -> str:
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     def log_message(self, message: str, timestamp: bool = True):
         if timestamp:
-            timenow = datetime.now()
-            timestamp = timenow.strftime("%Y-%m-%d %H:%M:%S")  # type: ignore
-            log_entry = f"[{timestamp}] {message}\n"
+            self.insert_lines([f"[{self.timestamp()}] {message}\n"])
         else:
-            log_entry = f"{message}\n"
+            self.insert_lines([f"{message}\n"])
+
+    def insert_lines(self, lines: list[str]):
+        """Insert lines in one go, dropping the oldest beyond max_lines"""
+        if lines:
+            self.insert_chunks([("".join(lines), "log")])
+
+    def insert_chunks(self, chunks: list[tuple[str, str]]):
+        """Insert tagged text in one go, dropping the oldest beyond max_lines"""
+        if not chunks:
+            return
+
+        # neighbouring chunks with the same tag are joined, then all of them
+        # inserted with a single call, as text, tag, text, tag...
+        merged: list[list[str]] = []
+        for text, tag in chunks:
+            if merged and merged[-1][1] == tag:
+                merged[-1][0] += text
+            else:
+                merged.append([text, tag])
 
         self.logs.config(state="normal")
-        self.logs.insert("end", log_entry, "log")
+        self.logs.insert("end", *(item for chunk in merged for item in chunk))
+
+        self.line_count += sum(text.count("\n") for text, _ in merged)
+        excess = self.line_count - self.max_lines
+        if excess > 0:
+            self.logs.delete("1.0", f"{excess + 1}.0")
+            self.line_count -= excess
+
         self.logs.config(state="disabled")  # stops user editing
+        self.logs.see("end")
 
-    def run_listener(self, maxiter=None):
-        iter = 0
-        while (self.run) and (iter < maxiter if maxiter is not None else True):
-            if not self.messenger.scan_listener.messages:
-                pass
-            else:
-                recieved_message = self.messenger.get_message()
+    def process_messages(self) -> int:
+        """Log a batch of the messages received, returns how many were taken"""
+        messages = self.messenger.get_received(self.batch_size)
+        if not messages:
+            return 0
 
-                if recieved_message != self.last_message:
-                    self.last_message = recieved_message
+        chunks: list[tuple[str, str]] = []
 
-                    messages = MessageUnpacker.unpack_dict(recieved_message)
+        for message in messages:
+            recieved_message = message.body
 
-                    for message in messages:
-                        self.log_message(message)
-                        self.logs.see("end")
+            if recieved_message != self.last_message:
+                self.last_message = recieved_message
 
-                self.log_message("--------MESSAGE END----------", timestamp=False)
+                entry = self.store.add(
+                    recieved_message, topic=message.topic, received=message.received
+                )
 
-            time.sleep(self.update_interval)
-            self.window.update_idletasks()
-            self.window.update()
-            if maxiter is not None:
-                iter += 1
+                if self.matches is None:
+                    chunks.extend(self.entry_chunks(entry))
+                elif self.log_filter.matches(entry, self.unpacker):
+                    self.matches.append(entry)
+                    chunks.extend(self.entry_chunks(entry))
+
+            elif self.matches is None:
+                chunks.append((f"{MESSAGE_END}\n", "log"))
+
+        self.trim_matches()
+        self.insert_chunks(chunks)
+
+        return len(messages)
+
+    def trim_matches(self):
+        """Drop the matches the store has evicted, the oldest are first"""
+        if not self.matches:
+            return
+
+        first_id = self.store.entries[0].id if self.store.entries else None
+
+        if first_id is None:
+            self.matches.clear()
+        elif self.matches[0].id < first_id:
+            kept = bisect.bisect_left(self.matches, first_id, key=lambda e: e.id)
+            del self.matches[:kept]
 
     def on_destroy(self, event):
-        self.run = False
+        self.stop()
         print("Shutting down messenger...")
         self.messenger.disconnect()
 
@@ -1,35 +1,249 @@
 import json
-from collections import deque
+import reprlib
+import threading
+from collections.abc import Iterator
 from pathlib import Path
-from time import sleep
+from time import monotonic, sleep
+from typing import Any
 
 import stomp
+from stomp.exception import ConnectFailedException, NotConnectedException
+
+from saxs_bluesky.logging.message_journal import MessageJournal
+from saxs_bluesky.logging.message_queue import (
+    DEFAULT_POLICIES,
+    DEFAULT_TOPIC,
+    DecodeError,
+    ListenerMetrics,
+    ReceivedMessage,
+    TopicPolicy,
+    TopicQueue,
+)
+from saxs_bluesky.logging.processing_notifier import (
+    DEFAULT_UPDATE_INTERVAL,
+    ProcessingNotifier,
+)
+from saxs_bluesky.utils.retry import RetryPolicy
+
+DEFAULT_MAX_DEPTH = 8
+DEFAULT_MAX_VALUE_LENGTH = 200
+
+# milliseconds between heart beats sent, and wanted from the broker
+DEFAULT_HEARTBEATS = (10_000, 10_000)
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+CONNECT_ERRORS: tuple[type[Exception], ...] = (
+    ConnectFailedException,
+    NotConnectedException,
+    OSError,
+)
+
+
+def default_reconnect_policy() -> RetryPolicy:
+    """Keeps trying to reconnect, backing off to a try every 30 s"""
+    return RetryPolicy(
+        max_attempts=1000,
+        base_delay=0.5,
+        max_delay=30,
+        deadline=None,
+        retry_on=CONNECT_ERRORS,
+    )
 
 
 class MessageUnpacker:
-    messages = deque()
+    """
+    Flattens a nested message into "key: value" lines, one message at a time.
+    Dicts deeper than max_depth are shown whole rather than descended into,
+    and values are cut to max_value_length characters.
+    """
 
-    @staticmethod
-    def unpack_dict(unpacked: dict):
-        for key, value in unpacked.items():
-            if isinstance(value, dict):
-                MessageUnpacker.unpack_dict(value)
+    def __init__(
+        self,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        max_value_length: int = DEFAULT_MAX_VALUE_LENGTH,
+        key_paths: bool = False,
+    ):
+        """
+        Args:
+            max_depth (int): Most levels of nested dicts descended into.
+            max_value_length (int): Longest value shown, in characters.
+            key_paths (bool): Label lines with the full dotted path to each
+                value, eg. "doc.data.saxs", rather than just its key.
+        """
+        self.max_depth = max_depth
+        self.max_value_length = max_value_length
+        self.key_paths = key_paths
+
+        # containers are summarised without building their full str
+        self._repr = reprlib.Repr()
+        self._repr.maxstring = max_value_length
+        self._repr.maxother = max_value_length
+
+    def truncate(self, value: Any) -> str:
+        if isinstance(value, str):
+            text = value
+        elif isinstance(value, (list, tuple, set, dict)):
+            text = self._repr.repr(value)
+        else:
+            text = str(value)
+
+        if len(text) > self.max_value_length:
+            text = f"{text[: self.max_value_length]}... ({len(text)} chars)"
+
+        return text
+
+    def flatten(self, message: dict) -> Iterator[tuple[tuple[str, ...], str]]:
+        """The key path and truncated value of each leaf, in order"""
+
+        # a stack of the dicts being walked, rather than recursion, so each
+        # line is yielded straight to the caller
+        stack: list[tuple[Iterator, tuple[str, ...]]] = [(iter(message.items()), ())]
+
+        while stack:
+            items, prefix = stack[-1]
+
+            for key, value in items:
+                path = (*prefix, str(key))
+
+                if isinstance(value, dict) and len(stack) < self.max_depth:
+                    if value:
+                        stack.append((iter(value.items()), path))
+                        break
+                else:
+                    yield path, self.truncate(value)
             else:
-                MessageUnpacker.messages.append(f"{key}: {value}")
+                stack.pop()
+
+    def lines(self, message: dict) -> Iterator[str]:
+        for path, value in self.flatten(message):
+            key = ".".join(path) if self.key_paths else path[-1]
+            yield f"{key}: {value}"
 
-        return MessageUnpacker.messages
+    @staticmethod
+    def unpack_dict(unpacked: dict, **kwargs) -> list[str]:
+        """
+        The lines of one message, takes the same keyword arguments as
+        MessageUnpacker.
+        """
+        return list(MessageUnpacker(**kwargs).lines(unpacked))
 
 
 class ScanListener(stomp.ConnectionListener):
-    def __init__(self, maxlen=100):
-        self.messages = deque(maxlen=maxlen)
+    """
+    Queues the messages received on each topic, see TopicPolicy, and parses
+    them when they are taken off the queue rather than on the receiver thread.
+    """
+
+    def __init__(
+        self,
+        maxlen: int = 100,
+        policies: dict[str, TopicPolicy] | None = None,
+        journal: MessageJournal | None = None,
+    ):
+        """
+        Args:
+            maxlen (int): Queue size of topics without a policy.
+            policies (dict[str, TopicPolicy] | None): Policies by destination,
+                defaults to DEFAULT_POLICIES.
+            journal (MessageJournal | None): If given, every message received
+                is also written to it, including those later dropped.
+        """
+        self.journal = journal
+        self.default_policy = TopicPolicy(maxlen=maxlen)
+        self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        self.queues: dict[str, TopicQueue] = {}
+        self.metrics = ListenerMetrics()
+
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(queue) for queue in self.queues.values())
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
 
     def on_error(self, message):  # type: ignore
         print(f"received an error: {message}")
 
     def on_message(self, message):  # type: ignore
-        message_body: dict = json.loads(message.body)
-        self.messages.append(message_body)
+        headers = getattr(message, "headers", None) or {}
+        topic = headers.get("destination", DEFAULT_TOPIC)
+        self.put(ReceivedMessage(topic, message.body))
+
+    def put(self, message: ReceivedMessage):
+        """Queue a message, following its topic's policy"""
+        self.metrics.increment("received")
+
+        if self.journal is not None:
+            self.journal.append(message)
+
+        with self._lock:
+            message.seq = self._seq
+            self._seq += 1
+
+            queue = self.queues.get(message.topic)
+            if queue is None:
+                policy = self.policies.get(message.topic, self.default_policy)
+                queue = self.queues[message.topic] = TopicQueue(policy)
+
+            coalesced, dropped = queue.put(message)
+
+        if coalesced:
+            self.metrics.increment("coalesced", coalesced)
+        if dropped:
+            self.metrics.increment("dropped", dropped)
+
+    def put_body(self, body: dict, topic: str = DEFAULT_TOPIC):
+        """Queue a message that didn't come over STOMP, eg. in tests"""
+        self.put(ReceivedMessage.from_body(body, topic))
+
+    def get_received(self, max_messages: int | None = None) -> list[ReceivedMessage]:
+        """
+        Take up to max_messages of the messages queued on any topic, in the
+        order they were received, parsed.
+        """
+        taken = []
+        with self._lock:
+            while (max_messages is None) or (len(taken) < max_messages):
+                heads = [queue for queue in self.queues.values() if queue]
+                if not heads:
+                    break
+                oldest = min(heads, key=lambda queue: queue.peek().seq)  # type: ignore
+                taken.append(oldest.pop())
+
+        received = []
+        for message in taken:
+            try:
+                message.body  # noqa: B018
+            except DecodeError:
+                self.metrics.increment("invalid")
+                continue
+            self.metrics.increment("parsed")
+            received.append(message)
+
+        return received
+
+    def get_messages(self, max_messages: int | None = None) -> list:
+        """The bodies of up to max_messages queued messages, oldest first"""
+        return [message.body for message in self.get_received(max_messages)]
+
+
+class ConnectionWatcher(stomp.ConnectionListener):
+    """Tells a StompMessenger when its connection is made and lost"""
+
+    def __init__(self, messenger: "StompMessenger"):
+        self.messenger = messenger
+
+    def on_connected(self, frame):  # type: ignore
+        self.messenger.connected.set()
+
+    def on_heartbeat_timeout(self):
+        print("No heart beat from the STOMP server")
+
+    def on_disconnected(self):
+        self.messenger.connection_lost()
 
 
 class StompMessenger:
@@ -42,6 +256,12 @@ class StompMessenger:
         password: str | None = None,
         destination: Path | list[Path] | str | list[str] | None = None,
         auto_connect: bool = True,
+        topic_policies: dict[str, TopicPolicy] | None = None,
+        journal_directory: str | Path | None = None,
+        heartbeats: tuple[int, int] = DEFAULT_HEARTBEATS,
+        reconnect: bool = True,
+        reconnect_policy: RetryPolicy | None = None,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
         **kwargs,
     ):
         self.beamline = beamline
@@ -78,8 +298,18 @@ class StompMessenger:
             print("Host not specified, constructing from beamline name")
             self.host = f"{self.beamline}-rabbitmq-daq.diamond.ac.uk"
 
-        self.messages = deque()
-        self.scan_listener = ScanListener()
+        self.journal = MessageJournal(journal_directory) if journal_directory else None
+        self.scan_listener = ScanListener(policies=topic_policies, journal=self.journal)
+
+        self.heartbeats = heartbeats
+        self.reconnect = reconnect
+        self.reconnect_policy = reconnect_policy or default_reconnect_policy()
+        self.connect_timeout = connect_timeout
+        self.reconnects = 0
+        self.connected = threading.Event()
+
+        self._closing = False
+        self._reconnecting = threading.Lock()
 
         self.run = True
 
@@ -89,25 +319,46 @@ class StompMessenger:
             self.subscribe()
 
     def setup_connection(self):
+        # a single attempt per connect, reconnect_policy does the retrying
         self.conn = stomp.Connection(
-            host_and_ports=[(self.host, self.port)], auto_content_length=False
+            host_and_ports=[(self.host, self.port)],
+            heartbeats=self.heartbeats,
+            reconnect_attempts_max=1,
+            auto_content_length=False,
         )
 
         self.conn.set_listener("scan_listener", self.scan_listener)
+        self.conn.set_listener("connection_watcher", ConnectionWatcher(self))
 
     def connect(self):
         print("Connecting..")
+        self._closing = False
 
         if self.username and self.password:
-            self.conn.connect(self.username, self.password, wait=True)
+            self.conn.connect(self.username, self.password, wait=False)
         else:
-            self.conn.connect(wait=True)
+            self.conn.connect(wait=False)
+
+        # stomp's own wait has no timeout, a hung broker would block forever
+        deadline = monotonic() + self.connect_timeout
+        while not self.conn.is_connected():
+            if monotonic() > deadline:
+                self.conn.transport.disconnect_socket()
+                raise ConnectFailedException(
+                    f"No reply from STOMP server in {self.connect_timeout} s"
+                )
+            sleep(0.01)
 
         print("Connected to STOMP server at", self.host, self.port)
 
     def disconnect(self):
+        self._closing = True
+        self.connected.clear()
         self.conn.disconnect()
 
+        if self.journal is not None:
+            self.journal.close()
+
     def subscribe(self):
         if isinstance(self.destination, list):
             for i, dest in enumerate(self.destination):
@@ -115,6 +366,51 @@ class StompMessenger:
         else:
             self.conn.subscribe(destination=self.destination, id=1, ack="auto")
 
+    def wait_for_connection(self, timeout: float | None = None) -> bool:
+        """Wait until connected, returns False if timeout passes first"""
+        return self.connected.wait(timeout)
+
+    def connection_lost(self):
+        """
+        Reconnects and subscribes again, with backoff, from a background
+        thread, unless the connection was closed by disconnect.
+        """
+        self.connected.clear()
+
+        if self._closing or not self.reconnect:
+            return
+
+        # only one reconnection at a time, a failed attempt also disconnects
+        if not self._reconnecting.acquire(blocking=False):
+            return
+
+        print("Lost connection to STOMP server, reconnecting")
+        threading.Thread(
+            target=self._reconnect, name="stomp-reconnect", daemon=True
+        ).start()
+
+    def _reconnect(self):
+        try:
+            self.reconnect_policy.call(self._connect_and_subscribe)
+        except CONNECT_ERRORS as e:
+            print(f"Could not reconnect to STOMP server: {e!r}")
+            return
+        finally:
+            self._reconnecting.release()
+
+        if self.connected.is_set():
+            self.reconnects += 1
+        elif not self._closing:
+            # lost again before the lock was released
+            self.connection_lost()
+
+    def _connect_and_subscribe(self):
+        if self._closing:
+            return
+        self.setup_connection()
+        self.connect()
+        self.subscribe()
+
     def send_file(self, path):
         message = json.dumps({"filePath": path})
         destination = "/topic/org.dawnsci.file.topic"
@@ -141,6 +437,20 @@ class StompMessenger:
         destination = "/topic/gda.messages.processing"
         self._send_message(destination, message)
 
+    def processing_notifier(
+        self, interval: float = DEFAULT_UPDATE_INTERVAL
+    ) -> ProcessingNotifier:
+        """
+        Sends processing messages through this messenger, with UPDATED
+        messages for each file coalesced to one per interval.
+
+        Args:
+            interval (float): Least seconds between UPDATED messages for a file.
+        Returns:
+            ProcessingNotifier: The notifier, also a bluesky document callback.
+        """
+        return ProcessingNotifier(self, interval=interval)
+
     def _send_message(self, destination, message):
         self.conn.send(destination=destination, body=message, ack="auto")
 
@@ -148,14 +458,30 @@ class StompMessenger:
         self.run = False
 
     def get_message(self):
-        return self.scan_listener.messages.popleft()
+        messages = self.scan_listener.get_messages(1)
+        if not messages:
+            raise IndexError("No messages received")
+        return messages[0]
+
+    def get_messages(self, max_messages: int | None = None) -> list[dict]:
+        """Take up to max_messages of the messages received so far, oldest first"""
+        return self.scan_listener.get_messages(max_messages)
+
+    def get_received(self, max_messages: int | None = None) -> list[ReceivedMessage]:
+        """As get_messages, with the topic and time each message was received"""
+        return self.scan_listener.get_received(max_messages)
+
+    @property
+    def metrics(self) -> dict[str, int]:
+        """Counts of the messages received, coalesced, dropped and parsed"""
+        return self.scan_listener.metrics.as_dict()
 
     def listen(self, max_iter: int = 50, interval: float | int = 1.0):
         c = 0
 
         while (self.run is True) and (c < max_iter):
-            if self.scan_listener.messages:
-                print("Processing message:", self.scan_listener.messages.popleft())
+            for message in self.scan_listener.get_messages(1):
+                print("Processing message:", message)
             sleep(interval)
             c += 1
 
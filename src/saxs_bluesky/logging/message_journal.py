@@ -0,0 +1,167 @@
+"""
+
+Rotating on-disk journal of received STOMP messages
+
+MessageJournal appends every message a ScanListener receives to gzipped JSON
+lines, so a failed run can be looked into afterwards without the GUI having
+been open. The listener only puts messages on a queue, a JsonlWriter
+background thread does the encoding, compression and writing, in batches.
+
+The journal is split into segments of about max_segment_bytes, named with
+their number and the time of their first message, and only the newest
+max_segments are kept. JournalReader uses the names to start reading from the
+segment holding a given time, or to read only the last segments for a tail.
+
+"""
+
+import bisect
+import gzip
+import json
+import zlib
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Any
+
+from saxs_bluesky.logging.message_queue import ReceivedMessage
+from saxs_bluesky.utils.jsonl_writer import DEFAULT_WRITER_QUEUE_SIZE, JsonlWriter
+
+DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_SEGMENTS = 64
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_JOURNAL_QUEUE_SIZE = DEFAULT_WRITER_QUEUE_SIZE
+
+SEGMENT_GLOB = "journal-*.jsonl.gz"
+
+
+def segment_name(index: int, first_time: float) -> str:
+    return f"journal-{index:08d}-{first_time:.6f}.jsonl.gz"
+
+
+def segment_info(path: Path) -> tuple[int, float]:
+    """The number and first message time of a segment, from its name"""
+    _, index, first_time = path.name.removesuffix(".jsonl.gz").split("-")
+    return int(index), float(first_time)
+
+
+class MessageJournal(JsonlWriter):
+    """Writes received messages to rotating gzipped JSONL segments"""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        max_segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        max_segments: int = DEFAULT_MAX_SEGMENTS,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        queue_size: int = DEFAULT_JOURNAL_QUEUE_SIZE,
+    ):
+        """
+        Args:
+            directory (str | Path): Where the segments are written.
+            max_segment_bytes (int): Uncompressed size at which a new segment
+                is started.
+            max_segments (int): Most segments kept, the oldest are deleted.
+            flush_interval (float): Most seconds before written messages are
+                flushed to disk, and readable.
+            queue_size (int): Most messages waiting to be written, beyond
+                which they are dropped rather than holding up the listener.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segments = max_segments
+
+        self._next_index = max(
+            (segment_info(path)[0] + 1 for path in self.segments()), default=0
+        )
+
+        super().__init__(
+            "stomp-journal",
+            queue_size=queue_size,
+            max_file_bytes=max_segment_bytes,
+            flush_interval=flush_interval,
+        )
+
+    def segments(self) -> list[Path]:
+        return sorted(self.directory.glob(SEGMENT_GLOB))
+
+    def append(self, message: ReceivedMessage):
+        """Queue a message to be written, never blocks"""
+        # queued as a tuple, as a listener may later coalesce into the message
+        self.put((message.received, message.topic, message.raw))
+
+    def line(self, record: tuple[float, str, str]) -> dict[str, Any]:
+        received, topic, raw = record
+        return {"t": received, "topic": topic, "raw": raw}
+
+    def open_file(self, record: tuple[float, str, str]) -> IO[str]:
+        path = self.directory / segment_name(self._next_index, record[0])
+        self._next_index += 1
+        file = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+
+        for old in self.segments()[: -self.max_segments]:
+            old.unlink(missing_ok=True)
+
+        return file
+
+    def __enter__(self) -> "MessageJournal":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JournalReader:
+    """Reads the messages in a journal directory, oldest first"""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+
+    def segments(self) -> list[Path]:
+        return sorted(self.directory.glob(SEGMENT_GLOB))
+
+    @staticmethod
+    def read_segment(path: Path) -> Iterator[dict[str, Any]]:
+        """
+        The records in a segment, each with t, topic and raw. A segment still
+        being written is read up to its last flush.
+        """
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # a line cut short by the last flush
+                        return
+        except (EOFError, zlib.error, FileNotFoundError):
+            return
+
+    def read(self, since: float | None = None) -> Iterator[dict[str, Any]]:
+        """Every record, or those received at or after since"""
+        segments = self.segments()
+
+        if since is not None:
+            # start at the last segment that began at or before since
+            starts = [segment_info(path)[1] for path in segments]
+            segments = segments[max(bisect.bisect_right(starts, since) - 1, 0) :]
+
+        for path in segments:
+            for record in self.read_segment(path):
+                if (since is None) or (record["t"] >= since):
+                    yield record
+
+    def tail(self, n: int) -> list[dict[str, Any]]:
+        """The last n records, reading only as many segments as needed"""
+        records: list[dict[str, Any]] = []
+
+        for path in reversed(self.segments()):
+            records[:0] = list(self.read_segment(path))
+            if len(records) >= n:
+                break
+
+        return records[-n:] if n > 0 else []
+
+    def messages(self, since: float | None = None) -> Iterator[ReceivedMessage]:
+        """The records as ReceivedMessages, to feed back into a listener"""
+        for record in self.read(since):
+            yield ReceivedMessage(record["topic"], record["raw"], received=record["t"])
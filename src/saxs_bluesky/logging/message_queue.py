@@ -0,0 +1,184 @@
+"""
+
+Bounded per-topic queues for messages received over STOMP
+
+The STOMP receiver thread should do as little as possible, so messages are
+queued as received and only parsed, with orjson if it is installed, when they
+are taken off the queue. Each topic has its own queue size and TopicPolicy:
+
+- when full, the oldest (or newest) message is dropped
+- a progress update replaces one still waiting for the same task, rather than
+  queueing behind it
+- messages reporting errors are never dropped, even when the queue is full
+
+Progress and error messages, and the task a progress update is for, are
+recognised from the raw text, without parsing. Updates for different tasks, or
+on different topics, never replace each other.
+What was received, coalesced, dropped and parsed is counted in
+ListenerMetrics.
+
+"""
+
+import json
+import re
+import time
+from collections import deque
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+from saxs_bluesky.utils.metrics import Counters
+
+try:
+    import orjson
+
+    loads = orjson.loads
+    DecodeError: tuple[type[Exception], ...] = (orjson.JSONDecodeError,)
+except ImportError:  # pragma: no cover
+    loads = json.loads
+    DecodeError = (json.JSONDecodeError,)
+
+DEFAULT_TOPIC = "unknown"
+
+# blueapi ProgressEvents, and anything reporting a failure or error
+PROGRESS_PATTERN = re.compile(r'"statuses"\s*:')
+TASK_ID_PATTERN = re.compile(r'"task_id"\s*:\s*"([^"]*)"')
+ERROR_PATTERN = re.compile(
+    r'"task_failed"\s*:\s*true|"exit_status"\s*:\s*"fail|"errors"\s*:\s*\[\s*[^\]\s]'
+    r'|"status"\s*:\s*"(?:FAILED|ERROR)"'
+)
+
+
+class TopicPolicy(BaseModel):
+    """How messages on a topic are queued"""
+
+    maxlen: int = 100
+    drop: Literal["oldest", "newest"] = "oldest"
+    coalesce_progress: bool = True
+    keep_errors: bool = True
+
+
+DEFAULT_POLICIES: dict[str, TopicPolicy] = {
+    "/topic/public.worker.event": TopicPolicy(maxlen=1000),
+    "/topic/gda.messages.scan": TopicPolicy(maxlen=100),
+}
+
+
+class ListenerMetrics(Counters):
+    """Counters of what a ScanListener has done, safe to share between threads"""
+
+    FIELDS = ("received", "coalesced", "dropped", "parsed", "invalid")
+
+
+class ReceivedMessage:
+    """A message as received, its body is parsed when first asked for"""
+
+    __slots__ = (
+        "topic",
+        "raw",
+        "received",
+        "seq",
+        "progress",
+        "error",
+        "task_id",
+        "_body",
+    )
+
+    def __init__(
+        self,
+        topic: str,
+        raw: str | bytes,
+        received: float | None = None,
+        seq: int = 0,
+    ):
+        if isinstance(raw, bytes):
+            raw = raw.decode()
+
+        self.topic = topic
+        self.raw = raw
+        self.received = time.time() if received is None else received
+        self.seq = seq
+        self.progress = PROGRESS_PATTERN.search(raw) is not None
+        self.error = ERROR_PATTERN.search(raw) is not None
+        self.task_id = self._sniff_task_id(raw) if self.progress else None
+        self._body: Any = None
+
+    @staticmethod
+    def _sniff_task_id(raw: str) -> str | None:
+        match = TASK_ID_PATTERN.search(raw)
+        return match.group(1) if match else None
+
+    @classmethod
+    def from_body(cls, body: dict, topic: str = DEFAULT_TOPIC) -> "ReceivedMessage":
+        return cls(topic, json.dumps(body))
+
+    @property
+    def body(self) -> Any:
+        if self._body is None:
+            self._body = loads(self.raw)
+        return self._body
+
+
+class TopicQueue:
+    """The messages waiting on one topic, oldest first. Not thread-safe."""
+
+    def __init__(self, policy: TopicPolicy):
+        self.policy = policy
+        self.messages: deque[ReceivedMessage] = deque()
+        # the progress update waiting for each task, None for updates without
+        # a task id
+        self._progress: dict[str | None, ReceivedMessage] = {}
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def put(self, message: ReceivedMessage) -> tuple[int, int]:
+        """Queue a message, returns how many were coalesced and dropped"""
+
+        coalesce = message.progress and self.policy.coalesce_progress
+
+        waiting = self._progress.get(message.task_id) if coalesce else None
+
+        if waiting is not None:
+            # the update still waiting for this task is replaced by this one,
+            # keeping its place in the queue and the time it was first seen, so
+            # messages are still taken in the order of their received times
+            waiting.raw = message.raw
+            waiting.error = message.error
+            return 1, 0
+
+        protected = message.error and self.policy.keep_errors
+        dropped = None
+
+        if (len(self.messages) >= self.policy.maxlen) and not protected:
+            if self.policy.drop == "newest":
+                return 0, 1
+            self.messages.append(message)
+            dropped = self._drop_oldest()
+        else:
+            self.messages.append(message)
+
+        if coalesce and (dropped is not message):
+            self._progress[message.task_id] = message
+
+        return 0, int(dropped is not None)
+
+    def _drop_oldest(self) -> ReceivedMessage | None:
+        for index, queued in enumerate(self.messages):
+            if not (queued.error and self.policy.keep_errors):
+                del self.messages[index]
+                self._forget_progress(queued)
+                return queued
+        return None
+
+    def peek(self) -> ReceivedMessage | None:
+        return self.messages[0] if self.messages else None
+
+    def pop(self) -> ReceivedMessage:
+        message = self.messages.popleft()
+        self._forget_progress(message)
+        return message
+
+    def _forget_progress(self, message: ReceivedMessage):
+        if self._progress.get(message.task_id) is message:
+            del self._progress[message.task_id]
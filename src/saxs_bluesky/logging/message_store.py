@@ -0,0 +1,259 @@
+"""
+
+Indexed store of received bluesky messages
+
+The log panel used to keep nothing but the lines it had drawn. MessageStore
+keeps each message as a LogEntry, classified by the kind of message (a
+document name, progress or worker state), the task it belongs to and a level,
+and indexes them by topic, task, kind and level. A LogFilter picks entries
+out through the smallest matching index rather than scanning them all, and
+the text of an entry is only built, once, when it is first searched.
+
+The store is capped at max_entries, DEFAULT_MAX_ENTRIES unless given, beyond
+which the oldest entries are dropped. Pass a larger max_entries to keep
+hundreds of thousands of messages searchable, at the cost of the memory their
+parsed messages take.
+
+"""
+
+import bisect
+import time
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from pydantic import BaseModel
+
+from saxs_bluesky.logging.bluesky_messenger import MessageUnpacker
+
+# each entry keeps its parsed message, and its text once searched, so this is
+# kept well below what the STOMP journal can hold
+DEFAULT_MAX_ENTRIES = 50_000
+
+LEVELS = ("info", "warning", "error")
+
+_FAILED_STATUSES = {"FAILED", "ERROR", "fail"}
+_WARNING_STATUSES = {"abort", "ABORTING", "PAUSED", "PAUSING", "HALTING"}
+
+
+def classify(message: dict[str, Any]) -> tuple[str, str | None, str]:
+    """The kind, task id and level of a blueapi or GDA message"""
+
+    task_status = message.get("task_status") or {}
+    task_id = message.get("task_id") or task_status.get("task_id")
+
+    if "doc" in message:
+        kind = str(message.get("name", "document"))
+        status = message["doc"].get("exit_status")
+    elif "statuses" in message:
+        kind, status = "progress", None
+    elif "state" in message:
+        kind, status = "worker", message["state"]
+    else:
+        kind, status = "message", message.get("status")
+
+    if message.get("errors") or task_status.get("task_failed"):
+        level = "error"
+    elif status in _FAILED_STATUSES:
+        level = "error"
+    elif status in _WARNING_STATUSES:
+        level = "warning"
+    else:
+        level = "info"
+
+    return kind, task_id, level
+
+
+class LogEntry:
+    """A received message and what it was classified as"""
+
+    __slots__ = (
+        "id",
+        "time",
+        "seen",
+        "topic",
+        "kind",
+        "task_id",
+        "level",
+        "message",
+        "_text",
+    )
+
+    def __init__(
+        self,
+        id: int,  # noqa: A002
+        time: float,
+        topic: str | None,
+        message: dict[str, Any],
+        seen: float | None = None,
+    ):
+        self.id = id
+        self.time = time
+        # never earlier than the entry before, so entries stay sorted by it
+        self.seen = time if seen is None else seen
+        self.topic = topic
+        self.message = message
+        self.kind, self.task_id, self.level = classify(message)
+        self._text: str | None = None
+
+    def text(self, unpacker: MessageUnpacker) -> str:
+        """Lower case text of the message, for searching, built on first use"""
+        if self._text is None:
+            self._text = "\n".join(unpacker.lines(self.message)).lower()
+        return self._text
+
+
+class LogFilter(BaseModel, frozen=True):
+    """
+    Which entries to show, None matches anything. since and until are compared
+    with the seen time of each entry, as the store's time slices are.
+    """
+
+    topic: str | None = None
+    task_id: str | None = None
+    kind: str | None = None
+    level: str | None = None
+    since: float | None = None
+    until: float | None = None
+    text: str = ""
+
+    def refines(self, other: "LogFilter") -> bool:
+        """True if everything this matches is also matched by other"""
+        return (
+            self.model_dump(exclude={"text"}) == other.model_dump(exclude={"text"})
+        ) and (other.text.lower() in self.text.lower())
+
+    def matches(self, entry: LogEntry, unpacker: MessageUnpacker) -> bool:
+        return (
+            ((self.topic is None) or (entry.topic == self.topic))
+            and ((self.task_id is None) or (entry.task_id == self.task_id))
+            and ((self.kind is None) or (entry.kind == self.kind))
+            and ((self.level is None) or (entry.level == self.level))
+            and ((self.since is None) or (entry.seen >= self.since))
+            and ((self.until is None) or (entry.seen <= self.until))
+            and ((not self.text) or (self.text.lower() in entry.text(unpacker)))
+        )
+
+
+class MessageStore:
+    """Received messages, oldest first, indexed by topic, task, kind and level"""
+
+    INDEXES = ("topic", "task_id", "kind", "level")
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        unpacker: MessageUnpacker | None = None,
+    ):
+        """
+        Args:
+            max_entries (int): Most entries kept, the oldest are dropped.
+            unpacker (MessageUnpacker | None): Turns messages into the text
+                that is searched.
+        """
+        self.max_entries = max_entries
+        self.unpacker = unpacker or MessageUnpacker()
+        self.clear()
+
+    def clear(self):
+        self.entries: list[LogEntry] = []
+        self._next_id = 0
+        self._indexes: dict[str, dict[Any, list[int]]] = {
+            name: {} for name in self.INDEXES
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[LogEntry]:
+        return iter(self.entries)
+
+    def values(self, index: str) -> list:
+        """The values seen for an index, eg. every task id"""
+        return [value for value in self._indexes[index] if value is not None]
+
+    def add(
+        self,
+        message: dict[str, Any],
+        topic: str | None = None,
+        received: float | None = None,
+    ) -> LogEntry:
+        received = time.time() if received is None else received
+        last_seen = self.entries[-1].seen if self.entries else received
+
+        entry = LogEntry(
+            self._next_id,
+            received,
+            topic,
+            message,
+            seen=max(received, last_seen),
+        )
+        self._next_id += 1
+
+        self.entries.append(entry)
+        self._index(entry)
+
+        if len(self.entries) > self.max_entries:
+            # drop a tenth at a time, so the indexes are rebuilt rarely
+            self._evict(len(self.entries) - int(self.max_entries * 0.9))
+
+        return entry
+
+    def _index(self, entry: LogEntry):
+        for name in self.INDEXES:
+            self._indexes[name].setdefault(getattr(entry, name), []).append(entry.id)
+
+    def _evict(self, count: int):
+        del self.entries[:count]
+        self._indexes = {name: {} for name in self.INDEXES}
+        for entry in self.entries:
+            self._index(entry)
+
+    def _by_id(self, ids: list[int]) -> Iterator[LogEntry]:
+        first = self.entries[0].id if self.entries else 0
+        for entry_id in ids:
+            yield self.entries[entry_id - first]
+
+    def _time_slice(self, since: float | None, until: float | None) -> list[LogEntry]:
+        # received times can go backwards, eg. when the clock is stepped, but
+        # the seen times are kept sorted
+        start = (
+            0
+            if since is None
+            else bisect.bisect_left(self.entries, since, key=lambda entry: entry.seen)
+        )
+        stop = (
+            len(self.entries)
+            if until is None
+            else bisect.bisect_right(self.entries, until, key=lambda entry: entry.seen)
+        )
+        return self.entries[start:stop]
+
+    def query(
+        self, log_filter: LogFilter, within: list[LogEntry] | None = None
+    ) -> list[LogEntry]:
+        """
+        The entries matching a filter, oldest first.
+
+        Args:
+            log_filter (LogFilter): What to match.
+            within (list[LogEntry] | None): Only look at these entries, eg. the
+                result of a filter this one refines.
+        Returns:
+            list[LogEntry]: The matching entries.
+        """
+        if within is not None:
+            candidates: Iterable[LogEntry] = within
+        else:
+            indexed = [
+                self._indexes[name].get(getattr(log_filter, name), [])
+                for name in self.INDEXES
+                if getattr(log_filter, name) is not None
+            ]
+            if indexed:
+                candidates = self._by_id(min(indexed, key=len))
+            else:
+                candidates = self._time_slice(log_filter.since, log_filter.until)
+
+        return [
+            entry for entry in candidates if log_filter.matches(entry, self.unpacker)
+        ]
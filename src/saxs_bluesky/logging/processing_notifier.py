@@ -0,0 +1,197 @@
+"""
+
+Throttled processing notifications
+
+StompMessenger.send_update publishes a message to
+/topic/gda.messages.processing on every call, so calling it for each batch of
+frames floods the broker. ProcessingNotifier sends at most one UPDATED message
+per file path each interval: the first update is sent straight away and the
+rest are held back, then sent as one when the interval is up, from a timer
+thread if nothing else has happened by then. STARTED and
+FINISHED are always sent, in the order asked for, and a FINISHED replaces any
+update still held back for its file.
+
+The notifier is also a bluesky document callback. It sends STARTED for each
+file a stream resource is declared for, UPDATED as stream data is written to
+it and FINISHED for all of them when the run stops, so processing can start
+while the data is still being written.
+
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, Protocol
+from urllib.parse import urlparse
+
+DEFAULT_UPDATE_INTERVAL = 1.0
+
+Schedule = Callable[[float, Callable[[], None]], Any]
+
+
+class ProcessingMessenger(Protocol):
+    def send_start(self, path: str): ...
+
+    def send_update(self, path: str): ...
+
+    def send_finished(self, path: str): ...
+
+
+def start_timer(delay: float, callback: Callable[[], None]) -> threading.Timer:
+    """Call callback from a daemon thread after delay seconds"""
+    timer = threading.Timer(delay, callback)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def resource_path(uri: str) -> str:
+    """The file path of a stream resource uri, eg. file://localhost/dls/..."""
+    parsed = urlparse(uri)
+    return parsed.path if parsed.scheme else uri
+
+
+class ProcessingNotifier:
+    """Sends processing messages for files, coalescing updates per file"""
+
+    def __init__(
+        self,
+        messenger: ProcessingMessenger,
+        interval: float = DEFAULT_UPDATE_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+        schedule: Schedule = start_timer,
+    ):
+        """
+        Args:
+            messenger (ProcessingMessenger): Sends the messages, eg. a
+                StompMessenger.
+            interval (float): Least seconds between UPDATED messages for a file.
+            clock (Callable[[], float]): Time source, for testing.
+            schedule (Schedule): Calls a function after a delay, returning
+                something with a cancel method. Used to send held back
+                updates when their interval is up.
+        """
+        self.messenger = messenger
+        self.interval = interval
+        self.clock = clock
+        self.schedule = schedule
+
+        self.counts = {"started": 0, "updated": 0, "coalesced": 0, "finished": 0}
+
+        self._last_update: dict[str, float] = {}
+        # held back updates, a dict so they are sent in the order held
+        self._pending: dict[str, None] = {}
+        self._resources: dict[str, str] = {}
+        self._run_paths: list[str] = []
+        self._timer: Any = None
+        self._lock = threading.Lock()
+
+    def start(self, path: str):
+        with self._lock:
+            self._pending.pop(path, None)
+            self._last_update.pop(path, None)
+            self.messenger.send_start(path)
+            self.counts["started"] += 1
+
+    def update(self, path: str):
+        """Send an update for a file, unless one was sent within the interval"""
+        with self._lock:
+            now = self.clock()
+            last = self._last_update.get(path)
+
+            if (last is not None) and (now - last < self.interval):
+                if path in self._pending:
+                    self.counts["coalesced"] += 1
+                self._pending[path] = None
+            else:
+                self._send_update(path, now)
+
+            self._flush(now)
+            self._schedule_flush(now)
+
+    def finished(self, path: str):
+        with self._lock:
+            if path in self._pending:
+                self._pending.pop(path, None)
+                self.counts["coalesced"] += 1
+            self._last_update.pop(path, None)
+            self.messenger.send_finished(path)
+            self.counts["finished"] += 1
+
+    def flush(self, force: bool = False):
+        """
+        Send the updates held back whose interval is up, or all of them.
+
+        Args:
+            force (bool): Send every held back update now.
+        """
+        with self._lock:
+            now = self.clock()
+            self._flush(None if force else now)
+            self._schedule_flush(now)
+
+    def close(self):
+        """Send every held back update and cancel the flush timer"""
+        with self._lock:
+            self._flush(None)
+            self._cancel_timer()
+
+    def _schedule_flush(self, now: float):
+        """Start a timer for the earliest held back update, if none is running"""
+        if (self._timer is not None) or (not self._pending):
+            return
+
+        due = min(self._last_update[path] for path in self._pending) + self.interval
+        self._timer = self.schedule(max(due - now, 0.0), self._on_timer)
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            now = self.clock()
+            self._flush(now)
+            self._schedule_flush(now)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _flush(self, now: float | None):
+        for path in list(self._pending):
+            if (now is None) or (now - self._last_update[path] >= self.interval):
+                self._send_update(path, self.clock() if now is None else now)
+
+    def _send_update(self, path: str, now: float):
+        self._pending.pop(path, None)
+        self._last_update[path] = now
+        self.messenger.send_update(path)
+        self.counts["updated"] += 1
+
+    def __call__(self, name: str, doc: dict[str, Any]):
+        """Send processing messages for the files written in a bluesky run"""
+
+        if name == "start":
+            self._resources.clear()
+            self._run_paths.clear()
+
+        elif name == "stream_resource":
+            path = resource_path(doc["uri"])
+            self._resources[doc["uid"]] = path
+            if path not in self._run_paths:
+                self._run_paths.append(path)
+                self.start(path)
+
+        elif name == "stream_datum":
+            path = self._resources.get(doc["stream_resource"])
+            if path is not None:
+                self.update(path)
+
+        elif name == "stop":
+            for path in self._run_paths:
+                self.finished(path)
+            self._resources.clear()
+            self._run_paths.clear()
+
+            with self._lock:
+                if not self._pending:
+                    self._cancel_timer()
@@ -8,6 +8,7 @@ from .ncd_panda import (
     step_rscan,
     step_scan,
 )
+from .sequence import run_plan_sequence
 
 __all__ = [
     "run_panda_triggering",
@@ -18,4 +19,5 @@ __all__ = [
     "set_detectors",
     "step_scan",
     "step_rscan",
+    "run_plan_sequence",
 ]
@@ -1,3 +1,4 @@
+import functools
 from typing import Annotated, Any
 
 import bluesky.plan_stubs as bps
@@ -28,6 +29,8 @@ from ophyd_async.plan_stubs import (
 )
 from pydantic import validate_call
 
+from saxs_bluesky.logging.bluesky_messenger import StompMessenger
+from saxs_bluesky.logging.processing_notifier import ProcessingNotifier
 from saxs_bluesky.stubs.panda_stubs import (
     check_and_apply_panda_settings,
     fly_and_collect_with_wait,
@@ -44,6 +47,7 @@ CONFIG = load_beamline_config()
 DEFAULT_PANDA = CONFIG.DEFAULT_PANDA
 FAST_DETECTORS = CONFIG.FAST_DETECTORS
 DEFAULT_BASELINE = CONFIG.DEFAULT_BASELINE
+NOTIFY_PROCESSING = CONFIG.NOTIFY_PROCESSING
 
 
 STORED_DETECTORS: list[StandardDetector] | list[str] | None = None
@@ -308,12 +312,16 @@ def run_panda_triggering(
     panda: HDFPanda = DEFAULT_PANDA,
     baseline: list[StandardReadable] = DEFAULT_BASELINE,
     metadata: dict[str, Any] | None = None,
+    notify_processing: bool = NOTIFY_PROCESSING,
 ) -> MsgGenerator:
     """
 
     This will run whatever flyscanning settings
     are currenly loaded on the PandA and start it triggering
 
+    If notify_processing is True, processing is told about each file as it
+    is written, through the beamline's message broker.
+
     """
 
     if STORED_TRIGGER_INFO is None:
@@ -383,7 +391,11 @@ def run_panda_triggering(
         yield from bps.unstage_all(*all_devices, flyer)  # stops the hdf capture mode
 
     ########## The main part
-    yield from inner_run()
+    if notify_processing:
+        # tell processing about the files as they are written
+        yield from bpp.subs_wrapper(inner_run(), processing_notifier())
+    else:
+        yield from inner_run()
     ##########
 
 
@@ -480,6 +492,16 @@ def set_trigger_info(trigger_info: TriggerInfo) -> MsgGenerator:
     yield from bps.null()
 
 
+@functools.cache
+def processing_notifier() -> ProcessingNotifier:
+    """
+    The notifier run_panda_triggering sends processing messages with, made on
+    first use with a messenger connected to the beamline's message broker.
+    """
+    messenger = StompMessenger(beamline=BL)
+    return messenger.processing_notifier(interval=CONFIG.PROCESSING_UPDATE_INTERVAL)
+
+
 def get_trigger_info() -> TriggerInfo | None:
     """
     Retrieve the globally stored trigger info.
@@ -0,0 +1,46 @@
+from blueapi.worker.task import Task
+from bluesky.utils import MsgGenerator
+from pydantic import validate_call
+
+from saxs_bluesky.utils.plan_batch import SEQUENCE_PLAN, PlanCall
+
+
+def blueapi_context():
+    """The BlueskyContext of the BlueAPI worker this plan is running in"""
+    from blueapi.service.interface import context
+
+    return context()
+
+
+@validate_call(config={"arbitrary_types_allowed": True})
+def run_plan_sequence(steps: list[PlanCall]) -> MsgGenerator:
+    """
+    Run a sequence of plans in one task, as submitted by a PlanBatch.
+
+    Each step's params are validated by BlueAPI as they would be for a task of
+    its own, so device names are looked up in the worker's context.
+
+    Args:
+        steps (list[PlanCall]): The plans to run, in order.
+    Yields:
+        Msg: Bluesky messages from each plan in turn.
+    """
+    ctx = blueapi_context()
+
+    # check every step, and its params, before running any of them
+    for step in steps:
+        if step.name == SEQUENCE_PLAN:
+            raise ValueError(f"{SEQUENCE_PLAN} can't be nested")
+        elif step.name not in ctx.plan_functions:
+            raise ValueError(f"{step.name} is not a plan in this BlueAPI worker")
+
+    prepared = [
+        (
+            ctx.plan_functions[step.name],
+            Task(name=step.name, params=step.params).prepare_params(ctx),
+        )
+        for step in steps
+    ]
+
+    for plan, params in prepared:
+        yield from plan(**params)
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from collections.abc import Iterable
 from pathlib import Path
@@ -9,19 +10,26 @@ from dodal.beamlines import module_name_for_beamline
 from dodal.log import LOGGER
 from dodal.utils import AnyDevice, make_all_devices, make_device
 from ophyd_async.core import (
+    Device,
+    SettingsProvider,
     StandardDetector,
     StandardFlyer,
     YamlSettingsProvider,
     wait_for_value,
+    walk_rw_signals,
 )
 from ophyd_async.fastcs.panda import HDFPanda, PcompInfo, SeqTableInfo
 from ophyd_async.plan_stubs import (
     apply_panda_settings,
     apply_settings_if_different,
+    ensure_connected,
     retrieve_settings,
     store_settings,
 )
 
+from saxs_bluesky.utils.settings_cache import CachedYamlSettingsProvider
+from saxs_bluesky.utils.settings_store import SettingsStore
+
 
 def return_connected_device(beamline: str, device_name: str):
     """
@@ -143,11 +151,35 @@ def load_settings_to_panda(
     yaml_directory: str, yaml_file_name: str, panda: HDFPanda
 ) -> MsgGenerator:
     """
-    load settings to panda if different
+    load settings to panda if different.
+    The parsed yaml is cached for the process, so repeated loads of an
+    unchanged file skip the yaml parse
     """
 
-    provider = YamlSettingsProvider(yaml_directory)
-    settings = yield from retrieve_settings(provider, yaml_file_name, panda)
+    provider = CachedYamlSettingsProvider(yaml_directory)
+    yield from apply_provider_settings_to_panda(provider, yaml_file_name, panda)
+
+
+def load_mode_to_panda(
+    store_directory: str, mode: str, panda: HDFPanda
+) -> MsgGenerator:
+    """
+    load a mode from a base + overlay SettingsStore to panda if different
+    """
+
+    store = SettingsStore(store_directory)
+    yield from apply_provider_settings_to_panda(store, mode, panda)
+
+
+def apply_provider_settings_to_panda(
+    provider: SettingsProvider, name: str, panda: HDFPanda
+) -> MsgGenerator:
+    """
+    retrieve the named settings from any settings provider and
+    apply them to the panda if they are different
+    """
+
+    settings = yield from retrieve_settings(provider, name, panda)
     yield from apply_settings_if_different(settings, apply_panda_settings)
 
 
@@ -167,6 +199,36 @@ def save_device_to_yaml(
     yield from store_settings(provider, yaml_file_name, device)
 
 
+def snapshot_devices(
+    provider: SettingsProvider,
+    devices: dict[str, Device],
+    ensure_devices_connected: bool = True,
+) -> MsgGenerator:
+    """
+
+    Takes a settings provider and a dict of device names to devices,
+    connects to all of the devices at once and then reads and stores the
+    settings of every device concurrently, rather than one after another as
+    store_settings would.
+
+    """
+
+    if ensure_devices_connected:
+        yield from ensure_connected(*devices.values())
+
+    async def _snapshot_device(name: str, device: Device):
+        signals = walk_rw_signals(device)
+        values = await asyncio.gather(*(sig.get_value() for sig in signals.values()))
+        await provider.store(name, dict(zip(signals, values, strict=True)))
+
+    async def _snapshot():
+        await asyncio.gather(
+            *(_snapshot_device(name, device) for name, device in devices.items())
+        )
+
+    yield from bps.wait_for([_snapshot])
+
+
 def log_deadtime(
     active_detector_names: Iterable[Any], detector_deadtime: Iterable[Any]
 ):
@@ -0,0 +1,383 @@
+"""
+
+Local stand-in for a BlueAPI server
+
+FakeBlueAPIServer serves the REST endpoints BlueAPIPythonClient uses (plans,
+devices, tasks and the worker state and task) from a thread in this process,
+and FakeEventBus stands in for the STOMP event bus, so the client can be load
+tested without a beamline. Each task "runs" by emitting a run's worth of
+documents as DataEvents, with ProgressEvents, then a completed WorkerEvent.
+
+Request latency and the rate of failed task starts, answered with 409 as a
+busy worker would, can be configured.
+
+"""
+
+import json
+import random
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+import yaml
+from blueapi.client.event_bus import AnyEvent
+from blueapi.core import DataEvent
+from blueapi.worker import ProgressEvent, TrackableTask, WorkerEvent, WorkerState
+from blueapi.worker.event import StatusView, TaskStatus
+from blueapi.worker.task import Task
+from bluesky_stomp.messaging import MessageContext
+from bluesky_stomp.models import MessageTopic
+
+EVENT_TOPIC = MessageTopic(name="public.worker.event")
+
+DEFAULT_PLANS = ["count", "sleep", "move", "run_panda_triggering"]
+DEFAULT_DEVICES = ["saxs", "waxs", "i0", "it", "panda1", "base"]
+
+
+def run_documents(task_id: str, n_events: int) -> list[tuple[str, dict[str, Any]]]:
+    """The start, descriptor, events and stop documents of a small run"""
+
+    now = time.time()
+    start_uid, descriptor_uid = str(uuid.uuid4()), str(uuid.uuid4())
+
+    documents: list[tuple[str, dict[str, Any]]] = [
+        (
+            "start",
+            {
+                "uid": start_uid,
+                "time": now,
+                "scan_id": 1,
+                "plan_name": task_id,
+                "plan_type": "generator",
+            },
+        ),
+        (
+            "descriptor",
+            {
+                "uid": descriptor_uid,
+                "run_start": start_uid,
+                "time": now,
+                "name": "primary",
+                "data_keys": {
+                    "saxs": {"source": "fake", "dtype": "number", "shape": []}
+                },
+                "object_keys": {"saxs": ["saxs"]},
+            },
+        ),
+    ]
+
+    for seq_num in range(1, n_events + 1):
+        documents.append(
+            (
+                "event",
+                {
+                    "uid": str(uuid.uuid4()),
+                    "descriptor": descriptor_uid,
+                    "seq_num": seq_num,
+                    "time": now,
+                    "data": {"saxs": float(seq_num)},
+                    "timestamps": {"saxs": now},
+                    "filled": {},
+                },
+            )
+        )
+
+    documents.append(
+        (
+            "stop",
+            {
+                "uid": str(uuid.uuid4()),
+                "run_start": start_uid,
+                "time": now,
+                "exit_status": "success",
+                "num_events": {"primary": n_events},
+            },
+        )
+    )
+
+    return documents
+
+
+class FakeEventBus:
+    """
+    Stands in for blueapi's EventBusClient, events are delivered by calling
+    the subscribers directly from the fake worker's thread.
+    """
+
+    def __init__(self, server: "FakeBlueAPIServer"):
+        self.server = server
+        self._subscriptions: list[Callable[[AnyEvent, MessageContext], None]] = []
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        while self._subscriptions:
+            self.server.unsubscribe(self._subscriptions.pop())
+
+    def subscribe_to_all_events(
+        self, on_event: Callable[[AnyEvent, MessageContext], None]
+    ):
+        self._subscriptions.append(on_event)
+        self.server.subscribe(on_event)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_HTTPServer"
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    def _reply(self, code: int, body: Any):
+        content = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _handle(self, method: str):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+
+        code, reply = self.server.fake.handle(method, self.path, body)
+        self._reply(code, reply)
+
+    def do_GET(self):  # noqa: N802
+        self._handle("GET")
+
+    def do_POST(self):  # noqa: N802
+        self._handle("POST")
+
+    def do_PUT(self):  # noqa: N802
+        self._handle("PUT")
+
+    def do_DELETE(self):  # noqa: N802
+        self._handle("DELETE")
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeBlueAPIServer"
+
+
+class FakeBlueAPIServer:
+    """An in-process BlueAPI REST server and event stream for load testing"""
+
+    def __init__(
+        self,
+        plans: list[str] | None = None,
+        devices: list[str] | None = None,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        events_per_task: int = 10,
+        task_time: float = 0.0,
+        seed: int | None = None,
+    ):
+        """
+        Args:
+            plans (list[str] | None): Plan names the server reports.
+            devices (list[str] | None): Device names the server reports.
+            latency (float): Seconds added to every REST request.
+            failure_rate (float): Fraction of task starts refused as busy.
+            events_per_task (int): Event documents emitted per task.
+            task_time (float): Seconds each task takes to run.
+            seed (int | None): Seed of the failure generator.
+        """
+        self.plans = plans if plans is not None else list(DEFAULT_PLANS)
+        self.devices = devices if devices is not None else list(DEFAULT_DEVICES)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.events_per_task = events_per_task
+        self.task_time = task_time
+
+        self.requests: Counter[str] = Counter()
+        self.tasks: dict[str, TrackableTask] = {}
+        self.state = WorkerState.IDLE
+        self.active_task: str | None = None
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._subscribers: list[Callable[[AnyEvent, MessageContext], None]] = []
+        self._httpd: _HTTPServer | None = None
+        self._directory = tempfile.TemporaryDirectory()
+
+    @property
+    def url(self) -> str:
+        assert self._httpd is not None, "The server has not been started"
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeBlueAPIServer":
+        self._httpd = _HTTPServer(("127.0.0.1", 0), _Handler)
+        self._httpd.fake = self
+        threading.Thread(
+            target=self._httpd.serve_forever, name="fake-blueapi", daemon=True
+        ).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        self._directory.cleanup()
+
+    def __enter__(self) -> "FakeBlueAPIServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def config_path(self) -> Path:
+        """A blueapi config yaml pointing at this server, with STOMP disabled"""
+        path = Path(self._directory.name) / "fake_blueapi_config.yaml"
+        with open(path, "w") as file:
+            yaml.safe_dump(
+                {"api": {"url": self.url}, "stomp": {"enabled": False}}, file
+            )
+        return path
+
+    def client(self, instrument_session: str = "cm12345-1", **kwargs):
+        """A BlueAPIPythonClient connected to this server and its event bus"""
+        from saxs_bluesky.utils.beamline_client import BlueAPIPythonClient
+
+        client = BlueAPIPythonClient(
+            "fake", self.config_path(), instrument_session, **kwargs
+        )
+        client._events = FakeEventBus(self)  # type: ignore # noqa
+
+        return client
+
+    def subscribe(self, on_event: Callable[[AnyEvent, MessageContext], None]):
+        with self._lock:
+            self._subscribers.append(on_event)
+
+    def unsubscribe(self, on_event: Callable[[AnyEvent, MessageContext], None]):
+        with self._lock:
+            if on_event in self._subscribers:
+                self._subscribers.remove(on_event)
+
+    def publish(self, event: AnyEvent, correlation_id: str | None = None):
+        context = MessageContext(EVENT_TOPIC, None, correlation_id)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for on_event in subscribers:
+            on_event(event, context)
+
+    def handle(self, method: str, path: str, body: Any) -> tuple[int, Any]:
+        """Answer a REST request, returns the status code and json body"""
+        self.requests[f"{method} {path.split('?')[0]}"] += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        match method, path.strip("/").split("/"):
+            case "GET", ["plans"]:
+                return 200, {
+                    "plans": [
+                        {"name": name, "parameter_schema": {}} for name in self.plans
+                    ]
+                }
+            case "GET", ["devices"]:
+                return 200, {
+                    "devices": [
+                        {"name": name, "protocols": []} for name in self.devices
+                    ]
+                }
+            case "GET", ["worker", "state"]:
+                return 200, self.state.value
+            case "GET", ["worker", "task"]:
+                return 200, {"task_id": self.active_task}
+            case "PUT", ["worker", "task"]:
+                return self._start_task(body["task_id"])
+            case "GET", ["tasks"]:
+                return 200, {
+                    "tasks": [t.model_dump(mode="json") for t in self.tasks.values()]
+                }
+            case "POST", ["tasks"]:
+                return self._create_task(body)
+            case "GET", ["tasks", task_id] if task_id in self.tasks:
+                return 200, self.tasks[task_id].model_dump(mode="json")
+            case "DELETE", ["tasks", task_id] if task_id in self.tasks:
+                self.tasks.pop(task_id)
+                return 200, {"task_id": task_id}
+            case _:
+                return 404, {"detail": f"{method} {path} not found"}
+
+    def _create_task(self, body: dict[str, Any]) -> tuple[int, Any]:
+        if body["name"] not in self.plans:
+            return 404, {"detail": f"Plan {body['name']} not found"}
+
+        task_id = str(uuid.uuid4())
+        self.tasks[task_id] = TrackableTask(
+            task_id=task_id,
+            task=Task(name=body["name"], params=body.get("params", {})),
+        )
+        return 201, {"task_id": task_id}
+
+    def _start_task(self, task_id: str) -> tuple[int, Any]:
+        with self._lock:
+            busy = self.active_task is not None
+            refused = self._random.random() < self.failure_rate
+
+            if busy or refused or (task_id not in self.tasks):
+                return 409, {"detail": "Worker already active"}
+
+            self.active_task = task_id
+            self.state = WorkerState.RUNNING
+
+        threading.Thread(
+            target=self._run_task, args=(task_id,), name="fake-blueapi-worker"
+        ).start()
+        return 200, {"task_id": task_id}
+
+    def _run_task(self, task_id: str):
+        task = self.tasks[task_id]
+        task.is_pending = False
+
+        for name, doc in run_documents(task_id, self.events_per_task):
+            if name == "event":
+                self.publish(
+                    ProgressEvent(
+                        task_id=task_id,
+                        statuses={
+                            "saxs": StatusView(
+                                display_name="saxs",
+                                current=doc["seq_num"],
+                                initial=0,
+                                target=self.events_per_task,
+                                percentage=doc["seq_num"] / self.events_per_task,
+                            )
+                        },
+                    ),
+                    correlation_id=task_id,
+                )
+            self.publish(
+                DataEvent(name=name, doc=doc, task_id=task_id), correlation_id=task_id
+            )
+
+        if self.task_time:
+            time.sleep(self.task_time)
+
+        task.is_complete = True
+
+        with self._lock:
+            self.active_task = None
+            self.state = WorkerState.IDLE
+
+        self.publish(
+            WorkerEvent(
+                state=WorkerState.IDLE,
+                task_status=TaskStatus(
+                    task_id=task_id, task_complete=True, task_failed=False
+                ),
+            ),
+            correlation_id=task_id,
+        )
@@ -0,0 +1,385 @@
+"""
+
+Local stand-in for a STOMP broker
+
+FakeStompBroker speaks enough STOMP 1.1/1.2 (CONNECT, SUBSCRIBE, UNSUBSCRIBE,
+SEND, DISCONNECT with receipts, and heart-beating) for StompMessenger to
+connect, subscribe, send and receive from a thread in this process, so the
+messenger can be tested and benchmarked without a beamline's RabbitMQ.
+
+Failures can be staged: drop_connections() closes every client socket, as a
+network blip would, restart() stops and starts the broker on the same port
+and freeze() keeps the sockets open but stops answering, including heart
+beats, as a hung broker would.
+
+"""
+
+import socket
+import socketserver
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import NamedTuple
+
+NULL = b"\x00"
+
+_ESCAPES = {"\\": "\\\\", "\n": "\\n", ":": "\\c", "\r": "\\r"}
+_UNESCAPES = {"\\": "\\", "n": "\n", "c": ":", "r": "\r"}
+
+
+def escape(value: str) -> str:
+    return "".join(_ESCAPES.get(char, char) for char in value)
+
+
+def unescape(value: str) -> str:
+    if "\\" not in value:
+        return value
+
+    chars, escaped = [], False
+    for char in value:
+        if escaped:
+            chars.append(_UNESCAPES.get(char, char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        else:
+            chars.append(char)
+    return "".join(chars)
+
+
+class Frame(NamedTuple):
+    command: str
+    headers: dict[str, str]
+    body: bytes = b""
+
+
+def encode_frame(frame: Frame) -> bytes:
+    lines = [frame.command]
+    lines += [f"{escape(key)}:{escape(value)}" for key, value in frame.headers.items()]
+    head = "\n".join(lines).encode() + b"\n"
+    if frame.body:
+        head += f"content-length:{len(frame.body)}\n".encode()
+    return head + b"\n" + frame.body + NULL
+
+
+class FrameParser:
+    """Splits a byte stream into frames, skipping heart beats"""
+
+    def __init__(self):
+        self.buffer = b""
+
+    def feed(self, data: bytes) -> list[Frame]:
+        self.buffer += data
+        frames = []
+
+        while True:
+            # heart beats are bare end of lines between frames
+            self.buffer = self.buffer.lstrip(b"\r\n")
+            head_end = self.buffer.find(b"\n\n")
+            if head_end < 0:
+                break
+
+            lines = self.buffer[:head_end].decode().replace("\r", "").split("\n")
+            command, headers = lines[0], {}
+            for line in lines[1:]:
+                key, _, value = line.partition(":")
+                if command not in ("CONNECT", "STOMP"):
+                    key, value = unescape(key), unescape(value)
+                # the first of a repeated header is the one used
+                headers.setdefault(key, value)
+
+            body_start = head_end + 2
+            if "content-length" in headers:
+                body_end = body_start + int(headers["content-length"])
+                if len(self.buffer) < body_end + 1:
+                    break
+            else:
+                body_end = self.buffer.find(NULL, body_start)
+                if body_end < 0:
+                    break
+
+            frames.append(Frame(command, headers, self.buffer[body_start:body_end]))
+            self.buffer = self.buffer[body_end + 1 :]
+
+        return frames
+
+
+class _Session:
+    """A connected client, its subscriptions and heart beat timing"""
+
+    def __init__(self, broker: "FakeStompBroker", sock: socket.socket):
+        self.broker = broker
+        self.socket = sock
+        self.id = str(uuid.uuid4())
+        self.subscriptions: dict[str, str] = {}
+        self.send_interval = 0.0
+        self.last_sent = time.monotonic()
+        self._lock = threading.Lock()
+
+    def send(self, data: bytes) -> bool:
+        with self._lock:
+            try:
+                self.socket.sendall(data)
+            except OSError:
+                return False
+            self.last_sent = time.monotonic()
+            return True
+
+    def send_frame(self, frame: Frame) -> bool:
+        return self.send(encode_frame(frame))
+
+    def close(self):
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    server: "_TCPServer"
+
+    def handle(self):
+        broker = self.server.fake
+        session = _Session(broker, self.request)
+        parser = FrameParser()
+
+        try:
+            while True:
+                data = self.request.recv(65536)
+                if not data:
+                    break
+                if broker.frozen:
+                    continue
+                for frame in parser.feed(data):
+                    if not broker.handle_frame(session, frame):
+                        return
+        except OSError:
+            pass
+        finally:
+            broker.remove_session(session)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    fake: "FakeStompBroker"
+
+
+class FakeStompBroker:
+    """An in-process STOMP broker for testing and benchmarking"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        heartbeats: tuple[int, int] = (1000, 1000),
+        username: str | None = None,
+        password: str | None = None,
+    ):
+        """
+        Args:
+            host (str): Address to listen on.
+            port (int): Port to listen on, 0 for any free port, which is kept
+                when the broker is restarted.
+            heartbeats (tuple[int, int]): Milliseconds between the heart beats
+                the broker can send, and wants to receive, 0 for none.
+            username (str | None): If given, CONNECT must have this login.
+            password (str | None): If given, CONNECT must have this passcode.
+        """
+        self.host = host
+        self.port = port
+        self.heartbeats = heartbeats
+        self.username = username
+        self.password = password
+
+        self.frozen = False
+        self.counts: Counter[str] = Counter()
+        self.sessions: dict[str, _Session] = {}
+
+        self._lock = threading.Lock()
+        self._tcp: _TCPServer | None = None
+        self._stop_heartbeats = threading.Event()
+
+    def start(self) -> "FakeStompBroker":
+        self._tcp = _TCPServer((self.host, self.port), _Handler)
+        self._tcp.fake = self
+        self.port = self._tcp.server_address[1]
+        self.frozen = False
+
+        threading.Thread(
+            target=self._tcp.serve_forever, name="fake-stomp", daemon=True
+        ).start()
+
+        # a new event each start, so a restart never leaves two loops running
+        self._stop_heartbeats = threading.Event()
+        threading.Thread(
+            target=self._heartbeat_loop,
+            args=(self._stop_heartbeats,),
+            name="fake-stomp-heartbeat",
+            daemon=True,
+        ).start()
+        return self
+
+    def stop(self):
+        self._stop_heartbeats.set()
+        if self._tcp is not None:
+            self._tcp.shutdown()
+            self._tcp.server_close()
+            self._tcp = None
+        self.drop_connections()
+
+    def restart(self, downtime: float = 0.0):
+        """Stop, wait downtime seconds and start again on the same port"""
+        self.stop()
+        time.sleep(downtime)
+        self.start()
+
+    def drop_connections(self):
+        """Close every client connection, as a network blip would"""
+        with self._lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
+        self.counts["dropped"] += len(sessions)
+
+    def freeze(self, frozen: bool = True):
+        """Stop (or start again) answering frames and sending heart beats"""
+        self.frozen = frozen
+
+    def __enter__(self) -> "FakeStompBroker":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def subscribers(self, destination: str) -> int:
+        with self._lock:
+            return sum(
+                destination in session.subscriptions.values()
+                for session in self.sessions.values()
+            )
+
+    def wait_for_subscribers(
+        self, destination: str, count: int = 1, timeout: float = 5.0
+    ) -> bool:
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            if self.subscribers(destination) >= count:
+                return True
+            time.sleep(0.005)
+        return False
+
+    def publish(
+        self,
+        destination: str,
+        body: str | bytes,
+        headers: dict[str, str] | None = None,
+    ) -> int:
+        """Send a message to the subscribers of a destination, returns how many"""
+
+        if self.frozen:
+            return 0
+
+        if isinstance(body, str):
+            body = body.encode()
+
+        with self._lock:
+            targets = [
+                (session, subscription_id)
+                for session in self.sessions.values()
+                for subscription_id, subscribed in session.subscriptions.items()
+                if subscribed == destination
+            ]
+
+        delivered = 0
+        for session, subscription_id in targets:
+            frame_headers = {
+                "destination": destination,
+                "subscription": subscription_id,
+                "message-id": str(uuid.uuid4()),
+                "content-type": "application/json",
+                **(headers or {}),
+            }
+            delivered += session.send_frame(Frame("MESSAGE", frame_headers, body))
+
+        self.counts["delivered"] += delivered
+        return delivered
+
+    def remove_session(self, session: _Session):
+        with self._lock:
+            self.sessions.pop(session.id, None)
+        session.close()
+
+    def handle_frame(self, session: _Session, frame: Frame) -> bool:
+        """Act on a frame from a client, returns False to close its connection"""
+
+        self.counts[frame.command] += 1
+
+        if frame.command in ("CONNECT", "STOMP"):
+            return self._connect(session, frame)
+
+        if frame.command == "SUBSCRIBE":
+            session.subscriptions[frame.headers["id"]] = frame.headers["destination"]
+        elif frame.command == "UNSUBSCRIBE":
+            session.subscriptions.pop(frame.headers["id"], None)
+        elif frame.command == "SEND":
+            self.publish(frame.headers["destination"], frame.body)
+
+        receipt = frame.headers.get("receipt")
+        if receipt is not None:
+            session.send_frame(Frame("RECEIPT", {"receipt-id": receipt}))
+
+        return frame.command != "DISCONNECT"
+
+    def _connect(self, session: _Session, frame: Frame) -> bool:
+        login, passcode = frame.headers.get("login"), frame.headers.get("passcode")
+        if ((self.username is not None) and (login != self.username)) or (
+            (self.password is not None) and (passcode != self.password)
+        ):
+            session.send_frame(Frame("ERROR", {"message": "Bad credentials"}))
+            return False
+
+        # heart beat negotiation, each side sends at the slower of what one
+        # can send and the other wants
+        _, client_want = (
+            int(value) for value in frame.headers.get("heart-beat", "0,0").split(",")
+        )
+        server_send, server_want = self.heartbeats
+        if server_send and client_want:
+            session.send_interval = max(server_send, client_want) / 1000
+
+        version = frame.headers.get("accept-version", "1.0").split(",")[-1]
+        session.send_frame(
+            Frame(
+                "CONNECTED",
+                {
+                    "version": version,
+                    "heart-beat": f"{server_send},{server_want}",
+                    "session": session.id,
+                    "server": "fake-stomp",
+                },
+            )
+        )
+
+        with self._lock:
+            self.sessions[session.id] = session
+        self.counts["connections"] += 1
+        return True
+
+    def _heartbeat_loop(self, stop: threading.Event):
+        while not stop.wait(0.01):
+            if self.frozen:
+                continue
+
+            now = time.monotonic()
+            with self._lock:
+                sessions = list(self.sessions.values())
+
+            for session in sessions:
+                if session.send_interval and (
+                    now - session.last_sent >= session.send_interval
+                ):
+                    session.send(b"\n")
@@ -0,0 +1,281 @@
+"""
+
+Asyncio BlueAPI client
+
+BlueAPIPythonClient makes one blocking round trip per call. AsyncBlueAPIClient
+talks to the same REST api through a single pooled httpx.AsyncClient, so a
+GUI or script can keep several requests in flight, eg. polling the status of
+many tasks at once. SyncBlueAPIClient runs it on a background event loop for
+code that isn't async.
+
+"""
+
+import asyncio
+import threading
+from collections.abc import Callable, Coroutine
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, TypeVar
+
+import httpx
+from blueapi.client.rest import (
+    BlueskyRemoteControlError,
+    NotFoundError,
+    UnauthorisedAccessError,
+)
+from blueapi.config import ApplicationConfig, ConfigLoader
+from blueapi.service.authentication import SessionManager
+from blueapi.service.model import (
+    DeviceResponse,
+    PlanResponse,
+    TaskRequest,
+    TaskResponse,
+    WorkerTask,
+)
+from blueapi.worker import TrackableTask, WorkerState
+from pydantic import TypeAdapter
+
+from saxs_bluesky.utils.beamline_client import PlanParamsMixin
+
+T = TypeVar("T")
+
+
+class AsyncBlueAPIClient(PlanParamsMixin):
+    """An asyncio BlueAPI client for running bluesky plans"""
+
+    def __init__(
+        self,
+        beamline: str,
+        blueapi_config_path: str | Path,
+        instrument_session: str,
+        timeout: int | float | None = None,
+        max_connections: int = 10,
+        poll_interval: float = 0.1,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        """
+        Args:
+            beamline (str): The beamline name.
+            blueapi_config_path (str | Path): The blueapi config yaml.
+            instrument_session (str): The session plans are run under.
+            timeout (int | float | None): How long run waits for a task.
+            max_connections (int): Size of the HTTP connection pool.
+            poll_interval (float): Seconds between task status checks in run.
+            transport (httpx.AsyncBaseTransport | None): Optional transport,
+                eg. to talk to an in-process server.
+        """
+        self.beamline = beamline
+        self.instrument_session = instrument_session
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.max_connections = max_connections
+        self.transport = transport
+
+        config_loader = ConfigLoader(ApplicationConfig)
+        config_loader.use_values_from_yaml(Path(blueapi_config_path))
+        self.config = config_loader.load()
+        self.url = self.config.api.url.unicode_string().removesuffix("/")
+
+        try:
+            self.session_manager = SessionManager.from_cache(
+                self.config.auth_token_path
+            )
+        except Exception:
+            self.session_manager = None
+
+        self._session: httpx.AsyncClient | None = None
+
+    @property
+    def session(self) -> httpx.AsyncClient:
+        """The pooled HTTP session, made on first use"""
+        if self._session is None or self._session.is_closed:
+            self._session = httpx.AsyncClient(
+                base_url=self.url,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=None,
+                transport=self.transport,
+            )
+        return self._session
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.aclose()
+            self._session = None
+
+    async def __aenter__(self) -> "AsyncBlueAPIClient":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def _headers(self) -> dict[str, str]:
+        if self.session_manager is None:
+            return {}
+        # refreshing an expired token is a blocking network call
+        token = await asyncio.to_thread(self.session_manager.get_valid_access_token)
+        return {"Authorization": f"Bearer {token}"}
+
+    async def _request(
+        self,
+        suffix: str,
+        target_type: type[T],
+        method: str = "GET",
+        data: dict[str, Any] | None = None,
+    ) -> T:
+        response = await self.session.request(
+            method, suffix, json=data, headers=await self._headers()
+        )
+
+        if response.status_code in (401, 403):
+            raise UnauthorisedAccessError(response.status_code, response.text)
+        elif response.status_code == 404:
+            raise NotFoundError(response.status_code, response.text)
+        elif response.status_code >= 400:
+            raise BlueskyRemoteControlError(response.status_code, response.text)
+
+        return TypeAdapter(target_type).validate_python(response.json())
+
+    async def get_plans(self) -> PlanResponse:
+        return await self._request("/plans", PlanResponse)
+
+    async def get_devices(self) -> DeviceResponse:
+        return await self._request("/devices", DeviceResponse)
+
+    async def get_state(self) -> WorkerState:
+        return await self._request("/worker/state", WorkerState)
+
+    async def get_active_task(self) -> WorkerTask:
+        return await self._request("/worker/task", WorkerTask)
+
+    async def get_task(self, task_id: str) -> TrackableTask:
+        return await self._request(f"/tasks/{task_id}", TrackableTask)
+
+    async def get_tasks(self, task_ids: list[str]) -> list[TrackableTask]:
+        """Query the status of several tasks concurrently"""
+        return list(
+            await asyncio.gather(*(self.get_task(task_id) for task_id in task_ids))
+        )
+
+    async def get_worker_status(self) -> tuple[WorkerState, WorkerTask]:
+        """The worker state and active task, queried concurrently"""
+        state, active_task = await asyncio.gather(
+            self.get_state(), self.get_active_task()
+        )
+        return state, active_task
+
+    async def create_and_start_task(self, task: TaskRequest) -> TaskResponse:
+        response = await self._request(
+            "/tasks", TaskResponse, method="POST", data=task.model_dump(mode="json")
+        )
+        worker_response = await self._request(
+            "/worker/task",
+            WorkerTask,
+            method="PUT",
+            data=WorkerTask(task_id=response.task_id).model_dump(),
+        )
+
+        if worker_response.task_id != response.task_id:
+            raise BlueskyRemoteControlError(
+                f"Tried to create and start task {response.task_id} "
+                f"but {worker_response.task_id} was started instead"
+            )
+
+        return response
+
+    async def wait_for_task(self, task_id: str) -> TrackableTask:
+        """Poll a task until it is complete, or until the timeout"""
+
+        async def poll() -> TrackableTask:
+            while not (task := await self.get_task(task_id)).is_complete:
+                await asyncio.sleep(self.poll_interval)
+            return task
+
+        return await asyncio.wait_for(poll(), timeout=self.timeout)
+
+    async def submit(self, plan: str | Callable, *args, **kwargs) -> TaskResponse:
+        """Start a bluesky plan via BlueAPI without waiting for it"""
+
+        task = self._task_request(plan, args, kwargs)
+        server_task = await self.create_and_start_task(task)
+        print(f"{task.name} task sent as {server_task.task_id}")
+
+        return server_task
+
+    async def run(self, plan: str | Callable, *args, **kwargs) -> TrackableTask:
+        """Run a bluesky plan via BlueAPI and wait for it to complete."""
+
+        server_task = await self.submit(plan, *args, **kwargs)
+        task = await self.wait_for_task(server_task.task_id)
+
+        if task.errors:
+            raise Exception(f"Task could not run: {task.errors}")
+
+        print(f"{task.task.name} succeeded")
+
+        return task
+
+    async def show_plans(self):
+        plans = (await self.get_plans()).plans
+        for plan in plans:
+            print(plan.name)
+        print(f"Total plans: {len(plans)} \n")
+
+    async def show_devices(self):
+        devices = (await self.get_devices()).devices
+        for dev in devices:
+            print(dev.name)
+        print(f"Total devices: {len(devices)} \n")
+
+    def change_session(self, new_session: str) -> None:
+        """Change the instrument session for the client."""
+        print(f"New instrument session: {new_session}")
+        self.instrument_session = new_session
+
+
+class SyncBlueAPIClient:
+    """
+    Blocking facade over AsyncBlueAPIClient. The async client runs on an event
+    loop in a background thread, so its pooled session is kept between calls.
+    Use submit to start coroutines without blocking and keep several requests
+    in flight.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Takes the same arguments as AsyncBlueAPIClient"""
+        self.client = AsyncBlueAPIClient(*args, **kwargs)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="blueapi-client", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, coroutine: Coroutine[Any, Any, T]) -> Future[T]:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        return self.submit(coroutine).result()
+
+    def run(self, plan: str | Callable, *args, **kwargs) -> TrackableTask:
+        return self.call(self.client.run(plan, *args, **kwargs))
+
+    def show_plans(self):
+        self.call(self.client.show_plans())
+
+    def show_devices(self):
+        self.call(self.client.show_devices())
+
+    def get_tasks(self, task_ids: list[str]) -> list[TrackableTask]:
+        return self.call(self.client.get_tasks(task_ids))
+
+    def change_session(self, new_session: str) -> None:
+        self.client.change_session(new_session)
+
+    def close(self):
+        if self.loop.is_running():
+            self.call(self.client.aclose())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+        self.loop.close()
@@ -1,59 +1,119 @@
-import time
+import functools
+import inspect
+import logging
 import warnings
 from collections.abc import Callable
+from concurrent.futures import Future
+from datetime import datetime
 from pathlib import Path
 
 from blueapi.cli.updates import CliEventRenderer
 from blueapi.client.client import BlueapiClient
-from blueapi.client.event_bus import AnyEvent
-from blueapi.client.rest import BlueskyRemoteControlError
+from blueapi.client.event_bus import AnyEvent, OnAnyEvent
+from blueapi.client.rest import BlueskyRemoteControlError, ServiceUnavailableError
 from blueapi.config import (
     ApplicationConfig,
     ConfigLoader,
+    MissingStompConfigurationError,
 )
 from blueapi.core import DataEvent
-from blueapi.service.model import TaskRequest
-from blueapi.worker import ProgressEvent
+from blueapi.service.model import (
+    DeviceModel,
+    EnvironmentResponse,
+    PlanModel,
+    TaskRequest,
+    WorkerTask,
+)
+from blueapi.worker import ProgressEvent, WorkerEvent
+from blueapi.worker.event import TaskStatus
 from bluesky.callbacks.best_effort import BestEffortCallback
+from bluesky_stomp.messaging import MessageContext
 from dodal.common import inject
 from ophyd_async.core import StandardReadable
 
+from saxs_bluesky.utils.event_dispatch import (
+    DEFAULT_QUEUE_SIZE,
+    EventCallback,
+    EventDispatcher,
+)
+from saxs_bluesky.utils.event_log import EventRecorder, replay_events
+from saxs_bluesky.utils.plan_batch import PlanBatch
+from saxs_bluesky.utils.retry import CircuitBreaker, RetryPolicy
+from saxs_bluesky.utils.throughput import ThroughputMonitor
+from saxs_bluesky.utils.ttl_cache import DEFAULT_TTL, TTLCache
+
 warnings.filterwarnings("ignore")
 
+log = logging.getLogger(__name__)
 
-class BlueAPIPythonClient(BlueapiClient):
-    """A simple BlueAPI client for running bluesky plans."""
+# a busy worker answers with a BlueskyRemoteControlError
+RETRYABLE_ERRORS: tuple[type[Exception], ...] = (
+    BlueskyRemoteControlError,
+    ServiceUnavailableError,
+)
 
-    def __init__(
-        self,
-        beamline: str,
-        blueapi_config_path: str | Path,
-        instrument_session: str,
-        callback: bool = True,
-        timeout: int | float | None = None,
-    ):
-        self.beamline = beamline
-        self.instrument_session = instrument_session
-        self.callback = callback
-        self.retries = 5
-        self.timeout = timeout
 
-        blueapi_config_path = Path(blueapi_config_path)
+def default_retry_policy() -> RetryPolicy:
+    """Retries BlueAPI's errors, stopping for a while after 10 failures"""
+    return RetryPolicy(
+        retry_on=RETRYABLE_ERRORS, breaker=CircuitBreaker(failure_threshold=10)
+    )
 
-        config_loader = ConfigLoader(ApplicationConfig)
-        config_loader.use_values_from_yaml(blueapi_config_path)
-        loaded_config = config_loader.load()
-        blueapi_class = BlueapiClient.from_config(loaded_config)
-        super().__init__(blueapi_class._rest, blueapi_class._events)  # noqa
+
+@functools.cache
+def plan_parameter_names(plan: Callable) -> list[str] | None:
+    """
+    The names of the parameters a plan takes positionally, from its signature.
+    Decorators that use functools.wraps, like validate_call, are seen through.
+    Cached, as it is looked up on every run. None if there is no signature.
+    """
+    try:
+        signature = inspect.signature(plan)
+    except (TypeError, ValueError):
+        return None
+
+    names = []
+    for parameter in signature.parameters.values():
+        if parameter.kind not in (
+            inspect.Parameter.POSITIONAL_ONLY,
+            inspect.Parameter.POSITIONAL_OR_KEYWORD,
+        ):
+            break
+        names.append(parameter.name)
+
+    return names
+
+
+class PlanParamsMixin:
+    """Maps a plan and its args and kwargs onto a BlueAPI TaskRequest"""
+
+    instrument_session: str
+
+    def _server_plan_parameters(self, plan_name: str) -> list[str] | None:
+        """The plan's parameter names from the server's schema, if available"""
+        return None
+
+    def _plan_parameters(self, plan: Callable) -> list[str]:
+        parameters = plan_parameter_names(plan)
+
+        if parameters is None:
+            parameters = self._server_plan_parameters(plan.__name__)
+
+        if parameters is None:
+            raise ValueError(f"Could not find the parameters of {plan.__name__}")
+
+        return parameters
 
     def _convert_args_to_kwargs(self, plan: Callable, args: tuple) -> dict:
-        arg_names = plan.__code__.co_varnames
-        inferred_kwargs = {}
+        arg_names = self._plan_parameters(plan)
+
+        if len(args) > len(arg_names):
+            raise ValueError(
+                f"{plan.__name__} takes {len(arg_names)} positional arguments "
+                f"but {len(args)} were given"
+            )
 
-        for key, val in zip(arg_names, args):  # noqa intentionally not strict
-            inferred_kwargs[key] = val
-        params = inferred_kwargs
-        return params
+        return dict(zip(arg_names, args, strict=False))
 
     def _args_and_kwargs_to_params(
         self, plan: Callable | str, args: tuple, kwargs: dict
@@ -83,32 +143,126 @@ class BlueAPIPythonClient(BlueapiClient):
         else:
             raise ValueError("Could not infer parameters from args and kwargs")
 
-    def run(self, plan: str | Callable, *args, **kwargs):
-        """Run a bluesky plan via BlueAPI."""
-
+    def _plan_name(self, plan: str | Callable) -> str:
         if isinstance(plan, str):
-            plan_name = plan
+            return plan
         elif hasattr(plan, "__name__") and hasattr(plan, "__code__"):
-            plan_name = plan.__name__
+            return plan.__name__
         else:
             raise ValueError("Must be a str or a bluesky plan function")
 
+    def _task_request(
+        self, plan: str | Callable, args: tuple, kwargs: dict
+    ) -> TaskRequest:
+        plan_name = self._plan_name(plan)
         params = self._args_and_kwargs_to_params(plan, args=args, kwargs=kwargs)
 
-        task = TaskRequest(
+        return TaskRequest(
             name=plan_name,
             params=params,
             instrument_session=self.instrument_session,
         )
+
+
+class BlueAPIPythonClient(PlanParamsMixin, BlueapiClient):
+    """A simple BlueAPI client for running bluesky plans."""
+
+    def __init__(
+        self,
+        beamline: str,
+        blueapi_config_path: str | Path,
+        instrument_session: str,
+        callback: bool = True,
+        timeout: int | float | None = None,
+        retry_policy: RetryPolicy | None = None,
+        cache_ttl: float = DEFAULT_TTL,
+        best_effort: bool = True,
+        event_queue_size: int = DEFAULT_QUEUE_SIZE,
+        record_directory: str | Path | None = None,
+    ):
+        self.beamline = beamline
+        self.instrument_session = instrument_session
+        self.callback = callback
+        self.timeout = timeout
+        self.retry_policy = retry_policy or default_retry_policy()
+        self.cache = TTLCache(ttl=cache_ttl)
+        self._detectors: dict[str, StandardReadable] = {}
+        self.best_effort = best_effort
+        self.event_queue_size = event_queue_size
+        self.event_callbacks: list[EventCallback] = []
+        self.event_metrics: dict[str, int] = {}
+        self.throughput = ThroughputMonitor()
+        self.record_directory = record_directory
+
+        blueapi_config_path = Path(blueapi_config_path)
+
+        config_loader = ConfigLoader(ApplicationConfig)
+        config_loader.use_values_from_yaml(blueapi_config_path)
+        loaded_config = config_loader.load()
+        blueapi_class = BlueapiClient.from_config(loaded_config)
+        super().__init__(blueapi_class._rest, blueapi_class._events)  # noqa
+
+    def list_plans(self) -> list[PlanModel]:
+        """The plans available on the server, cached for cache_ttl seconds"""
+        return self.cache.get_or_load("plans", lambda: self.get_plans().plans)
+
+    def list_devices(self) -> list[DeviceModel]:
+        """The devices available on the server, cached for cache_ttl seconds"""
+        return self.cache.get_or_load("devices", lambda: self.get_devices().devices)
+
+    def invalidate_cache(self):
+        """Forget the cached plans, devices and detectors"""
+        self.cache.invalidate()
+        self._detectors.clear()
+
+    def reload_environment(self, *args, **kwargs) -> EnvironmentResponse:
+        """Reload the worker environment, its plans and devices may change"""
+        try:
+            return super().reload_environment(*args, **kwargs)
+        finally:
+            self.invalidate_cache()
+
+    def _server_plan_parameters(self, plan_name: str) -> list[str] | None:
+        try:
+            plans = self.list_plans()
+        except Exception:
+            return None
+
+        for plan in plans:
+            if plan.name == plan_name:
+                return list(plan.parameter_schema.get("properties", {}))
+
+        return None
+
+    def run(self, plan: str | Callable, *args, **kwargs):
+        """Run a bluesky plan via BlueAPI."""
+
+        task = self._task_request(plan, args, kwargs)
+
         if self.callback:
-            self.send_with_callback(plan_name, task)
+            self.send_with_callback(task.name, task)
         else:
-            self.send_without_callback(plan_name, task)
+            self.send_without_callback(task.name, task)
+
+    def batch(self) -> PlanBatch:
+        """
+        Record plan calls to run as a single task, they are submitted when the
+        with block exits or on batch.submit().
+        """
+        return PlanBatch(self)
 
     def return_detectors(self) -> list[StandardReadable]:
-        """Return a list of StandardReadable for the current beamline."""
-        devices = self.get_devices().devices
-        return [inject(d.name) for d in devices]
+        """
+        Return a list of StandardReadable for the current beamline. Each device
+        is only injected the first time it is seen, until the cache is cleared.
+        """
+        detectors = []
+        for device in self.list_devices():
+            if device.name not in self._detectors:
+                self._detectors[device.name] = inject(device.name)
+            detectors.append(self._detectors[device.name])
+
+        return detectors
 
     def change_session(self, new_session: str) -> None:
         """Change the instrument session for the client."""
@@ -116,53 +270,217 @@ class BlueAPIPythonClient(BlueapiClient):
         self.instrument_session = new_session
 
     def show_plans(self):
-        plans = self.get_plans().plans
+        plans = self.list_plans()
         for plan in plans:
             print(plan.name)
         print(f"Total plans: {len(plans)} \n")
 
     def show_devices(self):
-        devices = self.get_devices().devices
+        devices = self.list_devices()
         for dev in devices:
             print(dev.name)
         print(f"Total devices: {len(devices)} \n")
 
-    def send_with_callback(self, plan_name: str, task: TaskRequest):
-        try:
-            progress_bar = CliEventRenderer()
-            callback = BestEffortCallback()
+    def add_event_callback(self, callback: EventCallback):
+        """
+        Add a callback for the events of tasks run with callback=True. Unlike
+        add_callback, it is called from the client's event thread rather than
+        the message bus's, so it can't hold up the events behind it.
+        """
+        self.event_callbacks.append(callback)
+
+    def task_event_callbacks(self) -> list[EventCallback]:
+        """
+        The callbacks for one task's events, a progress bar and live plot,
+        then any added with add_event_callback.
+        """
+        if not self.best_effort:
+            return list(self.event_callbacks)
 
-            def on_event(event: AnyEvent) -> None:
-                if isinstance(event, ProgressEvent):
-                    progress_bar.on_progress_event(event)
-                elif isinstance(event, DataEvent):
-                    callback(event.name, event.doc)
+        progress_bar = CliEventRenderer()
+        callback = BestEffortCallback()
 
-            resp = self.run_task(task, on_event=on_event, timeout=self.timeout)
+        def on_event(event: AnyEvent) -> None:
+            if isinstance(event, ProgressEvent):
+                progress_bar.on_progress_event(event)
+            elif isinstance(event, DataEvent):
+                callback(event.name, event.doc)
 
-            if (
-                (resp.task_status is not None)
-                and (resp.task_status.task_complete)
-                and (not resp.task_status.task_failed)
-            ):
-                print(f"{plan_name} succeeded")
+        return [on_event, *self.event_callbacks]
 
-            return
+    def event_recorder(self, plan_name: str) -> EventRecorder | None:
+        """A recorder for a task's events, if a record_directory is set"""
+        if self.record_directory is None:
+            return None
 
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        return EventRecorder(
+            Path(self.record_directory) / f"{plan_name}_{stamp}.jsonl.gz"
+        )
+
+    def run_task(
+        self,
+        task: TaskRequest,
+        on_event: OnAnyEvent | None = None,
+        timeout: float | None = None,
+    ) -> TaskStatus:
+        """
+        As BlueapiClient.run_task, but creating the task and starting it are
+        each retried with the retry_policy. Nothing after the task has started
+        is retried, as the plan may already have run.
+
+        Args:
+            task: Request for task to run
+            on_event: Callback for each event. Defaults to None.
+            timeout: Time to wait until the task is finished.
+            Defaults to None, so waits forever.
+
+        Returns:
+            TaskStatus: The final status of the task.
+        """
+
+        if self._events is None:
+            raise MissingStompConfigurationError(
+                "Stomp configuration required to run plans is missing or disabled"
+            )
+
+        task_response = self.retry_policy.call(self._rest.create_task, task)
+        task_id = task_response.task_id
+
+        complete: Future[TaskStatus] = Future()
+
+        def inner_on_event(event: AnyEvent, ctx: MessageContext) -> None:
+            match event:
+                case WorkerEvent(task_status=TaskStatus(task_id=test_id)):
+                    relates_to_task = test_id == task_id
+                case ProgressEvent(task_id=test_id):
+                    relates_to_task = test_id == task_id
+                case DataEvent():
+                    relates_to_task = True
+                case _:
+                    relates_to_task = False
+            if relates_to_task:
+                if on_event is not None:
+                    on_event(event)
+                for cb in self._callbacks.values():
+                    try:
+                        cb(event)
+                    except Exception as e:
+                        log.error(
+                            f"Callback ({cb}) failed for event: {event}", exc_info=e
+                        )
+                if (
+                    isinstance(event, WorkerEvent)
+                    and (event.is_complete())
+                    and (ctx.correlation_id == task_id)
+                ):
+                    if event.task_status is None:
+                        complete.set_exception(
+                            BlueskyRemoteControlError(
+                                "Server completed without task status"
+                            )
+                        )
+                    else:
+                        complete.set_result(event.task_status)
+
+        with self._events:
+            self._events.subscribe_to_all_events(inner_on_event)
+            # the same task is started again, so a retry never leaves
+            # another pending task behind on the server
+            self.retry_policy.call(
+                self._rest.update_worker_task, WorkerTask(task_id=task_id)
+            )
+            return complete.result(timeout=timeout)
+
+    def send_with_callback(self, plan_name: str, task: TaskRequest):
+        dispatcher = EventDispatcher(
+            self.task_event_callbacks(), maxsize=self.event_queue_size
+        )
+        recorder = self.event_recorder(plan_name)
+
+        def on_event(event: AnyEvent) -> None:
+            # counted and recorded as they arrive, before any are coalesced
+            # or dropped, so the throughput latency is from the receive time
+            self.throughput(event)
+            if recorder is not None:
+                recorder(event)
+            dispatcher.put(event)
+
+        try:
+            # run_task only retries creating and starting the task
+            with dispatcher:
+                resp = self.run_task(task, on_event=on_event, timeout=self.timeout)
         except Exception as e:
             raise Exception(f"Task could not run: {e}") from e
+        finally:
+            self.event_metrics = dispatcher.metrics.as_dict()
+            if recorder is not None:
+                recorder.close()
+                print(f"Events recorded to {recorder.path}")
+                if recorder.dropped or recorder.errors:
+                    print(
+                        f"{recorder.dropped + recorder.errors} events were not recorded"
+                    )
+
+        # older blueapi returns the final WorkerEvent, newer the TaskStatus
+        task_status = getattr(resp, "task_status", resp)
+
+        if (
+            (task_status is not None)
+            and (task_status.task_complete)
+            and (not task_status.task_failed)
+        ):
+            print(f"{plan_name} succeeded")
+
+        if self.event_metrics["dropped"] or self.event_metrics["late"]:
+            print(
+                f"{self.event_metrics['dropped']} events dropped, "
+                f"{self.event_metrics['late']} handled late"
+            )
+
+    def replay(self, path: str | Path, speed: float | None = 1.0) -> int:
+        """
+        Feed a recorded event stream through the same callbacks as a task run
+        with callback=True.
+
+        Args:
+            path (str | Path): An event log written while record_directory
+                was set.
+            speed (float | None): Multiple of the recorded pace, None to
+                replay as fast as possible.
+        Returns:
+            int: The number of events replayed.
+        """
+        dispatcher = EventDispatcher(
+            self.task_event_callbacks(), maxsize=self.event_queue_size
+        )
+
+        def on_event(event: AnyEvent) -> None:
+            self.throughput(event)
+            dispatcher.put(event)
+
+        try:
+            with dispatcher:
+                count = replay_events(path, on_event, speed=speed)
+        finally:
+            self.event_metrics = dispatcher.metrics.as_dict()
+
+        return count
 
     def send_without_callback(self, plan_name: str, task: TaskRequest):
-        success = False
-
-        for _ in range(self.retries):
-            try:
-                server_task = self.create_and_start_task(task)
-                print(f"{plan_name} task sent as {server_task.task_id}")
-                success = True
-                return
-            except BlueskyRemoteControlError:
-                time.sleep(1)
-
-        if not success:
-            raise Exception("Task could not be executed")
+        try:
+            server_task = self.retry_policy.call(self._rest.create_task, task)
+            # as in run_task, creating and starting are retried separately,
+            # so a busy worker doesn't leave a pending task behind each retry
+            self.retry_policy.call(
+                self._rest.update_worker_task, WorkerTask(task_id=server_task.task_id)
+            )
+        except Exception as e:
+            raise Exception("Task could not be executed") from e
+
+        print(f"{plan_name} task sent as {server_task.task_id}")
+
+    @property
+    def retry_metrics(self) -> dict[str, int]:
+        """Counts of submission attempts, retries and failures"""
+        return self.retry_policy.metrics.as_dict()
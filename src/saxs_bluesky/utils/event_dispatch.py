@@ -0,0 +1,168 @@
+"""
+
+Off-thread handling of BlueAPI events
+
+BlueAPI delivers a task's events on the thread that reads the message bus, so
+anything slow done there, like BestEffortCallback redrawing its plot for every
+event, holds up the events behind it. EventDispatcher puts events on a bounded
+queue instead, and calls the callbacks from a consumer thread.
+
+Only the latest ProgressEvent of each task is worth drawing, so a progress
+event replaces any of the same task still waiting in the queue. If the queue
+is full, event documents are dropped rather than blocking the bus, the start,
+descriptor and stop documents and worker events are always kept. Dropped and
+late events are counted in DispatchMetrics.
+
+"""
+
+import queue
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from blueapi.client.event_bus import AnyEvent
+from blueapi.core import DataEvent
+from blueapi.worker import ProgressEvent
+from dodal.log import LOGGER
+
+from saxs_bluesky.utils.metrics import Counters
+
+EventCallback = Callable[[AnyEvent], Any]
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_LATE_AFTER = 1.0
+
+_STOP = object()
+
+
+class DispatchMetrics(Counters):
+    """Counters of what an EventDispatcher has done, safe to share between threads"""
+
+    FIELDS = (
+        "received",
+        "processed",
+        "coalesced",
+        "dropped",
+        "late",
+        "errors",
+    )
+
+
+class EventDispatcher:
+    """Calls event callbacks from a consumer thread, fed through a bounded queue"""
+
+    def __init__(
+        self,
+        callbacks: list[EventCallback] | None = None,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        late_after: float | None = DEFAULT_LATE_AFTER,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            callbacks (list[EventCallback] | None): Called with each event, in
+                the order given.
+            maxsize (int): Most events waiting in the queue.
+            late_after (float | None): Seconds after which an event handled
+                late is counted as late, None to not count them.
+            clock (Callable[[], float]): Monotonic time source.
+        """
+        self.callbacks = list(callbacks or [])
+        self.late_after = late_after
+        self.clock = clock
+        self.metrics = DispatchMetrics()
+
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._progress: dict[str, ProgressEvent] = {}
+        self._progress_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def add_callback(self, callback: EventCallback):
+        self.callbacks.append(callback)
+
+    def put(self, event: AnyEvent):
+        """Queue an event to be handled, never blocks for event documents"""
+        self.metrics.increment("received")
+
+        if isinstance(event, ProgressEvent):
+            with self._progress_lock:
+                waiting = event.task_id in self._progress
+                self._progress[event.task_id] = event
+
+            if waiting:
+                self.metrics.increment("coalesced")
+                return
+
+            item: Any = event.task_id
+        else:
+            item = event
+
+        if isinstance(event, ProgressEvent) or (
+            isinstance(event, DataEvent) and event.name == "event"
+        ):
+            try:
+                self._queue.put_nowait((self.clock(), item))
+            except queue.Full:
+                self.metrics.increment("dropped")
+                if isinstance(event, ProgressEvent):
+                    with self._progress_lock:
+                        self._progress.pop(event.task_id, None)
+        else:
+            self._queue.put((self.clock(), item))
+
+    def _handle(self, received: float, item: Any):
+        if isinstance(item, str):
+            with self._progress_lock:
+                event = self._progress.pop(item)
+        else:
+            event = item
+
+        if (self.late_after is not None) and (
+            self.clock() - received > self.late_after
+        ):
+            self.metrics.increment("late")
+
+        for callback in self.callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                self.metrics.increment("errors")
+                LOGGER.error(f"Callback ({callback}) failed for event: {event}: {e}")
+
+        self.metrics.increment("processed")
+
+    def _consume(self):
+        while True:
+            received, item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._handle(received, item)
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> "EventDispatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._consume, name="blueapi-events", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def flush(self):
+        """Wait until every queued event has been handled"""
+        self._queue.join()
+
+    def stop(self):
+        """Handle the events already queued, then stop the consumer thread"""
+        if self._thread is not None:
+            self._queue.put((self.clock(), _STOP))
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "EventDispatcher":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
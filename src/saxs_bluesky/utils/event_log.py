@@ -0,0 +1,139 @@
+"""
+
+Record and replay of BlueAPI event streams
+
+EventRecorder writes every event of a task, as it arrives, to gzipped JSON
+lines along with the seconds since the first event. The writing is done by a
+JsonlWriter background thread, as in MessageJournal. replay_events reads such
+a log back and feeds the events to a callback, at the recorded pace, faster,
+or as fast as possible, so callbacks and GUI updates can be profiled offline
+against the events of a real run.
+
+    client.record_directory = Path("/tmp/events")
+    client.run(...)
+    client.replay("/tmp/events/count_20260101-120000.jsonl.gz", speed=10)
+
+"""
+
+import gzip
+import json
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import IO, Any
+
+from blueapi.client.event_bus import AnyEvent
+from blueapi.core import DataEvent
+from blueapi.worker import ProgressEvent, WorkerEvent
+
+from saxs_bluesky.utils.jsonl_writer import DEFAULT_WRITER_QUEUE_SIZE, JsonlWriter
+
+EVENT_TYPES: dict[str, type] = {
+    "WorkerEvent": WorkerEvent,
+    "ProgressEvent": ProgressEvent,
+    "DataEvent": DataEvent,
+}
+
+
+class EventRecorder(JsonlWriter):
+    """
+    Appends events to a gzipped JSON lines log, safe to call from any thread.
+
+    Calling it only puts the event on a queue, a background thread does the
+    encoding, compression and writing, so the message bus thread is never
+    held up by the recording.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        clock: Callable[[], float] = time.monotonic,
+        queue_size: int = DEFAULT_WRITER_QUEUE_SIZE,
+    ):
+        """
+        Args:
+            path (str | Path): The log to write.
+            clock (Callable[[], float]): Monotonic time source.
+            queue_size (int): Most events waiting to be written, beyond which
+                they are dropped rather than holding up the caller.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.clock = clock
+
+        self._start: float | None = None
+        # an empty log, even if no events arrive
+        gzip.open(self.path, "wt", encoding="utf-8").close()
+
+        super().__init__("event-recorder", queue_size=queue_size)
+
+    @property
+    def count(self) -> int:
+        """The number of events written"""
+        return self.written
+
+    def __call__(self, event: AnyEvent):
+        """Queue an event to be written, never blocks"""
+        self.put((self.clock(), event))
+
+    def line(self, record: tuple[float, AnyEvent]) -> dict[str, Any]:
+        received, event = record
+        if self._start is None:
+            self._start = received
+
+        return {
+            "type": type(event).__name__,
+            "event": event.model_dump(mode="json"),
+            "t": received - self._start,
+        }
+
+    def open_file(self, record: tuple[float, AnyEvent]) -> IO[str]:
+        return gzip.open(self.path, "wt", encoding="utf-8")
+
+    def __enter__(self) -> "EventRecorder":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_events(path: str | Path) -> Iterator[tuple[float, AnyEvent]]:
+    """The recorded events, each with its seconds since the first event"""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            record: dict[str, Any] = json.loads(line)
+            event_type = EVENT_TYPES[record["type"]]
+            yield record["t"], event_type.model_validate(record["event"])
+
+
+def replay_events(
+    path: str | Path,
+    on_event: Callable[[AnyEvent], Any],
+    speed: float | None = 1.0,
+    sleep: Callable[[float], Any] = time.sleep,
+    clock: Callable[[], float] = time.monotonic,
+) -> int:
+    """
+    Feed a recorded event stream to on_event.
+
+    Args:
+        path (str | Path): The log written by an EventRecorder.
+        on_event (Callable[[AnyEvent], Any]): Called with each event.
+        speed (float | None): Multiple of the recorded pace, None to replay as
+            fast as possible.
+    Returns:
+        int: The number of events replayed.
+    """
+    start = clock()
+    count = 0
+
+    for offset, event in read_events(path):
+        if speed:
+            delay = offset / speed - (clock() - start)
+            if delay > 0:
+                sleep(delay)
+
+        on_event(event)
+        count += 1
+
+    return count
@@ -0,0 +1,151 @@
+"""
+
+Background writer of gzipped JSON lines
+
+MessageJournal and EventRecorder both keep a log of what they are given
+without holding up the thread giving it to them. JsonlWriter is that part of
+them: put() only queues a record, dropping it if the queue is full, and a
+background thread takes everything waiting, writes it as JSON lines and
+flushes it.
+
+A record that can't be written, eg. one that can't be serialised or a full
+disk, is counted in errors and skipped rather than stopping the thread, and
+the file is always closed when the thread stops, so the gzip stream is
+finished.
+
+"""
+
+import json
+import queue
+import threading
+from typing import IO, Any
+
+from dodal.log import LOGGER
+
+DEFAULT_WRITER_QUEUE_SIZE = 100_000
+
+_STOP = object()
+
+
+class JsonlWriter:
+    """
+    Writes queued records as gzipped JSON lines from a background thread.
+
+    Subclasses set up their own state, then call JsonlWriter.__init__, which
+    starts the thread, and override line and open_file.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        queue_size: int = DEFAULT_WRITER_QUEUE_SIZE,
+        max_file_bytes: int | None = None,
+        flush_interval: float | None = None,
+    ):
+        """
+        Args:
+            name (str): Name of the writer thread.
+            queue_size (int): Most records waiting to be written, beyond which
+                they are dropped rather than holding up the caller.
+            max_file_bytes (int | None): Uncompressed size at which the file
+                is closed, and the next record opens a new one. None for one
+                file.
+            flush_interval (float | None): Most seconds the thread waits for a
+                record before checking the queue again, None to wait forever.
+        """
+        self.max_file_bytes = max_file_bytes
+        self.flush_interval = flush_interval
+
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._file: IO[str] | None = None
+        self._file_bytes = 0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._write_loop, name=name, daemon=True)
+        self._thread.start()
+
+    def line(self, record: Any) -> dict[str, Any]:
+        """The JSON object written for a record"""
+        raise NotImplementedError
+
+    def open_file(self, record: Any) -> IO[str]:
+        """Open the file a record, and those after it, are written to"""
+        raise NotImplementedError
+
+    def put(self, record: Any):
+        """Queue a record to be written, never blocks"""
+        if self._closed:
+            return
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, records: list[Any]):
+        for record in records:
+            try:
+                line = json.dumps(self.line(record)) + "\n"
+                if self._file is None:
+                    self._file = self.open_file(record)
+                    self._file_bytes = 0
+                self._file.write(line)
+            except Exception as e:
+                self.errors += 1
+                LOGGER.error(f"{self._thread.name} could not write {record!r}: {e}")
+                continue
+
+            self.written += 1
+            self._file_bytes += len(line)
+
+            if (self.max_file_bytes is not None) and (
+                self._file_bytes >= self.max_file_bytes
+            ):
+                self._close_file()
+
+        if self._file is not None:
+            self._file.flush()
+
+    def _write_loop(self):
+        try:
+            running = True
+            while running:
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+
+                # take everything waiting, so it is written and flushed together
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                if _STOP in batch:
+                    running = False
+                    batch = [record for record in batch if record is not _STOP]
+
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    self.errors += 1
+                    LOGGER.error(f"{self._thread.name} could not flush: {e}")
+        finally:
+            self._close_file()
+
+    def close(self):
+        """Write the records still queued, then stop the writer thread"""
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
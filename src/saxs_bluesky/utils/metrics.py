@@ -0,0 +1,33 @@
+"""
+
+Thread-safe counters
+
+The retry policy, the event dispatcher and the STOMP listener each count what
+they have done, from more than one thread. Counters is the one implementation
+of that, a subclass only names its fields.
+
+"""
+
+import threading
+
+
+class Counters:
+    """Named counters, safe to share between threads"""
+
+    FIELDS: tuple[str, ...] = ()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = dict.fromkeys(self.FIELDS, 0)
+
+    def increment(self, field: str, count: int = 1):
+        with self._lock:
+            self.counts[field] += count
+
+    def as_dict(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
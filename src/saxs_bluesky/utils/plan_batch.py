@@ -0,0 +1,71 @@
+"""
+
+Client side batching of BlueAPI plan calls
+
+Each BlueAPIPythonClient.run is a separate BlueAPI task, with its own create,
+start and wait round trips. A PlanBatch records a sequence of plan calls and
+submits them as one task to the run_plan_sequence plan, which runs each of
+them in turn on the worker.
+
+    with CLIENT.batch() as batch:
+        for x in xs:
+            batch.run(move, moves={"base.x": x})
+            batch.run(sleep, time=1)
+
+"""
+
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from saxs_bluesky.utils.beamline_client import BlueAPIPythonClient
+
+SEQUENCE_PLAN = "run_plan_sequence"
+
+
+class PlanCall(BaseModel):
+    """A plan name and its parameters, as they would be sent in a TaskRequest"""
+
+    name: str
+    params: dict[str, Any] = {}
+
+
+class PlanBatch:
+    """Records plan calls to submit to BlueAPI as a single task"""
+
+    def __init__(self, client: "BlueAPIPythonClient"):
+        self.client = client
+        self.steps: list[PlanCall] = []
+
+    def run(self, plan: str | Callable, *args, **kwargs) -> "PlanBatch":
+        """Record a plan call, takes the same arguments as the client's run"""
+
+        task = self.client._task_request(plan, args, kwargs)  # noqa
+        self.steps.append(PlanCall(name=task.name, params=dict(task.params)))
+
+        return self
+
+    def submit(self):
+        """Run all the recorded plan calls as one task, then clear them"""
+
+        if not self.steps:
+            return
+
+        steps = [step.model_dump() for step in self.steps]
+        self.steps = []
+
+        print(f"Submitting {len(steps)} plans as one task")
+        self.client.run(SEQUENCE_PLAN, steps=steps)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def __enter__(self) -> "PlanBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        # nothing is sent if the block that recorded the plans failed
+        if exc_type is None:
+            self.submit()
@@ -5,8 +5,8 @@ from pathlib import Path
 import matplotlib.pyplot as plt
 import numpy as np
 
-from saxs_bluesky.utils.ncdcore import NCDCore
 from saxs_bluesky.utils.profile_groups import ExperimentLoader, Profile
+from saxs_bluesky.utils.timeline import Timeline
 
 
 class ProfilePlotter:
@@ -14,75 +14,305 @@ class ProfilePlotter:
     Utility class for plotting pulse signals from a Profile.
     """
 
-    def __init__(self, profile: Profile, pulse_names: list[str] | None = None):
+    def __init__(
+        self,
+        profile: Profile,
+        pulse_names: list[str] | None = None,
+        max_edges: int = 20000,
+        blit: bool = True,
+        repeats: bool = False,
+        experiment: ExperimentLoader | None = None,
+    ):
         """
         Initialize the ProfilePlotter.
 
         Args:
             profile (Profile): The profile to plot.
             pulse_names (list[str] | None): Optional list of pulse names.
+            max_edges (int): The most edges drawn per pulse. If more than this
+                are in view, groups are drawn as envelope blocks instead.
+            blit (bool): Blit edits over a saved background when the backend
+                supports it, rather than redrawing the whole figure.
+            repeats (bool): Plot every repeat of the profile rather than one
+                pass through its groups.
+            experiment (ExperimentLoader | None): Plot every profile of this
+                experiment instead, see from_experiment.
         """
         self.profile = profile
         self.pulse_names = pulse_names
         self.name = "Panda Pulse Signals"
         self.open = False
+        self.max_edges = max_edges
+        self.detailed = True
+        self.use_blit = blit
+        self.default_pulse_names = pulse_names is None
+        self.repeats = repeats
+        self.experiment = experiment
+        self.timeline = self.make_timeline()
 
         if self.pulse_names is None:
             self.pulse_names = [
-                f"Seq Pulse {f}" for f in range(len(self.profile.active_pulses))
+                f"Seq Pulse {f}" for f in range(len(self.timeline.active_pulses))
             ]
 
         self.setup_figure()
 
+    @staticmethod
+    def generate_pulse_signals(
+        profile: Profile, pulses: list[int]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Generate the step signals of several pulses in one pass, for one pass
+        through the profile's groups.
+
+        Each frame of a group is a wait step followed by a run step, so the
+        per-group wait/run durations and levels are repeated by the number of
+        frames and the edge times are their cumulative sum. The python work
+        scales with the number of groups rather than the number of frames.
+
+        Args:
+            profile (Profile): The profile to generate signals for.
+            pulses (list[int]): 0-based indices of the pulses.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The edge times, shape (2 * frames + 2,)
+            and the signal of each pulse, shape (len(pulses), 2 * frames + 2).
+        """
+        return Timeline.from_profile(profile, repeats=False).signals(pulses)
+
     @staticmethod
     def generate_pulse_signal(
         profile: Profile, pulse: int
     ) -> tuple[np.ndarray, np.ndarray]:
-        current_time = 0.0
-        trigger_time = [current_time]
-        signal = [0]  # starts low and ends low
+        trigger_time, signals = ProfilePlotter.generate_pulse_signals(profile, [pulse])
+
+        return trigger_time, signals[0]
+
+    @staticmethod
+    def group_times(profile: Profile) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the start time of each group, with the end of the last group
+        appended, and the wait and run times of a frame in each group.
+        """
+        timeline = Timeline.from_profile(profile, repeats=False)
+
+        return timeline.starts, timeline.wait_s, timeline.run_s
+
+    @staticmethod
+    def visible_frames(
+        profile: Profile, start: float, stop: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns, for each group, the index of the first frame and one past
+        the last frame that overlap the time range start to stop.
+        """
+        timeline = Timeline.from_profile(profile, repeats=False)
+
+        return timeline.visible_frames(start, stop)
+
+    @staticmethod
+    def generate_pulse_signals_in_range(
+        profile: Profile, pulses: list[int], start: float, stop: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Generate the step signals of several pulses, only for the frames that
+        overlap the time range start to stop, so zooming in on a huge profile
+        only builds the edges that can be seen.
 
-        for group in profile.groups:
-            wait_active = group.wait_pulses[pulse]
-            run_active = group.run_pulses[pulse]
+        Returns:
+            tuple[np.ndarray, np.ndarray]: As generate_pulse_signals, but
+            starting from the first visible frame.
+        """
+        timeline = Timeline.from_profile(profile, repeats=False)
 
-            for _frame in range(group.frames):
-                current_time += group.wait_time * NCDCore.to_seconds(group.wait_units)
-                trigger_time.append(current_time)
-                signal.append(wait_active)
+        return timeline.signals_in_range(pulses, start, stop)
 
-                current_time += group.run_time * NCDCore.to_seconds(group.run_units)
-                trigger_time.append(current_time)
-                signal.append(run_active)
+    @staticmethod
+    def generate_pulse_envelopes(
+        profile: Profile, pulses: list[int]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Generate a run-length envelope of several pulses, one step per group
+        rather than two per frame. A pulse that toggles within a group is
+        drawn as a block between its wait and run levels.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: The group edge times and
+            the lower and upper level of each pulse in each group.
+        """
+        return Timeline.from_profile(profile, repeats=False).envelopes(pulses)
 
-        trigger_time.append(current_time + (current_time) / 10)
-        signal.append(0)  # starts low and ends low
+    @classmethod
+    def from_experiment(
+        cls, experiment: ExperimentLoader, **kwargs
+    ) -> "ProfilePlotter":
+        """
+        A plotter of every profile of an experiment, with all their repeats,
+        one after another.
+        """
+        return cls(experiment.profiles[0], experiment=experiment, **kwargs)
 
-        trigger_time = np.asarray(trigger_time)
-        signal = np.asarray(signal)
+    def make_timeline(self) -> Timeline:
+        if self.experiment is not None:
+            return Timeline.from_experiment(self.experiment)
 
-        return trigger_time, signal
+        return Timeline.from_profile(self.profile, repeats=self.repeats)
 
     def plot_pulses(self):
         """
         Plot the pulse signals for all active pulses in the profile.
+
+        Each frame's edges are drawn only when fewer than max_edges are in
+        view, otherwise groups are drawn as envelope blocks. The view is
+        redrawn on zoom and pan.
+
+        The line artists are kept between calls and updated in place, the
+        figure is only rebuilt when the number of active pulses changes.
         """
-        # if len(self.profile.active_pulses) != len(self.axes):
-        #     plt.close()
-        #     self.setup_figure()
+        self.timeline = self.make_timeline()
+        pulses = [i - 1 for i in self.timeline.active_pulses]
+
+        if len(pulses) == 0:
+            self.clear_artists()
+            self.fig.canvas.draw_idle()
+            return
 
-        if len(self.profile.active_pulses) > 0:
-            for n, i in enumerate(self.profile.active_pulses):
-                trigger_time, signal = ProfilePlotter.generate_pulse_signal(
-                    self.profile, i - 1
-                )
+        if len(pulses) != len(self.axes):
+            self.rebuild_figure()
 
-                if self.axes[n].has_data():
-                    self.axes[n].clear()
+        self.pulses = pulses
+        self.envelope_data = self.timeline.envelopes(self.pulses)
+        envelope_time, _, _ = self.envelope_data
+
+        if not self.lines:
+            self.create_artists()
+        else:
+            self.update_envelopes()
+
+        if tuple(self.axes[0].get_xlim()) != (envelope_time[0], envelope_time[-1]):
+            # calls redraw_visible and a full draw through on_xlim_changed
+            self.axes[0].set_xlim(envelope_time[0], envelope_time[-1])
+        else:
+            self.redraw_visible()
+            self.refresh()
+
+    def create_artists(self):
+        """
+        Create the envelope and line artists for each pulse, these are kept
+        and updated by plot_pulses rather than clearing the axes.
+        """
+        envelope_time, lower, upper = self.envelope_data
 
-                self.axes[n].step(trigger_time, signal)
-                self.axes[n].set_ylabel(f"{self.pulse_names[n]} Signal")  # type: ignore
+        self.lines = []
+        self.envelopes = []
 
+        for n, ax in enumerate(self.axes):
+            envelope = ax.fill_between(
+                envelope_time,
+                lower[n],
+                upper[n],
+                step="pre",
+                alpha=0.5,
+                animated=self.blit,
+            )
+            (line,) = ax.plot([], [], drawstyle="steps-pre", animated=self.blit)
+
+            self.envelopes.append(envelope)
+            self.lines.append(line)
+            ax.set_ylim(-0.1, 1.1)
+            ax.set_ylabel(f"{self.pulse_names[n]} Signal")  # type: ignore
+
+        # the x axis is shared, so one callback sees every zoom and pan
+        self.axes[0].callbacks.connect("xlim_changed", self.on_xlim_changed)
+
+    def clear_artists(self):
+        """
+        Empty the lines and hide the envelopes, so the previous profile's
+        pulses are not left on screen when no pulses are active.
+        """
+        self.pulses = []
+
+        for line, envelope in zip(self.lines, self.envelopes, strict=True):
+            line.set_data([], [])
+            envelope.set_visible(False)
+
+    def update_envelopes(self):
+        """Replace the envelope blocks, there is one polygon per group"""
+        envelope_time, lower, upper = self.envelope_data
+
+        for n, ax in enumerate(self.axes):
+            self.envelopes[n].remove()
+            self.envelopes[n] = ax.fill_between(
+                envelope_time,
+                lower[n],
+                upper[n],
+                step="pre",
+                alpha=0.5,
+                animated=self.blit,
+            )
+
+    def redraw_visible(self):
+        """
+        Redraw the pulses for the current x range, as individual edges if
+        there are few enough in view, otherwise as group envelopes.
+        """
+        start, stop = self.axes[0].get_xlim()
+        first, last = self.timeline.visible_frames(start, stop)
+
+        self.detailed = 2 * int(np.sum(last - first)) <= self.max_edges
+
+        if self.detailed:
+            trigger_time, signals = self.timeline.signals_in_range(
+                self.pulses, start, stop
+            )
+        else:
+            trigger_time, _, signals = self.envelope_data
+
+        for line, envelope, signal in zip(
+            self.lines, self.envelopes, signals, strict=True
+        ):
+            line.set_data(trigger_time, signal)
+            envelope.set_visible(not self.detailed)
+
+    def refresh(self):
+        """
+        Show updated artists, by blitting them over the saved background when
+        the backend supports it, otherwise with a full redraw.
+        """
+        if self.blit and (self.background is not None):
+            canvas = self.fig.canvas
+            canvas.restore_region(self.background)
+            self.draw_animated()
+            canvas.blit(self.fig.bbox)
+            canvas.flush_events()
+        else:
+            self.fig.canvas.draw_idle()
+
+    def draw_animated(self):
+        for ax, line, envelope in zip(
+            self.axes, self.lines, self.envelopes, strict=True
+        ):
+            ax.draw_artist(envelope)
+            ax.draw_artist(line)
+
+    def on_draw(self, event):
+        """
+        Callback for full draws, saves the background without the animated
+        artists so later updates can be blitted over it.
+        """
+        if self.blit:
+            self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+            if self.lines:
+                self.draw_animated()
+
+    def on_xlim_changed(self, ax):
+        """
+        Callback for zoom and pan, recomputes what is drawn for the new range.
+        """
+        if not self.pulses:
+            return
+
+        self.redraw_visible()
         self.fig.canvas.draw_idle()
 
     def on_close(self, event):
@@ -106,19 +336,54 @@ class ProfilePlotter:
         plt.xlabel("Time (s)")
         plt.show(block=block)
 
+    def update_profile(self, profile: Profile):
+        """
+        Replot for an edited profile, updating the existing figure in place.
+        """
+        self.profile = profile
+        self.plot_pulses()
+
+    def rebuild_figure(self):
+        """
+        Close the figure and make a new one, for when the number of active
+        pulses, and so the number of axes, has changed.
+        """
+        self.fig.canvas.mpl_disconnect(self.close_cid)
+        plt.close(self.fig)
+
+        if self.default_pulse_names:
+            self.pulse_names = [
+                f"Seq Pulse {f}" for f in range(len(self.timeline.active_pulses))
+            ]
+
+        self.setup_figure()
+
+        if self.open:
+            self.show(block=False)
+
     def setup_figure(self):
         """
         Set up the matplotlib figure and axes for plotting.
         """
-        self.fig, self.axes = plt.subplots(
-            len(self.profile.active_pulses),
+        n_pulses = max(len(self.timeline.active_pulses), 1)
+
+        self.fig, axes = plt.subplots(
+            n_pulses,
             1,
             sharex=True,
-            figsize=(8, len(self.profile.active_pulses) * 3),
+            figsize=(8, n_pulses * 3),
             num=self.name,
+            squeeze=False,
         )
+        self.axes = axes[:, 0]
+        self.pulses = []
+        self.lines = []
+        self.envelopes = []
+        self.background = None
+        self.blit = self.use_blit and self.fig.canvas.supports_blit
 
-        self.fig.canvas.mpl_connect("close_event", self.on_close)
+        self.close_cid = self.fig.canvas.mpl_connect("close_event", self.on_close)
+        self.fig.canvas.mpl_connect("draw_event", self.on_draw)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+"""
+
+Headless rendering of profile timing diagrams
+
+ProfilePlotter draws into an interactive pyplot window. Here profiles are drawn
+onto plain Agg figures, without pyplot or a display, so timing diagrams can be
+written to png/svg for run metadata and logbooks. Each profile of an
+ExperimentLoader is rendered in its own worker process.
+
+The signals come straight from a Timeline rather than through ProfilePlotter,
+so neither this module nor its workers import matplotlib.pyplot.
+
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from saxs_bluesky.utils.profile_groups import ExperimentLoader, Profile
+from saxs_bluesky.utils.timeline import Timeline
+
+RENDER_FORMATS = ("png", "svg")
+
+
+def render_profile(
+    profile: Profile,
+    path: str | Path,
+    pulse_names: list[str] | None = None,
+    title: str | None = None,
+    max_edges: int = 20000,
+    dpi: int = 100,
+) -> Path:
+    """
+    Render the timing diagram of a profile to a file, the format is taken from
+    the file suffix.
+
+    Args:
+        profile (Profile): The profile to render.
+        path (str | Path): The png or svg file to write.
+        pulse_names (list[str] | None): Optional list of pulse names.
+        title (str | None): Optional figure title.
+        max_edges (int): The most edges drawn per pulse. Larger profiles are
+            drawn as group envelope blocks, as in ProfilePlotter.
+        dpi (int): Resolution of png files.
+
+    Returns:
+        Path: The file written.
+    """
+    path = Path(path)
+
+    if path.suffix.lstrip(".") not in RENDER_FORMATS:
+        raise ValueError(f"Can only render to {RENDER_FORMATS}, not {path.name}")
+
+    pulses = [i - 1 for i in profile.active_pulses]
+    timeline = Timeline.from_profile(profile, repeats=False)
+
+    if pulse_names is None:
+        pulse_names = [f"Seq Pulse {f}" for f in range(len(pulses))]
+
+    fig = Figure(figsize=(8, max(len(pulses), 1) * 3))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(max(len(pulses), 1), 1, sharex=True, squeeze=False)[:, 0]
+
+    if pulses and (2 * profile.total_frames <= max_edges):
+        trigger_time, signals = timeline.signals(pulses)
+        for ax, signal in zip(axes, signals, strict=False):
+            ax.plot(trigger_time, signal, drawstyle="steps-pre")
+    elif pulses:
+        trigger_time, lower, upper = timeline.envelopes(pulses)
+        for n, ax in enumerate(axes):
+            ax.fill_between(trigger_time, lower[n], upper[n], step="pre", alpha=0.5)
+            ax.plot(trigger_time, upper[n], drawstyle="steps-pre")
+
+    for n, ax in enumerate(axes[: len(pulses)]):
+        ax.set_ylim(-0.1, 1.1)
+        ax.set_ylabel(f"{pulse_names[n]} Signal")
+
+    axes[-1].set_xlabel("Time (s)")
+
+    if title is not None:
+        fig.suptitle(title)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(path, dpi=dpi)
+
+    return path
+
+
+def render_experiment(
+    experiment: ExperimentLoader,
+    directory: str | Path,
+    fmt: str = "png",
+    pulse_names: list[str] | None = None,
+    max_workers: int | None = None,
+    max_edges: int = 20000,
+) -> list[Path]:
+    """
+    Render every profile of an experiment to directory/profile_<n>.<fmt>, in
+    parallel worker processes.
+
+    Args:
+        experiment (ExperimentLoader): The experiment to render.
+        directory (str | Path): Where to write the diagrams.
+        fmt (str): png or svg.
+        pulse_names (list[str] | None): Optional list of pulse names.
+        max_workers (int | None): Number of worker processes, all cores if None.
+            With 1 the profiles are rendered in this process.
+        max_edges (int): The most edges drawn per pulse.
+
+    Returns:
+        list[Path]: The file written for each profile, in order.
+    """
+    directory = Path(directory)
+
+    jobs = [
+        (
+            profile,
+            directory / f"profile_{n}.{fmt}",
+            pulse_names,
+            f"{experiment.instrument} Profile {n}",
+            max_edges,
+        )
+        for n, profile in enumerate(experiment.profiles)
+    ]
+
+    if max_workers == 1:
+        return [render_profile(*job) for job in jobs]
+
+    # spawn rather than fork, the GUI and STOMP listeners run threads
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = [executor.submit(render_profile, *job) for job in jobs]
+        return [future.result() for future in futures]
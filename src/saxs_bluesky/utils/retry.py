@@ -0,0 +1,211 @@
+"""
+
+Retry policy for BlueAPI task submission
+
+Retries back off exponentially with jitter, so clients that failed together
+don't all retry together, and give up at an overall deadline. A circuit
+breaker stops submitting for a while after repeated failures, rather than
+adding load to a worker that is already struggling. Counts of attempts,
+retries and failures are kept in RetryMetrics.
+
+Which errors are worth retrying depends on what is being called, so they are
+given by the caller, eg. BlueAPI's errors in the beamline client and STOMP's
+connection errors in the messenger.
+
+"""
+
+import random
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+from saxs_bluesky.utils.metrics import Counters
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling while the circuit breaker is open"""
+
+    pass
+
+
+class RetryMetrics(Counters):
+    """Counters of what a RetryPolicy has done, safe to share between threads"""
+
+    FIELDS = (
+        "calls",
+        "attempts",
+        "retries",
+        "successes",
+        "failures",
+        "rejected",
+        "circuit_opened",
+    )
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failed calls. While open, calls
+    are rejected until reset_timeout has passed, then one trial call is let
+    through (half open) which closes the circuit if it succeeds. Other calls
+    are rejected until the trial has finished.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CircuitBreaker.CLOSED
+        elif self.clock() - self.opened_at >= self.reset_timeout:
+            return CircuitBreaker.HALF_OPEN
+        return CircuitBreaker.OPEN
+
+    def allow(self) -> bool:
+        """True if a call may be made, which is the trial call if half open"""
+        with self._lock:
+            state = self.state
+            if state == CircuitBreaker.HALF_OPEN:
+                if self._trial:
+                    return False
+                self._trial = True
+            return state != CircuitBreaker.OPEN
+
+    def release(self):
+        """End a call that neither succeeded nor failed, eg. had bad params"""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self._trial = False
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> bool:
+        """Returns True if this failure opened the circuit"""
+        with self._lock:
+            self._trial = False
+            half_open = self.state == CircuitBreaker.HALF_OPEN
+            self.failures += 1
+
+            if half_open or (self.failures >= self.failure_threshold):
+                was_closed = self.opened_at is None
+                self.opened_at = self.clock()
+                return was_closed
+            return False
+
+
+class RetryPolicy:
+    """Calls a function, retrying on retryable errors with backoff and jitter"""
+
+    def __init__(
+        self,
+        retry_on: tuple[type[Exception], ...],
+        max_attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 10,
+        multiplier: float = 2,
+        jitter: float = 0.5,
+        deadline: float | None = 60,
+        breaker: CircuitBreaker | None = None,
+        sleep: Callable[[float], Any] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            retry_on (tuple[type[Exception], ...]): Errors that are retried,
+                anything else is raised straight away.
+            max_attempts (int): Most calls made, including the first.
+            base_delay (float): Seconds to wait before the first retry.
+            max_delay (float): Longest wait between attempts.
+            multiplier (float): Growth of the wait after each retry.
+            jitter (float): Fraction of each wait that is randomised, 0 to 1.
+            deadline (float | None): Seconds after which no more retries are
+                started, None for no deadline.
+            breaker (CircuitBreaker | None): Optional circuit breaker, may be
+                shared between policies.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retry_on = retry_on
+        self.breaker = breaker
+        self.sleep = sleep
+        self.clock = clock
+        self.metrics = RetryMetrics()
+
+    def backoff(self, retry: int) -> float:
+        """The wait before the nth retry, counting from 0"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier**retry)
+        return delay * (1 - self.jitter * random.random())
+
+    def call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        self.metrics.increment("calls")
+        start = self.clock()
+
+        for attempt in range(self.max_attempts):
+            if (self.breaker is not None) and not self.breaker.allow():
+                self.metrics.increment("rejected")
+                raise CircuitOpenError(
+                    "Too many failed submissions to BlueAPI, not trying again "
+                    f"for up to {self.breaker.reset_timeout} s"
+                )
+
+            self.metrics.increment("attempts")
+
+            try:
+                result = func(*args, **kwargs)
+            except self.retry_on as e:
+                error = e
+                if (self.breaker is not None) and self.breaker.record_failure():
+                    self.metrics.increment("circuit_opened")
+            except Exception:
+                # not retried, nor counted against the server by the breaker
+                if self.breaker is not None:
+                    self.breaker.release()
+                self.metrics.increment("failures")
+                raise
+            else:
+                if self.breaker is not None:
+                    self.breaker.record_success()
+                self.metrics.increment("successes")
+                return result
+
+            delay = self.backoff(attempt)
+            out_of_time = (self.deadline is not None) and (
+                self.clock() - start + delay > self.deadline
+            )
+            circuit_open = (self.breaker is not None) and (
+                self.breaker.state == CircuitBreaker.OPEN
+            )
+
+            if (attempt == self.max_attempts - 1) or out_of_time or circuit_open:
+                break
+
+            self.metrics.increment("retries")
+            self.sleep(delay)
+
+        self.metrics.increment("failures")
+        raise error
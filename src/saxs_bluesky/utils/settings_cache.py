@@ -0,0 +1,92 @@
+"""
+
+Process-wide cache of parsed PandA settings yamls
+
+Parsing a ~900 line settings yaml takes ~100ms. Within one worker session the
+same yaml is loaded on every force_load, so the parsed settings are kept in
+memory, keyed by the path and the file's mtime and size so that an edited or
+re-saved file is parsed again.
+
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from ophyd_async.core import YamlSettingsProvider
+
+DEFAULT_CACHE_SIZE = 16
+
+
+class SettingsCache:
+    """A size-bounded, least recently used cache of parsed settings dicts"""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path: str | Path) -> tuple:
+        path = Path(path).resolve()
+        stat = path.stat()
+        return (str(path), stat.st_mtime_ns, stat.st_size)
+
+    def get(self, key: tuple) -> dict[str, Any] | None:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: tuple, settings: dict[str, Any]):
+        with self._lock:
+            # drop stale entries for the same path, they can never be hit again
+            for stale in [k for k in self._entries if k[0] == key[0]]:
+                del self._entries[stale]
+
+            self._entries[key] = settings
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+SETTINGS_CACHE = SettingsCache()
+
+
+class CachedYamlSettingsProvider(YamlSettingsProvider):
+    """
+    A YamlSettingsProvider that only parses each yaml once per process,
+    until the file changes. A deep copy is returned so callers can't alter the
+    cached settings, including nested values such as seq tables.
+    """
+
+    def __init__(self, directory: Path | str, cache: SettingsCache = SETTINGS_CACHE):
+        super().__init__(directory)
+        self.cache = cache
+
+    async def retrieve(self, name: str) -> dict[str, Any]:
+        key = self.cache.key(self._file_path(name))
+        settings = self.cache.get(key)
+
+        if settings is None:
+            settings = await super().retrieve(name)
+            self.cache.put(key, settings)
+
+        return copy.deepcopy(settings)
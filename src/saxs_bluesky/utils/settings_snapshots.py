@@ -0,0 +1,215 @@
+"""
+
+Delta-compressed snapshots of ophyd async device settings
+
+A snapshot of a device is stored as the keys that changed since the previous
+snapshot of that device, rather than another full ~900 line yaml. The full
+settings are rebuilt by walking back along the parents to the last keyframe.
+
+"""
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import yaml
+from ophyd_async.core import SettingsProvider
+from pydantic import BaseModel
+
+SNAPSHOT_SUFFIX = ".yaml"
+
+
+def settings_to_plain(value: Any) -> Any:
+    """
+    Convert the values read from ophyd async signals (numpy arrays, enums,
+    tables) into plain python types that can be compared and safely dumped.
+    """
+
+    if isinstance(value, dict):
+        return {str(k): settings_to_plain(v) for k, v in value.items()}
+    elif isinstance(value, list | tuple):
+        return [settings_to_plain(v) for v in value]
+    elif isinstance(value, np.ndarray):
+        return settings_to_plain(value.tolist())
+    elif isinstance(value, np.generic):
+        return value.item()
+    elif isinstance(value, BaseModel):
+        return settings_to_plain(value.model_dump(mode="python"))
+    elif isinstance(value, Enum):
+        return settings_to_plain(value.value)
+    else:
+        return value
+
+
+def diff_settings(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """
+    Returns the delta that turns old into new, as a dict of the changed or
+    added keys and a list of the removed keys.
+    """
+
+    changed = {key: value for key, value in new.items() if old.get(key) != value}
+    changed.update({key: new[key] for key in new.keys() - old.keys()})
+    removed = sorted(old.keys() - new.keys())
+
+    return {"changed": changed, "removed": removed}
+
+
+def apply_settings_delta(
+    settings: dict[str, Any], delta: dict[str, Any]
+) -> dict[str, Any]:
+    """Returns a new settings dict with the delta from diff_settings applied"""
+
+    applied = dict(settings)
+    applied.update(delta.get("changed", {}))
+
+    for key in delta.get("removed", []):
+        applied.pop(key, None)
+
+    return applied
+
+
+_last_snapshot_time = datetime.min
+_snapshot_id_lock = threading.Lock()
+
+
+def new_snapshot_id() -> str:
+    """
+    Snapshot ids are timestamps down to the microsecond, so sorting them sorts
+    them in time. Ids made by this process never repeat, even within the same
+    microsecond.
+    """
+
+    global _last_snapshot_time
+
+    with _snapshot_id_lock:
+        now = max(datetime.now(), _last_snapshot_time + timedelta(microseconds=1))
+        _last_snapshot_time = now
+
+    return now.strftime("%Y-%m-%dT%H%M%S.%f")
+
+
+class DeltaSnapshotProvider(SettingsProvider):
+    """
+    A SettingsProvider that stores each device's settings as a delta against
+    the previous snapshot of the same device.
+
+    Snapshots are laid out as directory/<device name>/<snapshot id>.yaml. Every
+    keyframe_interval snapshots the full settings are written again so that
+    rebuilding a snapshot never has to walk an arbitrarily long chain.
+
+    It can be used with the ophyd async store_settings and retrieve_settings
+    plan stubs. retrieve returns the snapshot_id snapshot if one was given,
+    otherwise the latest.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        snapshot_id: str | None = None,
+        keyframe_interval: int = 50,
+    ):
+        self.directory = Path(directory)
+        self.snapshot_id = new_snapshot_id() if snapshot_id is None else snapshot_id
+        self.keyframe_interval = keyframe_interval
+
+    def _device_dir(self, name: str) -> Path:
+        return self.directory / name
+
+    def snapshot_ids(self, name: str) -> list[str]:
+        """Returns the ids of all snapshots of a device, oldest first"""
+
+        device_dir = self._device_dir(name)
+
+        if not device_dir.is_dir():
+            return []
+
+        return sorted(f.stem for f in device_dir.glob(f"*{SNAPSHOT_SUFFIX}"))
+
+    def _read_record(self, name: str, snapshot_id: str) -> dict[str, Any]:
+        snapshot_path = self._device_dir(name) / f"{snapshot_id}{SNAPSHOT_SUFFIX}"
+
+        with open(snapshot_path) as file:
+            return yaml.safe_load(file)
+
+    def _read_chain(self, name: str, snapshot_id: str) -> list[dict[str, Any]]:
+        """Returns the records from snapshot_id back to its keyframe, newest first"""
+
+        record = self._read_record(name, snapshot_id)
+        chain = [record]
+
+        while record["parent"] is not None:
+            record = self._read_record(name, record["parent"])
+            chain.append(record)
+
+        return chain
+
+    @staticmethod
+    def _rebuild(chain: list[dict[str, Any]]) -> dict[str, Any]:
+        settings = {}
+        for record in reversed(chain):
+            settings = apply_settings_delta(settings, record)
+
+        return settings
+
+    def load(self, name: str, snapshot_id: str | None = None) -> dict[str, Any]:
+        """Rebuild the full settings of a device at the given snapshot"""
+
+        if snapshot_id is None:
+            ids = self.snapshot_ids(name)
+            if not ids:
+                raise FileNotFoundError(f"No snapshots of {name} in {self.directory}")
+            snapshot_id = ids[-1]
+
+        return self._rebuild(self._read_chain(name, snapshot_id))
+
+    def save(self, name: str, settings: dict[str, Any]) -> Path:
+        """
+        Store the settings of a device under this provider's snapshot id,
+        as a delta against the latest existing snapshot of the device.
+
+        Raises FileExistsError if the device already has a snapshot with this
+        id, as overwriting it would break the parent chain of later snapshots.
+        """
+
+        device_dir = self._device_dir(name)
+        snapshot_path = device_dir / f"{self.snapshot_id}{SNAPSHOT_SUFFIX}"
+
+        if snapshot_path.exists():
+            raise FileExistsError(
+                f"Snapshot {self.snapshot_id} of {name} already exists"
+            )
+
+        settings = settings_to_plain(settings)
+        previous_ids = [i for i in self.snapshot_ids(name) if i < self.snapshot_id]
+
+        parent = previous_ids[-1] if previous_ids else None
+
+        chain = self._read_chain(name, parent) if parent is not None else []
+
+        if (not chain) or (len(chain) >= self.keyframe_interval):
+            record = {"parent": None, **diff_settings({}, settings)}
+        else:
+            previous = self._rebuild(chain)
+            record = {"parent": parent, **diff_settings(previous, settings)}
+
+        device_dir.mkdir(parents=True, exist_ok=True)
+
+        # "x" so that a snapshot written in the meantime is never overwritten
+        with open(snapshot_path, "x") as file:
+            yaml.safe_dump(record, file, default_flow_style=None)
+
+        return snapshot_path
+
+    async def store(self, name: str, data: dict[str, Any]):
+        # each device writes to its own directory, so saves can run in parallel
+        await asyncio.to_thread(self.save, name, data)
+
+    async def retrieve(self, name: str) -> dict[str, Any]:
+        if self.snapshot_id in self.snapshot_ids(name):
+            return self.load(name, self.snapshot_id)
+        else:
+            return self.load(name)
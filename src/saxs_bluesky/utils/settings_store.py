@@ -0,0 +1,199 @@
+"""
+
+Content-addressed base + overlay store for PandA settings
+
+Most of the PandA settings yamls are the same ~900 keys with a handful of
+lut/seq/pulse keys changed. Here a mode is stored as a reference to a base
+snapshot, kept once by the hash of its contents, plus a small overlay of the
+keys that differ from it.
+
+store_dir/
+    objects/<sha256>.json   full base settings, named by their hash
+    modes.yaml              mode name -> base hash + overlay
+
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any
+
+import yaml
+from ophyd_async.core import SettingsProvider
+
+from saxs_bluesky.utils.settings_snapshots import (
+    apply_settings_delta,
+    diff_settings,
+    settings_to_plain,
+)
+
+MODES_FILE = "modes.yaml"
+OBJECTS_DIR = "objects"
+
+
+def settings_digest(settings: dict[str, Any]) -> str:
+    """Returns the sha256 of the canonical json of the settings"""
+
+    canonical = json.dumps(settings, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class SettingsStore(SettingsProvider):
+    """
+    Stores PandA settings modes as a content-addressed base plus an overlay.
+
+    Bases are parsed once and kept in memory, so resolving a mode is a dict
+    copy and update. Diffing two modes on the same base only compares the
+    keys in their overlays.
+
+    It is an ophyd async SettingsProvider, so it can be passed to
+    retrieve_settings/store_settings, or a mode can be exported as a full yaml
+    for YamlSettingsProvider.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self._bases: dict[str, dict[str, Any]] = {}
+        self.modes: dict[str, dict[str, Any]] = {}
+
+        modes_path = self.directory / MODES_FILE
+        if modes_path.exists():
+            with open(modes_path) as file:
+                self.modes = yaml.safe_load(file) or {}
+
+    @classmethod
+    def from_yaml_files(
+        cls,
+        directory: str | Path,
+        yaml_files: dict[str, str | Path],
+        base: str | None = None,
+    ) -> "SettingsStore":
+        """
+        Build a store from existing full settings yamls, eg. the files in
+        ophyd_panda_yamls. The base is the first mode unless one is named.
+        """
+
+        store = cls(directory)
+        all_settings = {}
+
+        for mode, yaml_file in yaml_files.items():
+            with open(yaml_file) as file:
+                all_settings[mode] = yaml.safe_load(file)
+
+        base_mode = base if base is not None else next(iter(all_settings))
+        base_digest = store.add_base(all_settings[base_mode])
+
+        for mode, settings in all_settings.items():
+            store.add_mode(mode, settings, base=base_digest)
+
+        return store
+
+    def _object_path(self, digest: str) -> Path:
+        return self.directory / OBJECTS_DIR / f"{digest}.json"
+
+    def _write_modes(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / MODES_FILE, "w") as file:
+            yaml.safe_dump(self.modes, file, default_flow_style=None)
+
+    def get_base(self, digest: str) -> dict[str, Any]:
+        if digest not in self._bases:
+            with open(self._object_path(digest)) as file:
+                self._bases[digest] = json.load(file)
+
+        return self._bases[digest]
+
+    def add_base(self, settings: dict[str, Any]) -> str:
+        """Store a full set of settings as a base and return its hash"""
+
+        settings = settings_to_plain(settings)
+        digest = settings_digest(settings)
+        object_path = self._object_path(digest)
+
+        if not object_path.exists():
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(object_path, "w") as file:
+                json.dump(settings, file, sort_keys=True)
+
+        self._bases[digest] = settings
+
+        return digest
+
+    @property
+    def bases(self) -> set[str]:
+        return {mode["base"] for mode in self.modes.values()}
+
+    def add_mode(
+        self, name: str, settings: dict[str, Any], base: str | None = None
+    ) -> dict[str, Any]:
+        """
+        Store settings as a mode. base can be a base hash or the name of another
+        mode whose base should be used. If not given, the existing base that
+        gives the smallest overlay is used, or the settings become a new base.
+        """
+
+        settings = settings_to_plain(settings)
+
+        if base in self.modes:
+            base = self.modes[base]["base"]
+        elif (base is None) and self.bases:
+            base = min(
+                self.bases,
+                key=lambda b: len(diff_settings(self.get_base(b), settings)["changed"]),
+            )
+        elif base is None:
+            base = self.add_base(settings)
+
+        overlay = diff_settings(self.get_base(base), settings)
+        self.modes[name] = {"base": base, **overlay}
+        self._write_modes()
+
+        return self.modes[name]
+
+    def delete_mode(self, name: str):
+        self.modes.pop(name)
+        self._write_modes()
+
+    def resolve(self, name: str) -> dict[str, Any]:
+        """Returns the full settings of a mode"""
+
+        if name not in self.modes:
+            raise KeyError(f"{name} is not a mode in {self.directory}")
+
+        mode = self.modes[name]
+        return apply_settings_delta(self.get_base(mode["base"]), mode)
+
+    def diff(self, mode_a: str, mode_b: str) -> dict[str, Any]:
+        """Returns the delta that turns mode_a into mode_b"""
+
+        a, b = self.modes[mode_a], self.modes[mode_b]
+
+        if a["base"] != b["base"]:
+            return diff_settings(self.resolve(mode_a), self.resolve(mode_b))
+
+        # on the same base, only keys in either overlay can differ
+        base = self.get_base(a["base"])
+        keys = {*a["changed"], *a["removed"], *b["changed"], *b["removed"]}
+
+        overlaid_base = {k: base[k] for k in keys if k in base}
+
+        return diff_settings(
+            apply_settings_delta(overlaid_base, a),
+            apply_settings_delta(overlaid_base, b),
+        )
+
+    def export(self, name: str, directory: str | Path) -> Path:
+        """Write a mode as a full yaml that YamlSettingsProvider can read"""
+
+        yaml_path = Path(directory) / f"{name}.yaml"
+
+        with open(yaml_path, "w") as file:
+            yaml.safe_dump(self.resolve(name), file)
+
+        return yaml_path
+
+    async def store(self, name: str, data: dict[str, Any]):
+        self.add_mode(name, data)
+
+    async def retrieve(self, name: str) -> dict[str, Any]:
+        return self.resolve(name)
@@ -0,0 +1,153 @@
+"""
+
+Live acquisition throughput from BlueAPI events
+
+ThroughputMonitor is an event callback for BlueAPIPythonClient. From the
+event documents of a run it works out the frame rate over a sliding window and
+how far behind the documents arrive (the time they were received minus the
+time in the document). From ProgressEvents it takes the estimated time
+remaining, or works it out from the fraction done.
+
+BlueAPIPythonClient calls it on the message bus thread as each event arrives,
+before the event is queued for the other callbacks, so events dropped from
+that queue are still counted. Callbacks added to it should be quick.
+
+Each update is kept as a ThroughputSample in a bounded in-memory series, and
+passed to any callbacks added, so a GUI or script can watch for the frame rate
+dropping during a run.
+
+    CLIENT.throughput.add_callback(lambda sample: print(sample.fps))
+
+"""
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+
+from blueapi.client.event_bus import AnyEvent
+from blueapi.core import DataEvent
+from blueapi.worker import ProgressEvent
+from dodal.log import LOGGER
+from pydantic import BaseModel
+
+DEFAULT_WINDOW = 5.0
+DEFAULT_HISTORY = 10_000
+
+
+class ThroughputSample(BaseModel):
+    """The throughput of the current run at one moment"""
+
+    time: float
+    frames: int
+    fps: float
+    latency: float | None = None
+    eta: float | None = None
+
+
+class ThroughputMonitor:
+    """Derives frame rate, latency and time remaining from a task's events"""
+
+    def __init__(
+        self,
+        window: float = DEFAULT_WINDOW,
+        history: int = DEFAULT_HISTORY,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            window (float): Seconds of events the frame rate is averaged over.
+            history (int): Most samples kept in the series.
+            clock (Callable[[], float]): Wall clock, comparable with the
+                times in the documents.
+        """
+        self.window = window
+        self.clock = clock
+        self.series: deque[ThroughputSample] = deque(maxlen=history)
+        self.callbacks: list[Callable[[ThroughputSample], None]] = []
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Start counting a new run, the series is kept"""
+        with self._lock:
+            self.frames = 0
+            self.latency: float | None = None
+            self.eta: float | None = None
+            self._received: deque[float] = deque()
+
+    def add_callback(self, callback: Callable[[ThroughputSample], None]):
+        self.callbacks.append(callback)
+
+    @property
+    def latest(self) -> ThroughputSample | None:
+        return self.series[-1] if self.series else None
+
+    def fps(self, now: float | None = None) -> float:
+        """Frames per second over the last window seconds"""
+        now = self.clock() if now is None else now
+        with self._lock:
+            while self._received and (now - self._received[0] > self.window):
+                self._received.popleft()
+
+            if len(self._received) < 2:
+                return 0.0
+
+            elapsed = now - self._received[0]
+            # the first frame in the window marks its start, it isn't counted
+            return (len(self._received) - 1) / elapsed if elapsed > 0 else 0.0
+
+    @staticmethod
+    def progress_eta(event: ProgressEvent) -> float | None:
+        """The longest time remaining of any status, None if unknown"""
+        remaining = []
+        for status in event.statuses.values():
+            if status.time_remaining is not None:
+                remaining.append(status.time_remaining)
+            elif status.percentage and status.time_elapsed is not None:
+                fraction = status.percentage
+                remaining.append(status.time_elapsed * (1 - fraction) / fraction)
+
+        return max(remaining) if remaining else None
+
+    def __call__(self, event: AnyEvent):
+        now = self.clock()
+
+        if isinstance(event, DataEvent):
+            if event.name == "start":
+                self.reset()
+                return
+            elif event.name != "event":
+                return
+
+            with self._lock:
+                self.frames += 1
+                self._received.append(now)
+                if "time" in event.doc:
+                    self.latency = now - event.doc["time"]
+
+        elif isinstance(event, ProgressEvent):
+            eta = self.progress_eta(event)
+            with self._lock:
+                self.eta = eta
+        else:
+            return
+
+        self.record(now)
+
+    def record(self, now: float):
+        sample = ThroughputSample(
+            time=now,
+            frames=self.frames,
+            fps=self.fps(now),
+            latency=self.latency,
+            eta=self.eta,
+        )
+        self.series.append(sample)
+
+        for callback in self.callbacks:
+            try:
+                callback(sample)
+            except Exception as e:
+                LOGGER.error(f"Throughput callback ({callback}) failed: {e}")
@@ -0,0 +1,237 @@
+"""
+
+Run-length timeline of a whole experiment
+
+A Timeline holds one segment per group, per repeat, per profile of an
+ExperimentLoader, in the order the PandA runs them, each being a run of
+identical frames. Frames are never expanded, so the totals of a long
+experiment are sums over segments, and only the frames in a time range are
+built when plotting.
+
+Profiles are taken to run back to back, any gap between them is not modelled.
+
+"""
+
+from typing import Any
+
+import numpy as np
+
+from saxs_bluesky.utils.profile_groups import ExperimentLoader, Profile
+
+
+class Timeline:
+    """
+    Columnar run-length segments, segment n has frames[n] frames each of
+    wait_s[n] then run_s[n] seconds, starting at starts[n]. levels[n, pulse]
+    is the wait and run level of each pulse.
+    """
+
+    def __init__(self, profiles: list[Profile], repeats: bool = True):
+        """
+        Args:
+            profiles (list[Profile]): The profiles, in the order they are run.
+            repeats (bool): Include every repeat of each profile, otherwise
+                one pass through each profile's groups.
+        """
+        self.n_profiles = len(profiles)
+        n_pulses = max(
+            (len(group.wait_pulses) for p in profiles for group in p.groups),
+            default=0,
+        )
+
+        profile_index, repeat_index, group_index = [], [], []
+        frames, wait_s, run_s, levels = [], [], [], []
+
+        for n, profile in enumerate(profiles):
+            n_groups = profile.n_groups
+            n_repeats = profile.repeats if repeats else 1
+
+            group_levels = np.zeros((n_groups, n_pulses, 2), dtype=int)
+            for g, group in enumerate(profile.groups):
+                group_levels[g, : len(group.wait_pulses), 0] = group.wait_pulses
+                group_levels[g, : len(group.run_pulses), 1] = group.run_pulses
+
+            profile_index.append(np.full(n_groups * n_repeats, n, dtype=int))
+            repeat_index.append(np.repeat(np.arange(n_repeats), n_groups))
+            group_index.append(np.tile(np.arange(n_groups), n_repeats))
+            frames.append(np.tile([g.frames for g in profile.groups], n_repeats))
+            wait_s.append(np.tile([g.wait_time_s for g in profile.groups], n_repeats))
+            run_s.append(np.tile([g.run_time_s for g in profile.groups], n_repeats))
+            levels.append(np.tile(group_levels, (n_repeats, 1, 1)))
+
+        def join(arrays: list, dtype) -> np.ndarray:
+            return (
+                np.concatenate(arrays).astype(dtype) if arrays else np.zeros(0, dtype)
+            )
+
+        self.profile_index = join(profile_index, int)
+        self.repeat_index = join(repeat_index, int)
+        self.group_index = join(group_index, int)
+        self.frames = join(frames, int)
+        self.wait_s = join(wait_s, float)
+        self.run_s = join(run_s, float)
+        self.levels = (
+            np.concatenate(levels) if levels else np.zeros((0, n_pulses, 2), int)
+        )
+
+        self.starts = np.concatenate(
+            ([0.0], np.cumsum(self.frames * (self.wait_s + self.run_s)))
+        )
+
+    @classmethod
+    def from_experiment(cls, experiment: ExperimentLoader) -> "Timeline":
+        return cls(experiment.profiles)
+
+    @classmethod
+    def from_profile(cls, profile: Profile, repeats: bool = True) -> "Timeline":
+        return cls([profile], repeats=repeats)
+
+    @property
+    def n_segments(self) -> int:
+        return len(self.frames)
+
+    @property
+    def total_frames(self) -> int:
+        return int(np.sum(self.frames))
+
+    @property
+    def total_time(self) -> float:
+        return float(self.starts[-1])
+
+    @property
+    def active_pulses(self) -> list[int]:
+        """1-based outputs that are high in any segment, as Profile.active_pulses"""
+        active = np.nonzero(self.levels.sum(axis=(0, 2)))[0] + 1
+        return active.tolist()
+
+    def summary(self) -> dict[str, Any]:
+        """Total time and frames of the whole timeline, and of each profile"""
+
+        profile_frames = np.bincount(
+            self.profile_index, weights=self.frames, minlength=self.n_profiles
+        )
+        profile_time = np.bincount(
+            self.profile_index,
+            weights=np.diff(self.starts),
+            minlength=self.n_profiles,
+        )
+
+        return {
+            "total_time": self.total_time,
+            "total_frames": self.total_frames,
+            "n_segments": self.n_segments,
+            "profiles": [
+                {"total_time": float(t), "total_frames": int(f)}
+                for t, f in zip(profile_time, profile_frames, strict=True)
+            ],
+        }
+
+    def _pulse_levels(self, pulses: list[int]) -> np.ndarray:
+        # levels[segment, pulse, phase] where phase 0 is wait and 1 is run
+        if self.n_segments == 0:
+            return np.zeros((0, len(pulses), 2), dtype=int)
+
+        return self.levels[:, pulses, :].reshape(-1, len(pulses), 2)
+
+    @staticmethod
+    def _end_time(end_time: float) -> float:
+        # a little low time after the end, so the last edge can be seen
+        return end_time + (end_time) / 10
+
+    def signals(self, pulses: list[int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Expand every frame into the step signals of several pulses.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The edge times, shape (2 * frames + 2,)
+            and the signal of each pulse, shape (len(pulses), 2 * frames + 2).
+        """
+        durations = np.column_stack((self.wait_s, self.run_s))
+        edge_times = np.cumsum(np.repeat(durations, self.frames, axis=0).ravel())
+
+        end_time = edge_times[-1] if len(edge_times) > 0 else 0.0
+
+        trigger_time = np.concatenate(([0.0], edge_times, [self._end_time(end_time)]))
+
+        # starts low and ends low
+        frame_levels = np.repeat(self._pulse_levels(pulses), self.frames, axis=0)
+        signals = np.zeros((len(pulses), len(trigger_time)), dtype=int)
+        signals[:, 1:-1] = frame_levels.transpose(1, 0, 2).reshape(len(pulses), -1)
+
+        return trigger_time, signals
+
+    def visible_frames(
+        self, start: float, stop: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns, for each segment, the index of the first frame and one past
+        the last frame that overlap the time range start to stop.
+        """
+        period = self.wait_s + self.run_s
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            first = np.where(
+                period > 0, np.floor((start - self.starts[:-1]) / period), 0
+            )
+            last = np.where(
+                period > 0, np.ceil((stop - self.starts[:-1]) / period), self.frames
+            )
+
+        first = np.clip(first, 0, self.frames).astype(int)
+        last = np.clip(last, 0, self.frames).astype(int)
+
+        return first, np.maximum(first, last)
+
+    def signals_in_range(
+        self, pulses: list[int], start: float, stop: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        As signals, but only for the frames that overlap the time range start
+        to stop, starting from the first visible frame.
+        """
+        first, last = self.visible_frames(start, stop)
+        levels = self._pulse_levels(pulses)
+
+        trigger_time = [np.array([0.0])]
+        signals = [np.zeros((len(pulses), 1), dtype=int)]
+
+        for n in np.nonzero(last > first)[0]:
+            period = self.wait_s[n] + self.run_s[n]
+            frame_starts = self.starts[n] + np.arange(first[n], last[n]) * period
+
+            if len(trigger_time) == 1:
+                trigger_time[0][0] = frame_starts[0]
+
+            edges = np.column_stack(
+                (frame_starts + self.wait_s[n], frame_starts + period)
+            )
+            trigger_time.append(edges.ravel())
+            signals.append(np.tile(levels[n], (1, last[n] - first[n])))
+
+        if stop >= self.total_time:
+            # starts low and ends low
+            trigger_time.append(np.array([self._end_time(self.total_time)]))
+            signals.append(np.zeros((len(pulses), 1), dtype=int))
+
+        return np.concatenate(trigger_time), np.concatenate(signals, axis=1)
+
+    def envelopes(self, pulses: list[int]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        A run-length envelope of several pulses, one step per segment. A pulse
+        that toggles within a segment is a block between its wait and run
+        levels.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: The segment edge times
+            and the lower and upper level of each pulse in each segment.
+        """
+        levels = self._pulse_levels(pulses)
+        trigger_time = np.concatenate((self.starts, [self._end_time(self.total_time)]))
+
+        # starts low and ends low
+        lower = np.zeros((len(pulses), len(trigger_time)), dtype=int)
+        upper = np.zeros((len(pulses), len(trigger_time)), dtype=int)
+        lower[:, 1:-1] = levels.min(axis=2).T
+        upper[:, 1:-1] = levels.max(axis=2).T
+
+        return trigger_time, lower, upper
@@ -0,0 +1,78 @@
+"""
+
+Time-limited cache of BlueAPI server responses
+
+The plans and devices a BlueAPI worker offers only change when its environment
+is reloaded, but the GUI and scripts list them over and over. Responses are
+kept for a time-to-live, so changes made behind the client's back are still
+picked up, and are dropped straight away when the client reloads the
+environment itself.
+
+"""
+
+import threading
+import time
+from collections.abc import Callable, Hashable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_TTL = 30
+
+
+class TTLCache:
+    """A cache whose entries expire ttl seconds after they were stored"""
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            ttl (float): Seconds an entry is kept for, 0 to disable caching.
+            clock (Callable[[], float]): Monotonic time source.
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if (entry is None) or (self.clock() - entry[0] >= self.ttl):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (self.clock(), value)
+
+    def get_or_load(self, key: Hashable, load: Callable[[], T]) -> T:
+        """The cached value, or the result of load() which is then cached"""
+        value = self.get(key)
+
+        if value is None:
+            value = load()
+            self.put(key, value)
+
+        return value
+
+    def invalidate(self, key: Hashable | None = None):
+        """Drop one entry, or all of them if no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
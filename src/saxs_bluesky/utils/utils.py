@@ -3,6 +3,7 @@ import subprocess
 from datetime import datetime
 from importlib import import_module
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from blueapi.service.interface import config
 
@@ -16,6 +17,9 @@ import saxs_bluesky.beamline_configs
 import saxs_bluesky.blueapi_configs
 from saxs_bluesky.stubs.panda_stubs import return_connected_device, save_device_to_yaml
 
+if TYPE_CHECKING:
+    from saxs_bluesky.utils.settings_snapshots import DeltaSnapshotProvider
+
 DEFAULT_BEAMLINE = "i22"
 
 
@@ -121,6 +125,7 @@ def save_panda_cli(
     beamline: str | None = None,
     panda_name: str | None = None,
     yaml_name: str | None = None,
+    yaml_dir: str | None = None,
 ):
     from bluesky import RunEngine
 
@@ -142,7 +147,10 @@ def save_panda_cli(
 
     connected_panda = return_connected_device(beamline, panda_name)
 
-    yaml_dir = os.path.join(os.path.dirname(Path(__file__).parent), "ophyd_panda_yamls")
+    if yaml_dir is None:
+        yaml_dir = os.path.join(
+            os.path.dirname(Path(__file__).parent), "ophyd_panda_yamls"
+        )
     yaml_filename = f"{beamline}_{panda_name}_{yaml_name}"
 
     run_engine(
@@ -154,3 +162,67 @@ def save_panda_cli(
     )
 
     print(f"Saved PandA yaml to {yaml_dir}/{yaml_filename}.yaml")
+
+
+def get_snapshot_dir(beamline: str) -> str:
+    snapshot_dir = os.path.join(
+        os.path.dirname(Path(__file__).parent), "ophyd_panda_yamls", "snapshots"
+    )
+    return os.path.join(snapshot_dir, beamline)
+
+
+def snapshot_cli(
+    beamline: str | None = None,
+    detectors: list[str] | None = None,
+    snapshot_dir: str | None = None,
+) -> "DeltaSnapshotProvider":
+    """
+    Snapshot the settings of every PandA on the beamline, plus any named
+    detectors, without prompting. Devices are connected and read concurrently
+    and each is stored as a delta against its previous snapshot.
+
+    Args:
+        beamline: The beamline name, defaults to the current SAXS beamline.
+        detectors: Names of additional devices to snapshot.
+        snapshot_dir: Where to keep the snapshots, defaults to
+            ophyd_panda_yamls/snapshots/<beamline>.
+
+    Returns:
+        DeltaSnapshotProvider: The provider the snapshot was stored with.
+    """
+    from bluesky import RunEngine
+    from ophyd_async.fastcs.panda import HDFPanda
+
+    from saxs_bluesky.stubs.panda_stubs import make_beamline_devices, snapshot_devices
+    from saxs_bluesky.utils.settings_snapshots import DeltaSnapshotProvider
+
+    run_engine = RunEngine()
+
+    if beamline is None:
+        beamline = get_saxs_beamline()
+
+    if snapshot_dir is None:
+        snapshot_dir = get_snapshot_dir(beamline)
+
+    detectors = detectors or []
+
+    beamline_devices = make_beamline_devices(beamline)
+
+    devices = {
+        name: device
+        for name, device in beamline_devices.items()
+        if isinstance(device, HDFPanda) or (name in detectors)
+    }
+
+    missing = set(detectors) - set(devices)
+    if missing:
+        raise ValueError(f"{sorted(missing)} are not devices on {beamline}")
+
+    provider = DeltaSnapshotProvider(snapshot_dir)
+
+    run_engine(snapshot_devices(provider, devices))
+
+    print(f"Saved snapshot {provider.snapshot_id} of {sorted(devices)}")
+    print(f"Snapshots located at: {snapshot_dir}")
+
+    return provider
@@ -9,6 +9,9 @@ from ophyd_async.core import AsyncStatus, TriggerInfo, init_devices
 from ophyd_async.epics.adpilatus import PilatusDetector
 from ophyd_async.fastcs.panda import HDFPanda
 
+import saxs_bluesky.blueapi_configs
+from saxs_bluesky.utils.beamline_client import BlueAPIPythonClient
+
 SAXS_bluesky_ROOT = Path(__file__)
 
 YAML_DIR = os.path.join(
@@ -16,20 +19,43 @@ YAML_DIR = os.path.join(
 )
 
 
-set_path_provider(
-    StaticVisitPathProvider(
-        "ixx",
-        Path(os.path.dirname(__file__)),
-        client=LocalDirectoryServiceClient(),
-    )
+PATH_PROVIDER = StaticVisitPathProvider(
+    "ixx",
+    Path(os.path.dirname(__file__)),
+    client=LocalDirectoryServiceClient(),
 )
 
+set_path_provider(PATH_PROVIDER)
+
 
 @pytest.fixture
 def run_engine() -> RunEngine:
     return RunEngine()
 
 
+@pytest.fixture
+def local_path_provider():
+    """
+    Makes PATH_PROVIDER the path provider plans use again, as importing a
+    beamline's devices can replace it with one that needs the beamline network
+    """
+    previous = get_path_provider()
+    set_path_provider(PATH_PROVIDER)
+    yield PATH_PROVIDER
+    set_path_provider(previous)
+
+
+@pytest.fixture
+def client_without_callback() -> BlueAPIPythonClient:
+    beamline = "i22"
+    blueapi_config_path = f"{os.path.dirname(saxs_bluesky.blueapi_configs.__file__)}/{beamline}_blueapi_config.yaml"  # noqa
+    client_without_callback = BlueAPIPythonClient(
+        beamline, blueapi_config_path, "cm12345-1", callback=False
+    )
+
+    return client_without_callback
+
+
 @AsyncStatus.wrap
 async def mock_prepare(value: TriggerInfo):
     pass
@@ -38,7 +64,7 @@ async def mock_prepare(value: TriggerInfo):
 @pytest.fixture
 async def panda() -> HDFPanda:
     async with init_devices(connect=True, mock=True):
-        panda = HDFPanda(prefix="ixx-test-panda", path_provider=get_path_provider())
+        panda = HDFPanda(prefix="ixx-test-panda", path_provider=PATH_PROVIDER)
 
     panda.prepare = mock_prepare
 
@@ -49,7 +75,7 @@ async def panda() -> HDFPanda:
 async def pilatus() -> PilatusDetector:
     async with init_devices(connect=True, mock=True):
         pilatus = PilatusDetector(
-            prefix="ixx-test-pilatus", path_provider=get_path_provider()
+            prefix="ixx-test-pilatus", path_provider=PATH_PROVIDER
         )
 
     pilatus.prepare = mock_prepare
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import threading
+from unittest.mock import Mock
+
+import httpx
+import pytest
+from blueapi.client.rest import BlueskyRemoteControlError
+from blueapi.worker import TrackableTask
+from blueapi.worker.task import Task
+
+import saxs_bluesky.blueapi_configs
+from saxs_bluesky.plans.ncd_panda import configure_panda_triggering
+from saxs_bluesky.utils.async_beamline_client import (
+    AsyncBlueAPIClient,
+    SyncBlueAPIClient,
+)
+
+BLUEAPI_CONFIG_PATH = os.path.join(
+    os.path.dirname(saxs_bluesky.blueapi_configs.__file__), "i22_blueapi_config.yaml"
+)
+
+
+class FakeServer:
+    """Completes each task after it has been polled twice"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.tasks: dict[str, dict] = {}
+        self.polls: dict[str, int] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+
+        path, method = request.url.path, request.method
+
+        if path == "/plans":
+            return httpx.Response(200, json={"plans": [{"name": "count"}]})
+        elif path == "/devices":
+            return httpx.Response(
+                200, json={"devices": [{"name": "saxs", "protocols": []}]}
+            )
+        elif path == "/tasks" and method == "POST":
+            task_id = f"task-{len(self.tasks)}"
+            self.tasks[task_id] = json.loads(request.content)
+            self.polls[task_id] = 0
+            return httpx.Response(201, json={"task_id": task_id})
+        elif path == "/worker/task" and method == "PUT":
+            return httpx.Response(200, json=json.loads(request.content))
+        elif path.startswith("/tasks/"):
+            task_id = path.removeprefix("/tasks/")
+            if task_id not in self.tasks:
+                return httpx.Response(404, text="not found")
+            self.polls[task_id] += 1
+            task = TrackableTask(
+                task_id=task_id,
+                task=Task(name=self.tasks[task_id]["name"]),
+                is_complete=self.polls[task_id] >= 2,
+            )
+            return httpx.Response(200, json=task.model_dump(mode="json"))
+        elif path == "/worker/state":
+            return httpx.Response(200, json="IDLE")
+        return httpx.Response(500, text="unexpected request")
+
+
+@pytest.fixture
+def server() -> FakeServer:
+    return FakeServer()
+
+
+def make_client(server: FakeServer) -> AsyncBlueAPIClient:
+    return AsyncBlueAPIClient(
+        "i22",
+        BLUEAPI_CONFIG_PATH,
+        "cm12345-1",
+        poll_interval=0,
+        timeout=5,
+        transport=httpx.MockTransport(server.handler),
+    )
+
+
+async def test_async_client_run(server: FakeServer):
+    async with make_client(server) as client:
+        task = await client.run(configure_panda_triggering)
+
+    assert task.is_complete
+    assert server.tasks["task-0"]["name"] == "configure_panda_triggering"
+    assert server.tasks["task-0"]["instrument_session"] == "cm12345-1"
+    assert server.polls["task-0"] == 2
+
+
+async def test_async_client_concurrent_status(server: FakeServer):
+    server.delay = 0.01
+
+    async with make_client(server) as client:
+        responses = await asyncio.gather(*(client.submit("count") for _ in range(5)))
+        tasks = await client.get_tasks([r.task_id for r in responses])
+
+    assert [t.task_id for t in tasks] == [f"task-{n}" for n in range(5)]
+    assert server.max_in_flight > 1
+
+
+async def test_async_client_show(server: FakeServer, capsys):
+    async with make_client(server) as client:
+        await client.show_plans()
+        await client.show_devices()
+
+    out = capsys.readouterr().out
+    assert "count" in out
+    assert "saxs" in out
+
+
+async def test_async_client_fetches_token_off_the_loop(server: FakeServer):
+    loop_thread = threading.get_ident()
+    token_threads = []
+
+    def get_valid_access_token() -> str:
+        token_threads.append(threading.get_ident())
+        return "token"
+
+    async with make_client(server) as client:
+        client.session_manager = Mock(get_valid_access_token=get_valid_access_token)
+        headers = await client._headers()
+
+    assert headers == {"Authorization": "Bearer token"}
+    assert token_threads and token_threads[0] != loop_thread
+
+
+async def test_async_client_error(server: FakeServer):
+    async with make_client(server) as client:
+        with pytest.raises(BlueskyRemoteControlError):
+            await client._request("/nothing", dict)
+
+
+def test_sync_client(server: FakeServer):
+    client = SyncBlueAPIClient(
+        "i22",
+        BLUEAPI_CONFIG_PATH,
+        "cm12345-1",
+        poll_interval=0,
+        transport=httpx.MockTransport(server.handler),
+    )
+
+    try:
+        task = client.run("count")
+        futures = [client.submit(client.client.submit("count")) for _ in range(3)]
+        task_ids = [future.result().task_id for future in futures]
+        client.show_plans()
+    finally:
+        client.close()
+
+    assert task.task.name == "count"
+    assert task_ids == ["task-1", "task-2", "task-3"]
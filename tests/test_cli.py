@@ -1,9 +1,56 @@
 import subprocess
 import sys
 
+import pytest
+
 from saxs_bluesky import __version__
 
 
 def test_cli_version():
     cmd = [sys.executable, "-m", "saxs_bluesky", "--version"]
     assert subprocess.check_output(cmd).decode().strip() == __version__
+
+
+def _imported_modules(*args: str) -> set[str]:
+    cmd = [sys.executable, "-X", "importtime", "-m", "saxs_bluesky", *args]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    # importtime lines look like "import time: self | cumulative | module"
+    return {
+        line.rsplit("|", 1)[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+
+
+@pytest.mark.parametrize(
+    "args",
+    (
+        ["--version"],
+        ["gui", "--help"],
+        ["login", "--help"],
+        ["scripts", "--help"],
+        ["save_panda", "--help"],
+        ["snapshot", "--help"],
+    ),
+)
+def test_cli_startup_does_not_import_gui(args: list[str]):
+    modules = _imported_modules(*args)
+
+    assert "tkinter" not in modules
+    assert "matplotlib" not in modules
+    assert "saxs_bluesky.gui.panda_gui" not in modules
+    assert "saxs_bluesky.plans.ncd_panda" not in modules
+
+
+def test_importing_cli_does_not_import_bluesky():
+    check = (
+        "import sys\n"
+        "import saxs_bluesky.__main__\n"
+        "heavy = ('bluesky', 'ophyd_async', 'matplotlib')\n"
+        "print(' '.join(name for name in heavy if name in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.split() == []
@@ -1,15 +1,30 @@
 import os
+from collections.abc import Callable
 from unittest.mock import Mock, patch
 
 import pytest
 from blueapi.client.client import BlueapiClient
 from blueapi.client.event_bus import EventBusClient
-from blueapi.client.rest import BlueapiRestClient
-from blueapi.service.model import DeviceResponse, PlanResponse
+from blueapi.client.rest import BlueapiRestClient, BlueskyRemoteControlError
+from blueapi.service.model import (
+    DeviceResponse,
+    PlanModel,
+    PlanResponse,
+    TaskResponse,
+    WorkerTask,
+)
+from blueapi.worker import WorkerEvent, WorkerState
+from blueapi.worker.event import TaskStatus
+from bluesky_stomp.messaging import MessageContext
 
 import saxs_bluesky.blueapi_configs
 from saxs_bluesky.plans.ncd_panda import configure_panda_triggering
-from saxs_bluesky.utils.beamline_client import BlueAPIPythonClient
+from saxs_bluesky.utils.beamline_client import (
+    RETRYABLE_ERRORS,
+    BlueAPIPythonClient,
+    plan_parameter_names,
+)
+from saxs_bluesky.utils.retry import RetryPolicy
 
 
 @pytest.fixture(autouse=True)
@@ -29,17 +44,6 @@ def client():
     return client
 
 
-@pytest.fixture(autouse=True)
-def client_without_callback():
-    beamline = "i22"
-    blueapi_config_path = f"{os.path.dirname(saxs_bluesky.blueapi_configs.__file__)}/{beamline}_blueapi_config.yaml"  # noqa
-    client_without_callback = BlueAPIPythonClient(
-        beamline, blueapi_config_path, "cm12345-1", callback=False
-    )
-
-    return client_without_callback
-
-
 def test_blueapi_python_client(client: BlueAPIPythonClient):
     assert isinstance(client, BlueapiClient)
     assert isinstance(client, BlueAPIPythonClient)
@@ -75,13 +79,12 @@ def test_blueapi_python_client_without_callback_run(
     client_without_callback: BlueAPIPythonClient,
 ):
     # Patch instance methods so run executes but no calls happen
+    rest = Mock(BlueapiRestClient)
+    rest.create_task.return_value = TaskResponse(task_id="t-fake")
+
     with (
         patch.object(client_without_callback, "run_task", return_value=Mock()),
-        patch.object(
-            client_without_callback,
-            "create_and_start_task",
-            return_value=Mock(task_id="t-fake"),
-        ),
+        patch.object(client_without_callback, "_rest", rest),
         patch.object(
             client_without_callback, "create_task", return_value=Mock(task_id="t-fake")
         ),
@@ -200,6 +203,47 @@ def test_show_devices(client: BlueAPIPythonClient):
     client.get_devices.assert_called_once()
 
 
+def test_return_detectors_injects_each_device_once(client: BlueAPIPythonClient):
+    client.get_devices = Mock(
+        return_value=MockResponse([MockDevice("saxs"), MockDevice("waxs")]),
+    )
+
+    with patch(
+        "saxs_bluesky.utils.beamline_client.inject", side_effect=lambda name: name
+    ) as inject:
+        first = client.return_detectors()
+        client.cache.invalidate()
+        second = client.return_detectors()
+
+    assert first == second == ["saxs", "waxs"]
+    assert client.get_devices.call_count == 2
+    assert inject.call_count == 2
+
+
+def test_devices_are_cached(client: BlueAPIPythonClient):
+    client.get_devices = Mock(
+        return_value=MockResponse([MockDevice("saxs"), MockDevice("waxs")]),
+    )
+
+    client.show_devices()
+    client.show_devices()
+    client.return_detectors()
+
+    client.get_devices.assert_called_once()
+
+
+def test_cache_expires(client: BlueAPIPythonClient):
+    now = [0.0]
+    client.cache.clock = lambda: now[0]
+    client.get_devices = Mock(return_value=MockResponse([MockDevice("saxs")]))
+
+    client.list_devices()
+    now[0] = client.cache.ttl
+    client.list_devices()
+
+    assert client.get_devices.call_count == 2
+
+
 class MockPlan:
     def __init__(self, device: str):
         self.name = device
@@ -219,3 +263,158 @@ def test_show_plans(client: BlueAPIPythonClient):
 
     client.show_plans()
     client.get_plans.assert_called_once()
+
+
+def test_reload_environment_invalidates_cache(client: BlueAPIPythonClient):
+    client.get_plans = Mock(return_value=MockPlanResponse([MockPlan("count")]))
+    client.get_devices = Mock(return_value=MockResponse([MockDevice("saxs")]))
+    client._wait_for_reload = Mock()
+
+    client.list_plans()
+    with patch("saxs_bluesky.utils.beamline_client.inject"):
+        client.return_detectors()
+
+    client.reload_environment()
+    client.list_plans()
+
+    client._rest.delete_environment.assert_called_once()
+    assert client.get_plans.call_count == 2
+    assert client._detectors == {}
+
+
+def test_convert_args_uses_signature_of_decorated_plan(client: BlueAPIPythonClient):
+    params = client._args_and_kwargs_to_params(
+        configure_panda_triggering, ("profile", ["saxs"]), {"force_load": True}
+    )
+
+    assert params == {"profile": "profile", "detectors": ["saxs"], "force_load": True}
+
+
+def test_convert_args_ignores_local_variables(client: BlueAPIPythonClient):
+    def plan_with_locals(a: int, b: int = 2, *, c: int = 3):
+        total = a + b + c
+        yield total
+
+    params = client._convert_args_to_kwargs(plan_with_locals, (1, 5))
+    assert params == {"a": 1, "b": 5}
+
+    with pytest.raises(ValueError):
+        client._convert_args_to_kwargs(plan_with_locals, (1, 2, 3))
+
+
+def test_plan_signatures_are_cached(client: BlueAPIPythonClient):
+    plan_parameter_names.cache_clear()
+
+    for _ in range(3):
+        client._convert_args_to_kwargs(configure_panda_triggering, ("profile",))
+
+    assert plan_parameter_names.cache_info().misses == 1
+    assert plan_parameter_names.cache_info().hits == 2
+
+
+def test_convert_args_falls_back_to_server_schema(client: BlueAPIPythonClient):
+    client.get_plans = Mock(
+        return_value=PlanResponse(
+            plans=[
+                PlanModel(
+                    name="configure_panda_triggering",
+                    parameter_schema={
+                        "properties": {"profile": {}, "detectors": {}},
+                    },
+                )
+            ]
+        )
+    )
+
+    with patch(
+        "saxs_bluesky.utils.beamline_client.plan_parameter_names", return_value=None
+    ):
+        for _ in range(2):
+            params = client._convert_args_to_kwargs(
+                configure_panda_triggering, ("profile", ["saxs"])
+            )
+
+    assert params == {"profile": "profile", "detectors": ["saxs"]}
+    client.get_plans.assert_called_once()
+
+
+def test_send_without_callback_retries_start(client: BlueAPIPythonClient):
+    client.callback = False
+    client.retry_policy = RetryPolicy(RETRYABLE_ERRORS, sleep=Mock(), jitter=0)
+    client._rest.create_task.return_value = TaskResponse(task_id="t-1")
+    client._rest.update_worker_task.side_effect = [
+        BlueskyRemoteControlError(409, "busy"),
+        WorkerTask(task_id="t-1"),
+    ]
+
+    client.run("count")
+
+    client._rest.create_task.assert_called_once()
+    assert client._rest.update_worker_task.call_args_list[-1].args == (
+        WorkerTask(task_id="t-1"),
+    )
+    assert client.retry_metrics["retries"] == 1
+    assert client.retry_metrics["successes"] == 2
+
+
+def complete_on_start(client: BlueAPIPythonClient) -> Callable[[WorkerTask], None]:
+    """Makes the mocked event bus report a task complete once it is started"""
+    assert client._events is not None
+    subscribed = []
+    client._events.subscribe_to_all_events.side_effect = subscribed.append
+
+    def start(worker_task: WorkerTask):
+        status = TaskStatus(
+            task_id=worker_task.task_id, task_complete=True, task_failed=False
+        )
+        subscribed[-1](
+            WorkerEvent(state=WorkerState.IDLE, task_status=status),
+            MessageContext(Mock(), None, worker_task.task_id),
+        )
+        return worker_task
+
+    return start
+
+
+def test_send_with_callback_retries_start(client: BlueAPIPythonClient):
+    client.retry_policy = RetryPolicy(RETRYABLE_ERRORS, sleep=Mock(), jitter=0)
+    client._rest.create_task.return_value = TaskResponse(task_id="t-1")
+    start = complete_on_start(client)
+    started = []
+
+    def flaky_start(worker_task: WorkerTask):
+        started.append(worker_task.task_id)
+        if len(started) == 1:
+            raise BlueskyRemoteControlError(409, "busy")
+        return start(worker_task)
+
+    client._rest.update_worker_task.side_effect = flaky_start
+    client.run("count")
+
+    client._rest.create_task.assert_called_once()
+    assert started == ["t-1", "t-1"]
+    assert client.retry_metrics["retries"] == 1
+
+
+def test_send_with_callback_retries_create(client: BlueAPIPythonClient):
+    client.retry_policy = RetryPolicy(RETRYABLE_ERRORS, sleep=Mock(), max_attempts=2)
+    client._rest.create_task.side_effect = BlueskyRemoteControlError(409, "busy")
+
+    with pytest.raises(Exception, match="Task could not run"):
+        client.run("count")
+
+    assert client._rest.create_task.call_count == 2
+    client._rest.update_worker_task.assert_not_called()
+    assert client.retry_metrics["failures"] == 1
+
+
+def test_send_with_callback_does_not_retry_started_task(client: BlueAPIPythonClient):
+    client.retry_policy = RetryPolicy(RETRYABLE_ERRORS, sleep=Mock(), jitter=0)
+    client.timeout = 0.01
+    client._rest.create_task.return_value = TaskResponse(task_id="t-1")
+
+    with pytest.raises(Exception, match="Task could not run"):
+        client.run("count")
+
+    client._rest.create_task.assert_called_once()
+    client._rest.update_worker_task.assert_called_once()
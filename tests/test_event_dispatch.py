@@ -0,0 +1,103 @@
+import threading
+
+from blueapi.core import DataEvent
+from blueapi.worker import ProgressEvent
+
+from saxs_bluesky.utils.event_dispatch import EventDispatcher
+
+
+def data_event(name: str, seq_num: int = 0) -> DataEvent:
+    return DataEvent(name=name, doc={"seq_num": seq_num}, task_id="task")
+
+
+def progress_event(task_id: str = "task") -> ProgressEvent:
+    return ProgressEvent(task_id=task_id, statuses={})
+
+
+def test_dispatcher_calls_callbacks_in_order_off_thread():
+    threads, events = [], []
+
+    def on_event(event):
+        threads.append(threading.current_thread())
+        events.append(event)
+
+    sent = [data_event("start"), data_event("event", 1), data_event("stop")]
+    with EventDispatcher([on_event]) as dispatcher:
+        for event in sent:
+            dispatcher.put(event)
+
+    assert events == sent
+    assert threading.current_thread() not in threads
+    assert dispatcher.metrics.as_dict()["processed"] == 3
+
+
+def test_dispatcher_coalesces_waiting_progress_events():
+    release = threading.Event()
+    events = []
+
+    def on_event(event):
+        release.wait()
+        events.append(event)
+
+    with EventDispatcher([on_event]) as dispatcher:
+        dispatcher.put(data_event("start"))
+        progress = [progress_event() for _ in range(5)]
+        for event in progress:
+            dispatcher.put(event)
+        dispatcher.put(progress_event("other"))
+        release.set()
+
+    assert events[1] is progress[-1]
+    assert len(events) == 3
+    assert dispatcher.metrics.as_dict()["coalesced"] == 4
+
+
+def test_dispatcher_drops_event_documents_when_full():
+    release = threading.Event()
+    events = []
+
+    def on_event(event):
+        release.wait()
+        events.append(event.name)
+
+    with EventDispatcher([on_event], maxsize=2) as dispatcher:
+        dispatcher.put(data_event("start"))
+        dispatcher.put(data_event("descriptor"))
+        dispatcher.put(data_event("event", 1))
+        dispatcher.put(data_event("event", 2))
+        dispatcher.put(data_event("event", 3))
+        release.set()
+        dispatcher.put(data_event("stop"))
+
+    assert events[0] == "start"
+    assert events[-1] == "stop"
+    assert "descriptor" in events
+    metrics = dispatcher.metrics.as_dict()
+    assert metrics["dropped"] >= 1
+    assert metrics["received"] == metrics["processed"] + metrics["dropped"]
+
+
+def test_dispatcher_counts_errors_and_late_events():
+    now = [0.0]
+    release = threading.Event()
+
+    def slow(event):
+        release.wait()
+        now[0] += 2
+
+    def broken(event):
+        raise RuntimeError("broken")
+
+    called = []
+    dispatcher = EventDispatcher(
+        [slow, broken, called.append], late_after=1, clock=lambda: now[0]
+    )
+    with dispatcher:
+        dispatcher.put(data_event("start"))
+        dispatcher.put(data_event("stop"))
+        release.set()
+
+    assert len(called) == 2
+    metrics = dispatcher.metrics.as_dict()
+    assert metrics["errors"] == 2
+    assert metrics["late"] == 1
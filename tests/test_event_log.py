@@ -0,0 +1,125 @@
+import threading
+from pathlib import Path
+
+from blueapi.core import DataEvent
+from blueapi.worker import ProgressEvent, WorkerEvent, WorkerState
+from blueapi.worker.event import TaskStatus
+
+from saxs_bluesky.testing.fake_blueapi import FakeBlueAPIServer
+from saxs_bluesky.utils.event_log import EventRecorder, read_events, replay_events
+
+EVENTS = [
+    DataEvent(name="start", doc={"uid": "a", "time": 1.0}, task_id="task"),
+    ProgressEvent(task_id="task", statuses={}),
+    DataEvent(name="stop", doc={"uid": "b", "time": 2.0}, task_id="task"),
+    WorkerEvent(
+        state=WorkerState.IDLE,
+        task_status=TaskStatus(task_id="task", task_complete=True, task_failed=False),
+    ),
+]
+
+
+def record(path: Path, offsets: list[float]):
+    times = iter(offsets)
+    with EventRecorder(path, clock=lambda: next(times)) as recorder:
+        for event in EVENTS:
+            recorder(event)
+    return recorder
+
+
+def test_event_log_round_trip(tmp_path: Path):
+    path = tmp_path / "events.jsonl.gz"
+    recorder = record(path, [10.0, 10.5, 11.0, 12.0])
+
+    assert recorder.count == len(EVENTS)
+    offsets, events = zip(*read_events(path), strict=True)
+    assert list(offsets) == [0.0, 0.5, 1.0, 2.0]
+    assert list(events) == EVENTS
+
+
+def test_event_recorder_writes_off_the_calling_thread(tmp_path: Path):
+    path = tmp_path / "events.jsonl.gz"
+    calling_thread = threading.get_ident()
+    dumping_threads = set()
+
+    class Recorded(DataEvent):
+        def model_dump(self, *args, **kwargs):
+            dumping_threads.add(threading.get_ident())
+            return super().model_dump(*args, **kwargs)
+
+    with EventRecorder(path) as recorder:
+        recorder(Recorded(name="event", doc={"seq_num": 1}, task_id="task"))
+
+    assert recorder.count == 1
+    assert dumping_threads and calling_thread not in dumping_threads
+
+    recorder(EVENTS[0])
+    assert recorder.count == 1
+
+
+def test_event_recorder_skips_events_it_cannot_write(tmp_path: Path):
+    path = tmp_path / "events.jsonl.gz"
+
+    class Unserialisable(DataEvent):
+        def model_dump(self, *args, **kwargs):
+            raise TypeError("can't serialise")
+
+    with EventRecorder(path) as recorder:
+        recorder(EVENTS[0])
+        recorder(Unserialisable(name="event", doc={}, task_id="task"))
+        recorder(EVENTS[2])
+
+    assert recorder.errors == 1
+    assert recorder.count == 2
+    # the writer carried on, and closed the log so it can be read to the end
+    assert [event for _, event in read_events(path)] == [EVENTS[0], EVENTS[2]]
+
+
+def test_replay_keeps_the_recorded_pace(tmp_path: Path):
+    path = tmp_path / "events.jsonl.gz"
+    record(path, [10.0, 10.5, 11.0, 12.0])
+
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds: float):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    replayed = []
+    count = replay_events(
+        path, replayed.append, speed=2, sleep=sleep, clock=lambda: now[0]
+    )
+
+    assert count == len(EVENTS)
+    assert replayed == EVENTS
+    assert sleeps == [0.25, 0.25, 0.5]
+
+
+def test_replay_as_fast_as_possible(tmp_path: Path):
+    path = tmp_path / "events.jsonl.gz"
+    record(path, [0.0, 100.0, 200.0, 300.0])
+
+    def sleep(seconds: float):
+        raise AssertionError("should not sleep")
+
+    assert replay_events(path, lambda event: None, speed=None, sleep=sleep) == 4
+
+
+def test_client_records_and_replays_a_task(tmp_path: Path, capsys):
+    with FakeBlueAPIServer(events_per_task=3, seed=0) as server:
+        client = server.client(
+            callback=True, timeout=5, best_effort=False, record_directory=tmp_path
+        )
+        client.run("count")
+
+    (path,) = tmp_path.glob("count_*.jsonl.gz")
+    assert f"Events recorded to {path}" in capsys.readouterr().out
+
+    names = []
+    client.add_event_callback(lambda event: names.append(getattr(event, "name", "")))
+    count = client.replay(path, speed=None)
+
+    assert count == len(list(read_events(path)))
+    assert names.count("event") == 3
+    assert client.throughput.frames == 3
@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+from saxs_bluesky.testing.fake_blueapi import FakeBlueAPIServer
+from saxs_bluesky.utils.beamline_client import RETRYABLE_ERRORS
+from saxs_bluesky.utils.retry import RetryPolicy
+
+
+@pytest.fixture
+def server():
+    with FakeBlueAPIServer(events_per_task=3, seed=0) as server:
+        yield server
+
+
+# the client still lists plans and devices through blueapi's deprecated getters
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_fake_server_plans_and_devices(server: FakeBlueAPIServer, capsys):
+    client = server.client()
+
+    client.show_plans()
+    client.show_devices()
+
+    out = capsys.readouterr().out
+    assert f"Total plans: {len(server.plans)}" in out
+    assert f"Total devices: {len(server.devices)}" in out
+    assert server.requests["GET /plans"] == 1
+
+
+def test_fake_server_run_with_callback(server: FakeBlueAPIServer, capsys):
+    client = server.client(callback=True, timeout=5)
+    events = []
+    client.add_callback(events.append)
+
+    client.run("count")
+
+    assert "count succeeded" in capsys.readouterr().out
+    names = [getattr(event, "name", None) for event in events]
+    assert names.count("event") == 3
+    assert names[:2] == ["start", "descriptor"]
+    assert all(task.is_complete for task in server.tasks.values())
+
+
+def test_fake_server_event_callbacks_run_off_the_bus(server: FakeBlueAPIServer):
+    client = server.client(callback=True, timeout=5, best_effort=False)
+    names = []
+    client.add_event_callback(lambda event: names.append(getattr(event, "name", None)))
+
+    client.run("count")
+
+    assert names.count("event") == 3
+    assert client.event_metrics["processed"] == len(names)
+    assert client.event_metrics["dropped"] == 0
+    assert client.throughput.frames == 3
+
+
+def test_fake_server_throughput_counts_dropped_events():
+    with FakeBlueAPIServer(events_per_task=50, seed=0) as server:
+        client = server.client(
+            callback=True, timeout=5, best_effort=False, event_queue_size=1
+        )
+        client.add_event_callback(lambda event: time.sleep(0.01))
+
+        client.run("count")
+
+    assert client.event_metrics["dropped"] > 0
+    assert client.throughput.frames == 50
+
+
+def test_fake_server_run_without_callback(server: FakeBlueAPIServer, capsys):
+    client = server.client(callback=False)
+
+    client.run("sleep", time=1)
+
+    (task,) = server.tasks.values()
+    assert task.task.params == {"time": 1}
+    assert f"sleep task sent as {task.task_id}" in capsys.readouterr().out
+
+
+def test_fake_server_failures_are_retried(server: FakeBlueAPIServer):
+    server.failure_rate = 1.0
+    client = server.client(
+        callback=False,
+        retry_policy=RetryPolicy(RETRYABLE_ERRORS, max_attempts=3, base_delay=0),
+    )
+
+    with pytest.raises(Exception, match="could not be executed"):
+        client.run("count")
+
+    assert server.requests["PUT /worker/task"] == 3
+    assert client.retry_metrics["retries"] == 2
+
+
+def test_fake_server_retries_start_the_same_task():
+    with FakeBlueAPIServer(events_per_task=3, failure_rate=0.5, seed=0) as server:
+        client = server.client(
+            callback=False,
+            retry_policy=RetryPolicy(
+                RETRYABLE_ERRORS, max_attempts=100, base_delay=0.01, deadline=None
+            ),
+        )
+
+        for _ in range(5):
+            client.run("count")
+
+    # a refused start is retried for the same task, not by creating another
+    assert server.requests["POST /tasks"] == 5
+    assert server.requests["PUT /worker/task"] > 5
+
+
+def test_fake_server_unknown_plan(server: FakeBlueAPIServer):
+    client = server.client(callback=False)
+
+    with pytest.raises(Exception):  # noqa
+        client.run("not_a_plan")
@@ -1,6 +1,5 @@
 import json
 import time
-from collections import deque
 from unittest.mock import Mock
 
 import pytest
@@ -48,9 +47,45 @@ def test_message_unpacker():
 
     unpacked_message = MessageUnpacker.unpack_dict(sample_message)
 
-    assert isinstance(unpacked_message, deque)
+    assert isinstance(unpacked_message, list)
     assert "time: " in unpacked_message[1]
 
+    # earlier messages aren't returned again
+    assert MessageUnpacker.unpack_dict({"a": 1}) == ["a: 1"]
+
+
+def test_message_unpacker_key_paths():
+    unpacker = MessageUnpacker(key_paths=True)
+    message = {"doc": {"data": {"saxs": 1, "waxs": 2}, "seq_num": 3}, "empty": {}}
+
+    assert list(unpacker.lines(message)) == [
+        "doc.data.saxs: 1",
+        "doc.data.waxs: 2",
+        "doc.seq_num: 3",
+    ]
+    assert next(unpacker.flatten(message)) == (("doc", "data", "saxs"), "1")
+
+
+def test_message_unpacker_depth_limit():
+    message: dict = {"value": 0}
+    for level in range(1, 20):
+        message = {f"level{level}": message}
+
+    lines = MessageUnpacker.unpack_dict(message, max_depth=3, key_paths=True)
+
+    assert len(lines) == 1
+    assert lines[0].startswith("level19.level18.level17: {")
+
+
+def test_message_unpacker_truncates_large_values():
+    message = {"text": "x" * 1000, "array": list(range(100_000))}
+
+    text, array = MessageUnpacker.unpack_dict(message, max_value_length=50)
+
+    assert text == f"text: {'x' * 50}... (1000 chars)"
+    assert array.startswith("array: [0, 1, 2")
+    assert len(array) < 100
+
 
 def test_scan_messenger():
     listener = ScanListener(maxlen=10)
@@ -62,7 +97,7 @@ def test_scan_messenger():
     listener.on_message(MockMessage("test message 1"))
     listener.on_error(MockMessage("error message 1"))
 
-    assert len(listener.messages) == 1
+    assert len(listener) == 1
 
 
 def test_messenger_creation():
@@ -135,7 +170,7 @@ def test_messenger_listener():
         auto_connect=False,
     )
 
-    messenger.scan_listener.messages.append({"body": "test message"})
+    messenger.scan_listener.put_body({"body": "test message"})
     messenger.listen(max_iter=5, interval=0.01)
 
 
@@ -8,6 +8,7 @@ from saxs_bluesky.logging.bluesky_logpanel import BlueskyLogPanel
 from saxs_bluesky.logging.bluesky_messenger import (
     StompMessenger,
 )
+from saxs_bluesky.logging.message_store import LogFilter
 
 
 class MockEvent:
@@ -52,7 +53,17 @@ def connected_messenger(mock_connection: Mock) -> StompMessenger:
 @patch("saxs_bluesky.logging.bluesky_logpanel.Text")
 @patch("saxs_bluesky.logging.bluesky_logpanel.ttk.Style")
 @patch("saxs_bluesky.logging.bluesky_logpanel.ttk.Scrollbar")
+@patch("saxs_bluesky.logging.bluesky_logpanel.ttk.Frame")
+@patch("saxs_bluesky.logging.bluesky_logpanel.ttk.Label")
+@patch("saxs_bluesky.logging.bluesky_logpanel.ttk.Entry")
+@patch("saxs_bluesky.logging.bluesky_logpanel.ttk.Combobox")
+@patch("saxs_bluesky.logging.bluesky_logpanel.StringVar")
 def connected_logpanel(
+    mock_stringvar: Mock,
+    mock_combobox: Mock,
+    mock_entry: Mock,
+    mock_label: Mock,
+    mock_frame: Mock,
     mock_scrollbar: Mock,
     mock_style: Mock,
     mock_text: Mock,
@@ -101,7 +112,7 @@ def test_logpanel_initialisatioin(connected_logpanel: BlueskyLogPanel):
         },
     }
 
-    connected_logpanel.messenger.scan_listener.messages.append(sample_message)
+    connected_logpanel.messenger.scan_listener.put_body(sample_message)
 
     connected_logpanel.run_loop(
         maxiter=5
@@ -120,3 +131,124 @@ def test_logpanel_copy_paste(connected_logpanel: BlueskyLogPanel):
     assert connected_logpanel.ctrl_event(copy_event) == "break"
     assert connected_logpanel.ctrl_event(paste_event) == "break"
     assert connected_logpanel.ctrl_event(other_event) == "break"
+
+
+def test_logpanel_batches_inserts_per_tick(connected_logpanel: BlueskyLogPanel):
+    for n in range(3):
+        connected_logpanel.messenger.scan_listener.put_body({"seq_num": n})
+
+    connected_logpanel.logs.insert.reset_mock()
+    assert connected_logpanel.process_messages() == 3
+
+    connected_logpanel.logs.insert.assert_called_once()
+    text = connected_logpanel.logs.insert.call_args.args[1]
+    assert text.count("seq_num: ") == 3
+    assert not connected_logpanel.messenger.scan_listener
+
+
+def test_logpanel_batch_size(connected_logpanel: BlueskyLogPanel):
+    connected_logpanel.batch_size = 2
+    for n in range(3):
+        connected_logpanel.messenger.scan_listener.put_body({"seq_num": n})
+
+    assert connected_logpanel.process_messages() == 2
+    assert connected_logpanel.process_messages() == 1
+    assert connected_logpanel.process_messages() == 0
+
+
+def test_logpanel_trims_to_max_lines(connected_logpanel: BlueskyLogPanel):
+    connected_logpanel.max_lines = 10
+
+    connected_logpanel.insert_lines([f"line {n}\n" for n in range(8)])
+    connected_logpanel.logs.delete.assert_not_called()
+
+    connected_logpanel.insert_lines([f"line {n}\n" for n in range(5)])
+    connected_logpanel.logs.delete.assert_called_once_with("1.0", "4.0")
+    assert connected_logpanel.line_count == 10
+
+
+def test_logpanel_polls_with_after(connected_logpanel: BlueskyLogPanel):
+    window = connected_logpanel.window
+    window.after = Mock(return_value="after#1")
+    window.after_cancel = Mock()
+
+    connected_logpanel.start()
+    window.after.assert_called_once_with(25, connected_logpanel.on_tick)
+
+    connected_logpanel.messenger.scan_listener.put_body({"seq_num": 1})
+    connected_logpanel.on_tick()
+    assert not connected_logpanel.messenger.scan_listener
+    assert window.after.call_count == 2
+
+    connected_logpanel.stop()
+    window.after_cancel.assert_called_once_with("after#1")
+    connected_logpanel.on_tick()
+    assert window.after.call_count == 2
+
+
+def test_logpanel_filters_by_task_and_level(connected_logpanel: BlueskyLogPanel):
+    listener = connected_logpanel.messenger.scan_listener
+    listener.put_body({"name": "start", "doc": {"uid": "a"}, "task_id": "t1"})
+    listener.put_body({"name": "start", "doc": {"uid": "b"}, "task_id": "t2"})
+    listener.put_body(
+        {
+            "state": "IDLE",
+            "task_status": {"task_id": "t2", "task_failed": True},
+            "errors": ["plan failed"],
+        }
+    )
+    connected_logpanel.process_messages()
+
+    connected_logpanel.set_filter(LogFilter(task_id="t2"))
+    assert connected_logpanel.matches is not None
+    assert [entry.kind for entry in connected_logpanel.matches] == [
+        "start",
+        "worker",
+    ]
+
+    connected_logpanel.set_filter(LogFilter(level="error"))
+    (entry,) = connected_logpanel.matches
+    args = connected_logpanel.logs.insert.call_args.args
+    assert "error" in args
+    assert "plan failed" in args[args.index("error") - 1]
+
+    # new messages are shown if they match the filter
+    listener.put_body({"name": "start", "doc": {"uid": "c"}, "task_id": "t3"})
+    listener.put_body({"state": "IDLE", "errors": ["another"]})
+    connected_logpanel.process_messages()
+    assert len(connected_logpanel.matches) == 2
+
+    connected_logpanel.set_filter(LogFilter())
+    assert connected_logpanel.matches is None
+
+
+def test_logpanel_search_refines_matches(connected_logpanel: BlueskyLogPanel):
+    for n in range(20):
+        connected_logpanel.messenger.scan_listener.put_body({"plan": f"p{n}"})
+    connected_logpanel.process_messages()
+
+    connected_logpanel.set_filter(LogFilter(text="p1"))
+    assert connected_logpanel.matches is not None
+    assert len(connected_logpanel.matches) == 11
+
+    with patch.object(
+        connected_logpanel.store, "query", wraps=connected_logpanel.store.query
+    ) as query:
+        connected_logpanel.set_filter(LogFilter(text="p12"))
+
+    assert query.call_args.kwargs["within"] is not None
+    assert len(connected_logpanel.matches) == 1
+
+
+def test_logpanel_drops_evicted_matches(connected_logpanel: BlueskyLogPanel):
+    connected_logpanel.store.max_entries = 20
+    listener = connected_logpanel.messenger.scan_listener
+
+    connected_logpanel.set_filter(LogFilter(kind="message"))
+    for n in range(50):
+        listener.put_body({"plan": f"p{n}"})
+        connected_logpanel.process_messages()
+
+    assert connected_logpanel.matches is not None
+    assert len(connected_logpanel.matches) <= 20
+    assert connected_logpanel.matches[0] is connected_logpanel.store.entries[0]
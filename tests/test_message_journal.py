@@ -0,0 +1,182 @@
+import gzip
+import json
+import threading
+
+from saxs_bluesky.logging.bluesky_messenger import ScanListener
+from saxs_bluesky.logging.message_journal import (
+    JournalReader,
+    MessageJournal,
+    segment_info,
+)
+from saxs_bluesky.logging.message_queue import ReceivedMessage, TopicPolicy
+
+TOPIC = "/topic/test"
+
+
+def received(n: int, topic: str = TOPIC) -> ReceivedMessage:
+    return ReceivedMessage(topic, json.dumps({"n": n}), received=1000.0 + n)
+
+
+def test_journal_writes_every_message_in_order(tmp_path):
+    with MessageJournal(tmp_path) as journal:
+        for n in range(50):
+            journal.append(received(n))
+
+    assert journal.written == 50
+    assert journal.dropped == 0
+
+    records = list(JournalReader(tmp_path).read())
+    assert [json.loads(record["raw"])["n"] for record in records] == list(range(50))
+    assert records[0] == {"t": 1000.0, "topic": TOPIC, "raw": '{"n": 0}'}
+
+
+def test_journal_rotates_and_keeps_newest_segments(tmp_path):
+    with MessageJournal(tmp_path, max_segment_bytes=200, max_segments=3) as journal:
+        for n in range(100):
+            journal.append(received(n))
+
+    segments = journal.segments()
+    assert len(segments) == 3
+    assert [segment_info(path)[0] for path in segments] == sorted(
+        segment_info(path)[0] for path in segments
+    )
+
+    # the segments are named by their first message's time
+    for path in segments:
+        with gzip.open(path, "rt") as file:
+            first = json.loads(file.readline())
+        assert segment_info(path)[1] == first["t"]
+
+    records = list(JournalReader(tmp_path).read())
+    assert records[-1]["t"] == 1099.0
+    assert len(records) < 100
+
+
+def test_reader_seeks_and_tails(tmp_path):
+    with MessageJournal(tmp_path, max_segment_bytes=200) as journal:
+        for n in range(100):
+            journal.append(received(n))
+
+    reader = JournalReader(tmp_path)
+    assert len(reader.segments()) > 5
+
+    since = [record["t"] for record in reader.read(since=1042.5)]
+    assert since == [1000.0 + n for n in range(43, 100)]
+
+    tail = reader.tail(7)
+    assert [record["t"] for record in tail] == [1000.0 + n for n in range(93, 100)]
+    assert reader.tail(0) == []
+    assert len(reader.tail(1000)) == 100
+
+    messages = list(reader.messages(since=1098.0))
+    assert [message.body for message in messages] == [{"n": 98}, {"n": 99}]
+
+
+def test_journal_carries_on_numbering_in_existing_directory(tmp_path):
+    with MessageJournal(tmp_path) as journal:
+        journal.append(received(0))
+    with MessageJournal(tmp_path) as journal:
+        journal.append(received(1))
+
+    assert [segment_info(path)[0] for path in journal.segments()] == [0, 1]
+    assert len(JournalReader(tmp_path).tail(10)) == 2
+
+
+def test_reader_reads_segment_still_being_written(tmp_path):
+    journal = MessageJournal(tmp_path, flush_interval=0.01)
+    for n in range(10):
+        journal.append(received(n))
+
+    for _ in range(500):
+        if journal.written == 10:
+            break
+        journal._thread.join(0.01)  # noqa: SLF001
+
+    # flushed, but the gzip stream is not finished until the segment is closed
+    assert len(JournalReader(tmp_path).tail(100)) == 10
+    journal.close()
+
+
+def test_listener_journals_messages_it_drops(tmp_path):
+    journal = MessageJournal(tmp_path)
+    listener = ScanListener(policies={TOPIC: TopicPolicy(maxlen=2)}, journal=journal)
+
+    for n in range(5):
+        listener.put(received(n))
+    journal.close()
+
+    assert len(listener) == 2
+    assert listener.metrics.as_dict()["dropped"] == 3
+    assert len(list(JournalReader(tmp_path).read())) == 5
+
+
+def test_journal_keeps_progress_later_coalesced(tmp_path):
+    journal = MessageJournal(tmp_path)
+    listener = ScanListener(journal=journal)
+
+    for n in range(3):
+        body = {"task_id": "t1", "statuses": {"saxs": {"current": n}}}
+        listener.put(ReceivedMessage(TOPIC, json.dumps(body), received=float(n)))
+    journal.close()
+
+    assert len(listener) == 1
+    raws = [json.loads(record["raw"]) for record in JournalReader(tmp_path).read()]
+    assert [raw["statuses"]["saxs"]["current"] for raw in raws] == [0, 1, 2]
+
+
+def test_journal_drops_rather_than_blocks_when_full(tmp_path):
+    writing, gate = threading.Event(), threading.Event()
+
+    class SlowJournal(MessageJournal):
+        def _write(self, records):
+            writing.set()
+            gate.wait()
+            super()._write(records)
+
+    journal = SlowJournal(tmp_path, queue_size=1)
+    journal.append(received(0))
+    assert writing.wait(5)
+
+    journal.append(received(1))
+    journal.append(received(2))
+    assert journal.dropped == 1
+
+    gate.set()
+    journal.close()
+    assert journal.written == 2
+
+
+def test_journal_carries_on_after_a_bad_record(tmp_path):
+    class BadJournal(MessageJournal):
+        def line(self, record):
+            if record[0] == 1001.0:
+                raise ValueError("bad record")
+            return super().line(record)
+
+    with BadJournal(tmp_path) as journal:
+        for n in range(3):
+            journal.append(received(n))
+
+    assert journal.errors == 1
+    assert journal.written == 2
+    assert [record["t"] for record in JournalReader(tmp_path).read()] == [
+        1000.0,
+        1002.0,
+    ]
+    assert not journal._thread.is_alive()  # noqa: SLF001
+
+
+def test_journal_closes_segment_when_flush_fails(tmp_path):
+    class FullDisk(MessageJournal):
+        def _write(self, records):
+            super()._write(records)
+            raise OSError("disk full")
+
+    with FullDisk(tmp_path) as journal:
+        journal.append(received(0))
+
+    assert journal.errors >= 1
+    # the segment was still closed, so its gzip stream is complete
+    (path,) = journal.segments()
+    with gzip.open(path, "rt") as file:
+        assert json.loads(file.read())["t"] == 1000.0
@@ -0,0 +1,139 @@
+import json
+
+from saxs_bluesky.logging.bluesky_messenger import ScanListener
+from saxs_bluesky.logging.message_queue import (
+    ReceivedMessage,
+    TopicPolicy,
+    TopicQueue,
+)
+
+TOPIC = "/topic/test"
+
+
+class MockFrame:
+    def __init__(self, body: dict | str, destination: str = TOPIC):
+        self.body = body if isinstance(body, str) else json.dumps(body)
+        self.headers = {"destination": destination}
+
+
+def progress(n: int, task_id: str = "t1") -> dict:
+    return {"task_id": task_id, "statuses": {"saxs": {"current": n}}}
+
+
+def error(n: int) -> dict:
+    return {"state": "IDLE", "errors": [f"failed {n}"], "task_status": None}
+
+
+def test_received_message_sniffs_without_parsing():
+    message = ReceivedMessage(TOPIC, json.dumps(progress(1)))
+    assert message.progress and not message.error
+    assert message._body is None  # noqa: SLF001
+    assert message.task_id == "t1"
+
+    assert ReceivedMessage(TOPIC, json.dumps(error(1))).error
+    assert not ReceivedMessage(TOPIC, json.dumps({"errors": []})).error
+    assert ReceivedMessage(TOPIC, '{"task_status": {"task_failed": true}}').error
+
+
+def test_listener_parses_lazily_in_order_across_topics():
+    listener = ScanListener()
+    listener.on_message(MockFrame({"n": 0}, "/topic/a"))
+    listener.on_message(MockFrame({"n": 1}, "/topic/b"))
+    listener.on_message(MockFrame({"n": 2}, "/topic/a"))
+
+    assert listener.metrics.as_dict()["parsed"] == 0
+
+    received = listener.get_received()
+    assert [message.body["n"] for message in received] == [0, 1, 2]
+    assert [message.topic for message in received] == [
+        "/topic/a",
+        "/topic/b",
+        "/topic/a",
+    ]
+    assert listener.metrics.as_dict()["parsed"] == 3
+
+
+def test_listener_drops_oldest_when_full():
+    listener = ScanListener(policies={TOPIC: TopicPolicy(maxlen=3)})
+    for n in range(5):
+        listener.on_message(MockFrame({"n": n}))
+
+    assert [body["n"] for body in listener.get_messages()] == [2, 3, 4]
+    assert listener.metrics.as_dict()["dropped"] == 2
+
+
+def test_listener_drops_newest_when_full():
+    listener = ScanListener(policies={TOPIC: TopicPolicy(maxlen=3, drop="newest")})
+    for n in range(5):
+        listener.on_message(MockFrame({"n": n}))
+
+    assert [body["n"] for body in listener.get_messages()] == [0, 1, 2]
+    assert listener.metrics.as_dict()["dropped"] == 2
+
+
+def test_listener_never_drops_errors():
+    listener = ScanListener(policies={TOPIC: TopicPolicy(maxlen=2)})
+    listener.on_message(MockFrame(error(0)))
+    for n in range(5):
+        listener.on_message(MockFrame({"n": n}))
+    listener.on_message(MockFrame(error(1)))
+
+    bodies = listener.get_messages()
+    assert bodies[0] == error(0)
+    assert bodies[-1] == error(1)
+    assert {"n": 4} in bodies
+
+
+def test_listener_coalesces_progress():
+    listener = ScanListener(policies={TOPIC: TopicPolicy(maxlen=100)})
+    listener.on_message(MockFrame({"name": "start"}))
+    for n in range(10):
+        listener.on_message(MockFrame(progress(n)))
+    listener.on_message(MockFrame({"name": "stop"}))
+    listener.on_message(MockFrame(progress(10)))
+
+    # the waiting update keeps its place, with the latest progress
+    bodies = listener.get_messages()
+    assert bodies == [{"name": "start"}, progress(10), {"name": "stop"}]
+    assert listener.metrics.as_dict()["coalesced"] == 10
+
+
+def test_listener_coalesces_progress_per_task():
+    listener = ScanListener(policies={TOPIC: TopicPolicy(maxlen=100)})
+    for n in range(5):
+        listener.on_message(MockFrame(progress(n, "t1")))
+        listener.on_message(MockFrame(progress(n, "t2")))
+
+    # each task keeps its own latest update, in the order they were first seen
+    bodies = listener.get_messages()
+    assert bodies == [progress(4, "t1"), progress(4, "t2")]
+    assert listener.metrics.as_dict()["coalesced"] == 8
+
+
+def test_coalesced_progress_keeps_first_received_time():
+    queue = TopicQueue(TopicPolicy())
+    queue.put(ReceivedMessage(TOPIC, json.dumps(progress(0)), received=1.0))
+    queue.put(ReceivedMessage(TOPIC, json.dumps(progress(1)), received=2.0))
+
+    message = queue.pop()
+    assert message.body == progress(1)
+    assert message.received == 1.0
+
+
+def test_listener_progress_after_one_is_taken_is_queued():
+    listener = ScanListener(policies={TOPIC: TopicPolicy(coalesce_progress=True)})
+    listener.on_message(MockFrame(progress(0)))
+    assert listener.get_messages() == [progress(0)]
+
+    listener.on_message(MockFrame(progress(1)))
+    assert listener.get_messages() == [progress(1)]
+
+
+def test_listener_counts_invalid_messages():
+    listener = ScanListener()
+    listener.on_message(MockFrame("not json"))
+    listener.on_message(MockFrame({"n": 1}))
+
+    assert listener.get_messages() == [{"n": 1}]
+    metrics = listener.metrics.as_dict()
+    assert (metrics["received"], metrics["parsed"], metrics["invalid"]) == (2, 1, 1)
@@ -0,0 +1,110 @@
+import pytest
+
+from saxs_bluesky.logging.message_store import LogFilter, MessageStore, classify
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ({"name": "start", "doc": {}, "task_id": "t1"}, ("start", "t1", "info")),
+        (
+            {"name": "stop", "doc": {"exit_status": "fail"}, "task_id": "t1"},
+            ("stop", "t1", "error"),
+        ),
+        (
+            {"name": "stop", "doc": {"exit_status": "abort"}, "task_id": "t1"},
+            ("stop", "t1", "warning"),
+        ),
+        ({"task_id": "t2", "statuses": {}}, ("progress", "t2", "info")),
+        (
+            {"state": "IDLE", "task_status": {"task_id": "t3"}, "errors": ["bad"]},
+            ("worker", "t3", "error"),
+        ),
+        ({"state": "PAUSED", "task_status": None}, ("worker", None, "warning")),
+        ({"filePath": "/x.nxs", "status": "UPDATED"}, ("message", None, "info")),
+    ],
+)
+def test_classify(message: dict, expected: tuple):
+    assert classify(message) == expected
+
+
+def make_store(n: int, **kwargs) -> MessageStore:
+    store = MessageStore(**kwargs)
+    for i in range(n):
+        store.add(
+            {"name": "event", "doc": {"seq_num": i}, "task_id": f"t{i % 3}"},
+            topic="public.worker.event",
+            received=float(i),
+        )
+    return store
+
+
+def test_store_query_by_index():
+    store = make_store(30)
+
+    matches = store.query(LogFilter(task_id="t1", kind="event"))
+
+    assert [entry.message["doc"]["seq_num"] for entry in matches] == list(
+        range(1, 30, 3)
+    )
+    assert store.query(LogFilter(topic="other")) == []
+    assert sorted(store.values("task_id")) == ["t0", "t1", "t2"]
+
+
+def test_store_query_by_time_and_text():
+    store = make_store(30)
+
+    matches = store.query(LogFilter(since=10, until=12))
+    assert [entry.time for entry in matches] == [10, 11, 12]
+
+    matches = store.query(LogFilter(text="seq_num: 25"))
+    assert [entry.time for entry in matches] == [25]
+
+
+def test_store_query_within_previous_matches():
+    store = make_store(30)
+    previous = store.query(LogFilter(task_id="t0"))
+
+    matches = store.query(LogFilter(task_id="t0", text="seq_num: 2"), within=previous)
+
+    assert [entry.time for entry in matches] == [21, 24, 27]
+
+
+def test_store_time_slice_with_received_times_out_of_order():
+    store = MessageStore()
+    for received in (1.0, 2.0, 1.5, 3.0, 4.0):
+        store.add({"name": "event", "doc": {}}, received=received)
+
+    assert [entry.seen for entry in store] == [1.0, 2.0, 2.0, 3.0, 4.0]
+    matches = store.query(LogFilter(since=2.5, until=4.0))
+    assert [entry.time for entry in matches] == [3.0, 4.0]
+
+
+def test_store_index_and_time_slice_agree():
+    store = MessageStore()
+    for received in (1.0, 2.0, 1.5, 3.0):
+        store.add({"name": "event", "doc": {}}, topic="scan", received=received)
+
+    # the first filter is answered from the topic index, the second from a
+    # slice of the entries, both compare the seen times
+    by_index = store.query(LogFilter(topic="scan", since=1.8, until=2.5))
+    by_slice = store.query(LogFilter(since=1.8, until=2.5))
+
+    assert by_index == by_slice
+    assert [entry.time for entry in by_index] == [2.0, 1.5]
+
+
+def test_store_drops_oldest_entries():
+    store = make_store(25, max_entries=20)
+
+    assert len(store) <= 20
+    assert store.entries[-1].time == 24
+    assert all(entry.time >= 5 for entry in store.query(LogFilter(task_id="t0")))
+
+
+def test_filter_refines():
+    assert LogFilter(task_id="t1", text="abc").refines(
+        LogFilter(task_id="t1", text="b")
+    )
+    assert not LogFilter(task_id="t1", text="abc").refines(LogFilter(text="b"))
+    assert not LogFilter(text="ab").refines(LogFilter(text="abc"))
@@ -0,0 +1,43 @@
+import threading
+
+from saxs_bluesky.logging.message_queue import ListenerMetrics
+from saxs_bluesky.utils.event_dispatch import DispatchMetrics
+from saxs_bluesky.utils.metrics import Counters
+from saxs_bluesky.utils.retry import RetryMetrics
+
+
+class TwoCounters(Counters):
+    FIELDS = ("a", "b")
+
+
+def test_counters_increment_and_reset():
+    counters = TwoCounters()
+    counters.increment("a")
+    counters.increment("b", 3)
+
+    assert counters.as_dict() == {"a": 1, "b": 3}
+
+    counters.reset()
+    assert counters.as_dict() == {"a": 0, "b": 0}
+
+
+def test_counters_are_thread_safe():
+    counters = TwoCounters()
+
+    def count():
+        for _ in range(10_000):
+            counters.increment("a")
+
+    threads = [threading.Thread(target=count) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counters.as_dict()["a"] == 40_000
+
+
+def test_metrics_share_counters():
+    for metrics in (RetryMetrics(), DispatchMetrics(), ListenerMetrics()):
+        assert isinstance(metrics, Counters)
+        assert set(metrics.as_dict()) == set(metrics.FIELDS)
@@ -164,6 +164,43 @@ def test_panda_run(
     run_engine(run_plan())
 
 
+@pytest.mark.usefixtures("local_path_provider")
+def test_panda_run_with_processing_notifier(
+    run_engine: RunEngine,
+    panda: HDFPanda,
+    pilatus: PilatusDetector,
+    valid_profile: Profile,
+):
+    names = []
+
+    def run_plan():
+        yield from set_profile(valid_profile)
+        yield from set_trigger_info(valid_profile.return_trigger_info(0.1))
+        yield from set_detectors(detectors=[pilatus])  # type: ignore
+        yield from run_panda_triggering(
+            panda=panda, baseline=[], notify_processing=True
+        )
+
+    def skip(*args, **kwargs):
+        yield from bps.null()
+
+    def notifier():
+        return lambda name, doc: names.append(name)
+
+    # mock detectors can't be flown, only the run and its documents matter
+    with (
+        patch("saxs_bluesky.plans.ncd_panda.DEFAULT_BASELINE", []),
+        patch("saxs_bluesky.plans.ncd_panda.fly_and_collect_with_wait", skip),
+        patch("saxs_bluesky.plans.ncd_panda.wait_until_complete", skip),
+        patch("saxs_bluesky.plans.ncd_panda.set_panda_pulses", skip),
+        patch("saxs_bluesky.plans.ncd_panda.processing_notifier", notifier),
+    ):
+        run_engine(run_plan())
+
+    assert names[0] == "start"
+    assert names[-1] == "stop"
+
+
 def test_return_deadtime(panda: HDFPanda, pilatus: PilatusDetector):
     detectors = [panda, pilatus]
 
@@ -243,10 +280,12 @@ def test_log_deadtime(patch_logger: MagicMock):
     assert "0.2" in last_log
 
 
-def test_save_load_panda_settings(run_engine: RunEngine, panda: HDFPanda):
+def test_save_load_panda_settings(
+    run_engine: RunEngine, panda: HDFPanda, tmp_path: Path
+):
     def save_load():
-        yield from save_device_to_yaml(YAML_DIR, "test", panda)
-        yield from load_settings_to_panda(YAML_DIR, "test", panda)
+        yield from save_device_to_yaml(str(tmp_path), "test", panda)
+        yield from load_settings_to_panda(str(tmp_path), "test", panda)
 
     run_engine(save_load())
 
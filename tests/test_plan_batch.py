@@ -0,0 +1,114 @@
+from unittest.mock import Mock, patch
+
+import bluesky.plan_stubs as bps
+import pytest
+from blueapi.core import BlueskyContext
+from bluesky import RunEngine
+from dodal.plan_stubs.wrapped import set_absolute, sleep
+from ophyd_async.core import soft_signal_rw
+
+from saxs_bluesky.plans.sequence import run_plan_sequence
+from saxs_bluesky.utils.beamline_client import BlueAPIPythonClient
+from saxs_bluesky.utils.plan_batch import SEQUENCE_PLAN, PlanCall
+
+
+def test_batch_submits_one_task(client_without_callback: BlueAPIPythonClient):
+    with patch.object(client_without_callback, "send_without_callback") as send:
+        with client_without_callback.batch() as batch:
+            for x in (0.1, 0.2):
+                batch.run(set_absolute, "base.x", x)
+                batch.run(sleep, time=1)
+
+            assert len(batch) == 4
+            send.assert_not_called()
+
+    send.assert_called_once()
+    plan_name, task = send.call_args.args
+
+    assert plan_name == SEQUENCE_PLAN
+    assert task.instrument_session == "cm12345-1"
+    assert task.params["steps"] == [
+        {"name": "set_absolute", "params": {"movable": "base.x", "value": 0.1}},
+        {"name": "sleep", "params": {"time": 1}},
+        {"name": "set_absolute", "params": {"movable": "base.x", "value": 0.2}},
+        {"name": "sleep", "params": {"time": 1}},
+    ]
+
+
+def test_batch_not_submitted_on_error(client_without_callback: BlueAPIPythonClient):
+    with patch.object(client_without_callback, "send_without_callback") as send:
+        with pytest.raises(RuntimeError):
+            with client_without_callback.batch() as batch:
+                batch.run(sleep, time=1)
+                raise RuntimeError("failed while recording")
+
+    send.assert_not_called()
+
+
+def test_empty_batch_not_submitted(client_without_callback: BlueAPIPythonClient):
+    client_without_callback.run = Mock()
+
+    with client_without_callback.batch():
+        pass
+
+    client_without_callback.run.assert_not_called()
+
+
+@pytest.fixture
+async def context() -> BlueskyContext:
+    ctx = BlueskyContext()
+    ctx.register_plan(set_absolute)
+    ctx.register_plan(sleep)
+    ctx.register_plan(run_plan_sequence)
+
+    signal = soft_signal_rw(float, name="signal")
+    await signal.connect()
+    ctx.register_device(signal)
+
+    return ctx
+
+
+def read_signal(context: BlueskyContext, run_engine: RunEngine) -> float:
+    values = []
+
+    def read():
+        values.append((yield from bps.rd(context.find_device("signal"))))
+
+    run_engine(read())
+    return values[0]
+
+
+def test_run_plan_sequence(context: BlueskyContext, run_engine: RunEngine):
+    steps = [
+        PlanCall(name="set_absolute", params={"movable": "signal", "value": 1.5}),
+        PlanCall(name="sleep", params={"time": 0}),
+        PlanCall(
+            name="set_absolute",
+            params={"movable": "signal", "value": 2.5, "wait": True},
+        ),
+    ]
+
+    with patch("saxs_bluesky.plans.sequence.blueapi_context", return_value=context):
+        run_engine(run_plan_sequence(steps))
+
+    assert read_signal(context, run_engine) == 2.5
+
+
+@pytest.mark.parametrize(
+    "step",
+    [
+        PlanCall(name="not_a_plan"),
+        PlanCall(name=SEQUENCE_PLAN, params={"steps": []}),
+        PlanCall(name="sleep", params={"time": "not a time"}),
+    ],
+)
+def test_run_plan_sequence_checks_steps_first(
+    context: BlueskyContext, run_engine: RunEngine, step: PlanCall
+):
+    first = PlanCall(name="set_absolute", params={"movable": "signal", "value": 1})
+
+    with patch("saxs_bluesky.plans.sequence.blueapi_context", return_value=context):
+        with pytest.raises(Exception):  # noqa
+            run_engine(run_plan_sequence([first, step]))
+
+    assert read_signal(context, run_engine) == 0
@@ -0,0 +1,254 @@
+import numpy as np
+import pytest
+
+from saxs_bluesky.utils.plotter import ProfilePlotter
+from saxs_bluesky.utils.profile_groups import Group, Profile
+
+
+def loop_pulse_signal(profile: Profile, pulse: int) -> tuple[np.ndarray, np.ndarray]:
+    """The frame by frame signal generation ProfilePlotter used to do"""
+    current_time = 0.0
+    trigger_time = [current_time]
+    signal = [0]
+
+    for group in profile.groups:
+        for _frame in range(group.frames):
+            current_time += group.wait_time_s
+            trigger_time.append(current_time)
+            signal.append(group.wait_pulses[pulse])
+
+            current_time += group.run_time_s
+            trigger_time.append(current_time)
+            signal.append(group.run_pulses[pulse])
+
+    trigger_time.append(current_time + (current_time) / 10)
+    signal.append(0)
+
+    return np.asarray(trigger_time), np.asarray(signal)
+
+
+@pytest.fixture
+def mixed_profile() -> Profile:
+    profile = Profile(repeats=2)
+
+    for frames, wait_units, wait_pulses in (
+        (3, "MS", [1, 0, 0, 1]),
+        (1, "S", [0, 0, 1, 0]),
+        (5, "US", [0, 1, 0, 0]),
+    ):
+        profile.append_group(
+            Group(
+                frames=frames,
+                trigger="IMMEDIATE",
+                wait_time=7,
+                wait_units=wait_units,
+                run_time=3,
+                run_units="MS",
+                wait_pulses=wait_pulses,
+                run_pulses=[1, 1, 0, 1],
+            )
+        )
+
+    return profile
+
+
+@pytest.mark.parametrize("pulse", [0, 1, 2, 3])
+def test_generate_pulse_signal_matches_frame_loop(mixed_profile: Profile, pulse: int):
+    trigger_time, signal = ProfilePlotter.generate_pulse_signal(mixed_profile, pulse)
+    expected_time, expected_signal = loop_pulse_signal(mixed_profile, pulse)
+
+    np.testing.assert_array_equal(trigger_time, expected_time)
+    np.testing.assert_array_equal(signal, expected_signal)
+
+
+def test_generate_pulse_signals_all_pulses(mixed_profile: Profile):
+    trigger_time, signals = ProfilePlotter.generate_pulse_signals(
+        mixed_profile, [0, 1, 2, 3]
+    )
+
+    assert signals.shape == (4, 2 * mixed_profile.total_frames + 2)
+
+    for pulse, signal in enumerate(signals):
+        np.testing.assert_array_equal(
+            signal, loop_pulse_signal(mixed_profile, pulse)[1]
+        )
+
+
+def test_generate_pulse_signal_without_groups():
+    trigger_time, signal = ProfilePlotter.generate_pulse_signal(Profile(), 0)
+
+    np.testing.assert_array_equal(trigger_time, [0, 0])
+    np.testing.assert_array_equal(signal, [0, 0])
+
+
+def large_profile(frames: int = 100_000) -> Profile:
+    return Profile(
+        groups=[
+            Group(
+                frames=frames,
+                trigger="IMMEDIATE",
+                wait_time=1,
+                wait_units="MS",
+                run_time=1,
+                run_units="MS",
+                wait_pulses=[0, 0, 0, 0],
+                run_pulses=[1, 1, 1, 0],
+            ),
+            Group(
+                frames=10,
+                trigger="IMMEDIATE",
+                wait_time=1,
+                wait_units="S",
+                run_time=1,
+                run_units="S",
+                wait_pulses=[1, 0, 0, 0],
+                run_pulses=[1, 1, 0, 0],
+            ),
+        ]
+    )
+
+
+def test_generate_pulse_signals_in_full_range(mixed_profile: Profile):
+    trigger_time, signals = ProfilePlotter.generate_pulse_signals(
+        mixed_profile, [0, 1, 2, 3]
+    )
+    range_time, range_signals = ProfilePlotter.generate_pulse_signals_in_range(
+        mixed_profile, [0, 1, 2, 3], 0, trigger_time[-1]
+    )
+
+    np.testing.assert_allclose(range_time, trigger_time)
+    np.testing.assert_array_equal(range_signals, signals)
+
+
+def test_generate_pulse_signals_in_range_only_visible_frames():
+    profile = large_profile()
+
+    trigger_time, signals = ProfilePlotter.generate_pulse_signals_in_range(
+        profile, [0], 1.0005, 1.0105
+    )
+
+    assert len(trigger_time) < 20
+    assert trigger_time[0] <= 1.0005
+    assert trigger_time[-1] >= 1.0105
+    assert signals.shape == (1, len(trigger_time))
+
+
+def test_generate_pulse_envelopes():
+    profile = large_profile()
+
+    trigger_time, lower, upper = ProfilePlotter.generate_pulse_envelopes(
+        profile, [0, 1, 2, 3]
+    )
+
+    np.testing.assert_allclose(trigger_time, [0, 200, 220, 242])
+    np.testing.assert_array_equal(lower[0], [0, 0, 1, 0])
+    np.testing.assert_array_equal(upper[0], [0, 1, 1, 0])
+    np.testing.assert_array_equal(upper[3], [0, 0, 0, 0])
+
+
+def test_plotter_level_of_detail():
+    plotter = ProfilePlotter(large_profile(), max_edges=1000)
+    plotter.plot_pulses()
+
+    assert not plotter.detailed
+    assert len(plotter.lines[0].get_xdata()) == 4
+    assert plotter.envelopes[0].get_visible()
+
+    plotter.axes[0].set_xlim(100, 100.1)
+
+    assert plotter.detailed
+    assert 0 < len(plotter.lines[0].get_xdata()) <= 1000
+    assert not plotter.envelopes[0].get_visible()
+
+    plotter.on_close(None)
+
+
+def test_plotter_updates_lines_in_place(mixed_profile: Profile):
+    plotter = ProfilePlotter(mixed_profile)
+    plotter.plot_pulses()
+
+    fig, lines = plotter.fig, list(plotter.lines)
+
+    mixed_profile.groups[0].frames = 10
+    plotter.update_profile(mixed_profile)
+
+    assert plotter.fig is fig
+    assert plotter.lines == lines
+    assert [len(ax.lines) for ax in plotter.axes] == [1] * len(plotter.axes)
+    assert [len(ax.collections) for ax in plotter.axes] == [1] * len(plotter.axes)
+
+    trigger_time, signals = ProfilePlotter.generate_pulse_signals(
+        mixed_profile, plotter.pulses
+    )
+    np.testing.assert_allclose(lines[0].get_xdata(), trigger_time)
+    np.testing.assert_array_equal(lines[0].get_ydata(), signals[0])
+
+    plotter.on_close(None)
+
+
+def test_plotter_rebuilds_figure_when_active_pulses_change(mixed_profile: Profile):
+    plotter = ProfilePlotter(mixed_profile)
+    plotter.plot_pulses()
+
+    fig = plotter.fig
+    assert len(plotter.axes) == 4
+
+    for group in mixed_profile.groups:
+        group.wait_pulses[3] = 0
+        group.run_pulses[3] = 0
+
+    plotter.update_profile(mixed_profile)
+
+    assert plotter.fig is not fig
+    assert len(plotter.axes) == len(plotter.lines) == 3
+    assert plotter.pulse_names == ["Seq Pulse 0", "Seq Pulse 1", "Seq Pulse 2"]
+
+    plotter.on_close(None)
+
+
+def test_plotter_clears_pulses_when_none_are_active(mixed_profile: Profile):
+    plotter = ProfilePlotter(mixed_profile)
+    plotter.plot_pulses()
+
+    saved = [(list(g.wait_pulses), list(g.run_pulses)) for g in mixed_profile.groups]
+
+    for group in mixed_profile.groups:
+        group.wait_pulses = [0, 0, 0, 0]
+        group.run_pulses = [0, 0, 0, 0]
+
+    plotter.update_profile(mixed_profile)
+
+    assert plotter.pulses == []
+    assert all(len(line.get_xdata()) == 0 for line in plotter.lines)
+    assert not any(envelope.get_visible() for envelope in plotter.envelopes)
+
+    plotter.axes[0].set_xlim(0, 1)
+
+    for group, (wait_pulses, run_pulses) in zip(
+        mixed_profile.groups, saved, strict=True
+    ):
+        group.wait_pulses = wait_pulses
+        group.run_pulses = run_pulses
+
+    plotter.update_profile(mixed_profile)
+
+    assert plotter.pulses == [0, 1, 2, 3]
+    assert all(len(line.get_xdata()) > 0 for line in plotter.lines)
+
+    plotter.on_close(None)
+
+
+def test_plotter_blit(mixed_profile: Profile):
+    plotter = ProfilePlotter(mixed_profile)
+    plotter.plot_pulses()
+
+    assert plotter.blit == plotter.fig.canvas.supports_blit
+    assert all(line.get_animated() for line in plotter.lines) == plotter.blit
+
+    plotter.fig.canvas.draw()
+    assert (plotter.background is not None) == plotter.blit
+
+    mixed_profile.groups[1].frames = 4
+    plotter.update_profile(mixed_profile)
+
+    plotter.on_close(None)
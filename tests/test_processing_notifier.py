@@ -0,0 +1,205 @@
+from collections.abc import Callable
+from unittest.mock import MagicMock, Mock
+
+from saxs_bluesky.logging.bluesky_messenger import StompMessenger
+from saxs_bluesky.logging.processing_notifier import ProcessingNotifier, resource_path
+
+
+class RecordingMessenger:
+    def __init__(self):
+        self.sent: list[tuple[str, str]] = []
+
+    def send_start(self, path):
+        self.sent.append(("STARTED", path))
+
+    def send_update(self, path):
+        self.sent.append(("UPDATED", path))
+
+    def send_finished(self, path):
+        self.sent.append(("FINISHED", path))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeTimers:
+    """Records what the notifier schedules, fire runs the callbacks due"""
+
+    def __init__(self):
+        self.scheduled: list[tuple[float, Callable[[], None]]] = []
+
+    def __call__(self, delay: float, callback: Callable[[], None]) -> Mock:
+        self.scheduled.append((delay, callback))
+        return Mock()
+
+    def fire(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for _, callback in scheduled:
+            callback()
+
+
+def make_notifier(interval: float = 1.0, timers: FakeTimers | None = None):
+    messenger, clock = RecordingMessenger(), FakeClock()
+    notifier = ProcessingNotifier(
+        messenger, interval=interval, clock=clock, schedule=timers or FakeTimers()
+    )
+    return notifier, clock
+
+
+def test_updates_coalesced_per_path_within_interval():
+    notifier, clock = make_notifier()
+
+    notifier.start("a.h5")
+    for n in range(10):
+        clock.now = n * 0.05
+        notifier.update("a.h5")
+        notifier.update("b.h5")
+
+    assert notifier.messenger.sent == [  # type: ignore
+        ("STARTED", "a.h5"),
+        ("UPDATED", "a.h5"),
+        ("UPDATED", "b.h5"),
+    ]
+    assert notifier.counts["coalesced"] == 16
+
+    # the held back updates go when the interval is up
+    clock.now = 1.0
+    notifier.flush()
+    assert notifier.messenger.sent[-2:] == [  # type: ignore
+        ("UPDATED", "a.h5"),
+        ("UPDATED", "b.h5"),
+    ]
+    notifier.flush()
+    assert notifier.counts["updated"] == 4
+
+
+def test_update_sends_held_back_updates_of_other_paths():
+    notifier, clock = make_notifier()
+
+    notifier.update("a.h5")
+    notifier.update("a.h5")
+    clock.now = 1.5
+    notifier.update("b.h5")
+
+    assert notifier.messenger.sent == [  # type: ignore
+        ("UPDATED", "a.h5"),
+        ("UPDATED", "b.h5"),
+        ("UPDATED", "a.h5"),
+    ]
+
+
+def test_start_and_finished_always_sent_in_order():
+    notifier, clock = make_notifier(interval=10)
+
+    notifier.start("a.h5")
+    notifier.update("a.h5")
+    notifier.update("a.h5")
+    notifier.finished("a.h5")
+    notifier.start("a.h5")
+    notifier.update("a.h5")
+    notifier.finished("a.h5")
+
+    assert notifier.messenger.sent == [  # type: ignore
+        ("STARTED", "a.h5"),
+        ("UPDATED", "a.h5"),
+        ("FINISHED", "a.h5"),
+        ("STARTED", "a.h5"),
+        ("UPDATED", "a.h5"),
+        ("FINISHED", "a.h5"),
+    ]
+
+    notifier.flush(force=True)
+    assert len(notifier.messenger.sent) == 6  # type: ignore
+
+
+def test_notifier_follows_bluesky_documents():
+    notifier, clock = make_notifier()
+
+    notifier("start", {"uid": "run"})
+    for detector in ("saxs", "waxs"):
+        notifier(
+            "stream_resource",
+            {"uid": detector, "uri": f"file://localhost/data/{detector}.h5"},
+        )
+    for n in range(5):
+        clock.now = n * 0.3
+        notifier("stream_datum", {"stream_resource": "saxs"})
+    notifier("stream_datum", {"stream_resource": "unknown"})
+    notifier("stop", {"exit_status": "success"})
+
+    assert notifier.messenger.sent == [  # type: ignore
+        ("STARTED", "/data/saxs.h5"),
+        ("STARTED", "/data/waxs.h5"),
+        ("UPDATED", "/data/saxs.h5"),
+        ("UPDATED", "/data/saxs.h5"),
+        ("FINISHED", "/data/saxs.h5"),
+        ("FINISHED", "/data/waxs.h5"),
+    ]
+
+
+def test_held_back_update_sent_by_timer():
+    timers = FakeTimers()
+    notifier, clock = make_notifier(timers=timers)
+
+    notifier.update("a.h5")
+    clock.now = 0.25
+    notifier.update("a.h5")
+
+    [(delay, _)] = timers.scheduled
+    assert delay == 0.75
+    assert notifier.messenger.sent == [("UPDATED", "a.h5")]  # type: ignore
+
+    # no more updates come, the timer sends the one held back
+    clock.now = 1.0
+    timers.fire()
+    assert notifier.messenger.sent == [  # type: ignore
+        ("UPDATED", "a.h5"),
+        ("UPDATED", "a.h5"),
+    ]
+    assert timers.scheduled == []
+
+
+def test_timer_reschedules_if_fired_early():
+    timers = FakeTimers()
+    notifier, clock = make_notifier(timers=timers)
+
+    notifier.update("a.h5")
+    notifier.update("a.h5")
+
+    clock.now = 0.5
+    timers.fire()
+    assert len(notifier.messenger.sent) == 1  # type: ignore
+    [(delay, _)] = timers.scheduled
+    assert delay == 0.5
+
+
+def test_close_sends_held_back_updates():
+    notifier, clock = make_notifier()
+
+    notifier.update("a.h5")
+    notifier.update("a.h5")
+    notifier.close()
+
+    assert notifier.counts["updated"] == 2
+
+
+def test_resource_path():
+    assert resource_path("file://localhost/dls/i22/a.h5") == "/dls/i22/a.h5"
+    assert resource_path("/dls/i22/a.h5") == "/dls/i22/a.h5"
+
+
+def test_messenger_processing_notifier():
+    messenger = MagicMock()
+    notifier = StompMessenger.processing_notifier(messenger, interval=5)
+
+    notifier.start("a.h5")
+    notifier.update("a.h5")
+    notifier.update("a.h5")
+
+    messenger.send_start.assert_called_once_with("a.h5")
+    messenger.send_update.assert_called_once_with("a.h5")
@@ -0,0 +1,70 @@
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from saxs_bluesky.utils.profile_groups import ExperimentLoader
+from saxs_bluesky.utils.profile_renderer import render_experiment, render_profile
+
+SAXS_bluesky_ROOT = Path(__file__)
+
+yaml_dir = os.path.join(
+    SAXS_bluesky_ROOT.parent.parent, "src", "saxs_bluesky", "profile_yamls"
+)
+
+
+def loaded_modules() -> list[str]:
+    return list(sys.modules)
+
+
+@pytest.fixture
+def experiment() -> ExperimentLoader:
+    return ExperimentLoader.read_from_yaml(
+        os.path.join(yaml_dir, "i22_default_panda_config.yaml")
+    )
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_render_experiment_png(experiment: ExperimentLoader, tmp_path, max_workers):
+    # imported here, so render workers that import this module don't load it
+    import matplotlib.pyplot as plt
+
+    figures = plt.get_fignums()
+    paths = render_experiment(experiment, tmp_path, max_workers=max_workers)
+
+    assert paths == [tmp_path / f"profile_{n}.png" for n in range(len(paths))]
+    assert len(paths) == experiment.n_profiles
+
+    for path in paths:
+        with open(path, "rb") as file:
+            assert file.read(8) == b"\x89PNG\r\n\x1a\n"
+
+    # nothing drawn through pyplot
+    assert plt.get_fignums() == figures
+
+
+def test_render_profile_svg_envelopes(experiment: ExperimentLoader, tmp_path):
+    path = render_profile(experiment.profiles[0], tmp_path / "profile.svg", max_edges=0)
+
+    assert "<svg" in path.read_text()
+
+
+def test_render_profile_unknown_format(experiment: ExperimentLoader, tmp_path):
+    with pytest.raises(ValueError):
+        render_profile(experiment.profiles[0], tmp_path / "profile.jpg")
+
+
+def test_render_worker_does_not_import_pyplot(experiment: ExperimentLoader, tmp_path):
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        executor.submit(
+            render_profile, experiment.profiles[0], tmp_path / "profile.png"
+        ).result()
+        modules = executor.submit(loaded_modules).result()
+
+    assert "saxs_bluesky.utils.profile_renderer" in modules
+    assert "matplotlib.pyplot" not in modules
@@ -0,0 +1,171 @@
+from unittest.mock import Mock
+
+import pytest
+from blueapi.client.rest import BlueskyRemoteControlError
+
+from saxs_bluesky.utils.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def make_policy(clock: FakeClock, **kwargs) -> RetryPolicy:
+    return RetryPolicy(
+        (BlueskyRemoteControlError,), sleep=clock.sleep, clock=clock, **kwargs
+    )
+
+
+def failing(n_failures: int, result="ok") -> Mock:
+    return Mock(
+        side_effect=[BlueskyRemoteControlError(409, "busy")] * n_failures + [result]
+    )
+
+
+def test_retry_backoff_grows_exponentially(clock: FakeClock):
+    policy = make_policy(clock, base_delay=1, multiplier=2, jitter=0, deadline=None)
+
+    assert policy.call(failing(3)) == "ok"
+    # waits of 1, 2 and 4 seconds
+    assert clock.now == 7
+    assert policy.metrics.as_dict() == {
+        "calls": 1,
+        "attempts": 4,
+        "retries": 3,
+        "successes": 1,
+        "failures": 0,
+        "rejected": 0,
+        "circuit_opened": 0,
+    }
+
+
+def test_retry_jitter_and_max_delay(clock: FakeClock):
+    policy = make_policy(clock, base_delay=1, max_delay=3, jitter=0.5)
+
+    delays = [policy.backoff(retry) for retry in range(6) for _ in range(20)]
+
+    assert all(0.5 <= d <= 3 for d in delays)
+    assert all(d >= 1.5 for d in delays[-20:])
+    assert len(set(delays)) > 1
+
+
+def test_retry_gives_up_after_max_attempts(clock: FakeClock):
+    policy = make_policy(clock, max_attempts=3, jitter=0)
+    func = failing(5)
+
+    with pytest.raises(BlueskyRemoteControlError):
+        policy.call(func)
+
+    assert func.call_count == 3
+    assert policy.metrics.as_dict()["failures"] == 1
+
+
+def test_retry_stops_at_deadline(clock: FakeClock):
+    policy = make_policy(
+        clock, max_attempts=100, base_delay=1, multiplier=1, jitter=0, deadline=5.5
+    )
+    func = failing(100)
+
+    with pytest.raises(BlueskyRemoteControlError):
+        policy.call(func)
+
+    assert func.call_count == 6
+    assert clock.now <= 5.5
+
+
+def test_other_errors_are_not_retried(clock: FakeClock):
+    policy = make_policy(clock)
+    func = Mock(side_effect=ValueError("bad params"))
+
+    with pytest.raises(ValueError):
+        policy.call(func)
+
+    assert func.call_count == 1
+    assert policy.metrics.as_dict()["failures"] == 1
+
+
+def test_circuit_breaker_opens_and_recovers(clock: FakeClock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    policy = make_policy(clock, max_attempts=2, base_delay=1, jitter=0, breaker=breaker)
+
+    with pytest.raises(BlueskyRemoteControlError):
+        policy.call(failing(2))
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    with pytest.raises(BlueskyRemoteControlError):
+        policy.call(failing(2))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    func = failing(0)
+    with pytest.raises(CircuitOpenError):
+        policy.call(func)
+    func.assert_not_called()
+
+    clock.now += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert policy.call(func) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    metrics = policy.metrics.as_dict()
+    assert metrics["rejected"] == 1
+    assert metrics["circuit_opened"] == 1
+
+
+def test_failed_trial_reopens_circuit(clock: FakeClock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    policy = make_policy(clock, max_attempts=1, breaker=breaker)
+
+    with pytest.raises(BlueskyRemoteControlError):
+        policy.call(failing(1))
+
+    clock.now += 10
+    with pytest.raises(BlueskyRemoteControlError):
+        policy.call(failing(1))
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_circuit_lets_one_trial_through(clock: FakeClock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    policy = make_policy(clock, max_attempts=1, breaker=breaker)
+
+    with pytest.raises(BlueskyRemoteControlError):
+        policy.call(failing(1))
+    clock.now += 10
+
+    def trial():
+        # another caller while the trial is still in flight
+        with pytest.raises(CircuitOpenError):
+            policy.call(failing(0))
+        return "ok"
+
+    assert policy.call(trial) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert policy.metrics.as_dict()["rejected"] == 1
+
+
+def test_other_errors_end_the_trial(clock: FakeClock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    policy = make_policy(clock, max_attempts=1, breaker=breaker)
+
+    with pytest.raises(BlueskyRemoteControlError):
+        policy.call(failing(1))
+    clock.now += 10
+
+    with pytest.raises(ValueError):
+        policy.call(Mock(side_effect=ValueError("bad params")))
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert policy.call(failing(0)) == "ok"
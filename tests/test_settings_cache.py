@@ -0,0 +1,102 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+import yaml
+from bluesky import RunEngine
+from ophyd_async.core import YamlSettingsProvider
+from ophyd_async.fastcs.panda import HDFPanda
+
+from saxs_bluesky.stubs.panda_stubs import load_settings_to_panda, save_device_to_yaml
+from saxs_bluesky.utils.settings_cache import (
+    SETTINGS_CACHE,
+    CachedYamlSettingsProvider,
+    SettingsCache,
+)
+
+
+def write_settings(directory: Path, name: str, settings: dict):
+    with open(directory / f"{name}.yaml", "w") as file:
+        yaml.safe_dump(settings, file)
+
+
+async def test_cached_provider_parses_once(tmp_path: Path):
+    write_settings(tmp_path, "test", {"a": 1})
+    cache = SettingsCache()
+    provider = CachedYamlSettingsProvider(tmp_path, cache=cache)
+
+    with patch(
+        "saxs_bluesky.utils.settings_cache.YamlSettingsProvider.retrieve",
+        wraps=YamlSettingsProvider(tmp_path).retrieve,
+    ) as retrieve:
+        assert await provider.retrieve("test") == {"a": 1}
+        assert await provider.retrieve("test") == {"a": 1}
+
+    retrieve.assert_called_once()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+async def test_cached_provider_returns_copies(tmp_path: Path):
+    write_settings(tmp_path, "test", {"a": 1})
+    provider = CachedYamlSettingsProvider(tmp_path, cache=SettingsCache())
+
+    settings = await provider.retrieve("test")
+    settings["a"] = 2
+
+    assert await provider.retrieve("test") == {"a": 1}
+
+
+async def test_cached_provider_returns_deep_copies(tmp_path: Path):
+    write_settings(tmp_path, "test", {"table": {"repeats": [1, 2]}})
+    provider = CachedYamlSettingsProvider(tmp_path, cache=SettingsCache())
+
+    settings = await provider.retrieve("test")
+    settings["table"]["repeats"].append(3)
+
+    assert await provider.retrieve("test") == {"table": {"repeats": [1, 2]}}
+
+
+async def test_cached_provider_reloads_changed_file(tmp_path: Path):
+    cache = SettingsCache()
+    provider = CachedYamlSettingsProvider(tmp_path, cache=cache)
+
+    write_settings(tmp_path, "test", {"a": 1})
+    assert await provider.retrieve("test") == {"a": 1}
+
+    write_settings(tmp_path, "test", {"a": 22})
+    stat = os.stat(tmp_path / "test.yaml")
+    os.utime(tmp_path / "test.yaml", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert await provider.retrieve("test") == {"a": 22}
+    assert len(cache) == 1
+
+
+@pytest.mark.parametrize("maxsize", [1, 2])
+async def test_settings_cache_evicts_least_recently_used(tmp_path: Path, maxsize: int):
+    cache = SettingsCache(maxsize=maxsize)
+    provider = CachedYamlSettingsProvider(tmp_path, cache=cache)
+
+    for name in ["a", "b", "c"]:
+        write_settings(tmp_path, name, {name: 1})
+        await provider.retrieve(name)
+
+    assert len(cache) == maxsize
+    assert cache.get(SettingsCache.key(tmp_path / "c.yaml")) == {"c": 1}
+    assert cache.get(SettingsCache.key(tmp_path / "a.yaml")) is None
+
+
+def test_load_settings_to_panda_uses_cache(
+    run_engine: RunEngine, panda: HDFPanda, tmp_path: Path
+):
+    SETTINGS_CACHE.clear()
+
+    def save_load():
+        yield from save_device_to_yaml(str(tmp_path), "test", panda)
+        yield from load_settings_to_panda(str(tmp_path), "test", panda)
+        yield from load_settings_to_panda(str(tmp_path), "test", panda)
+
+    run_engine(save_load())
+
+    assert SETTINGS_CACHE.hits == 1
+    assert SETTINGS_CACHE.misses == 1
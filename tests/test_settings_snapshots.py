@@ -0,0 +1,129 @@
+from enum import StrEnum
+from pathlib import Path
+from unittest.mock import patch
+
+import bluesky.plan_stubs as bps
+import numpy as np
+import pytest
+from bluesky import RunEngine
+from ophyd_async.fastcs.panda import HDFPanda
+
+from saxs_bluesky.stubs.panda_stubs import snapshot_devices
+from saxs_bluesky.utils.settings_snapshots import (
+    DeltaSnapshotProvider,
+    apply_settings_delta,
+    diff_settings,
+    new_snapshot_id,
+    settings_to_plain,
+)
+from saxs_bluesky.utils.utils import snapshot_cli
+
+
+class Colour(StrEnum):
+    RED = "Red"
+
+
+def test_settings_to_plain():
+    plain = settings_to_plain(
+        {"a": np.array([1, 2]), "b": np.float64(1.5), "c": Colour.RED}
+    )
+
+    assert plain == {"a": [1, 2], "b": 1.5, "c": "Red"}
+    assert type(plain["b"]) is float
+
+
+def test_diff_and_apply_settings():
+    old = {"a": 1, "b": 2, "c": 3}
+    new = {"a": 1, "b": 20, "d": None}
+
+    delta = diff_settings(old, new)
+
+    assert delta == {"changed": {"b": 20, "d": None}, "removed": ["c"]}
+    assert apply_settings_delta(old, delta) == new
+
+
+def test_snapshot_provider_stores_deltas(tmp_path: Path):
+    first = DeltaSnapshotProvider(tmp_path, snapshot_id="2025-01-01T000000")
+    first.save("panda1", {"a": 1, "b": 2})
+
+    second = DeltaSnapshotProvider(tmp_path, snapshot_id="2025-01-02T000000")
+    second.save("panda1", {"a": 1, "b": 3})
+
+    record = second._read_record("panda1", "2025-01-02T000000")
+
+    assert record["parent"] == "2025-01-01T000000"
+    assert record["changed"] == {"b": 3}
+    assert second.load("panda1") == {"a": 1, "b": 3}
+    assert second.load("panda1", "2025-01-01T000000") == {"a": 1, "b": 2}
+
+
+def test_snapshot_provider_writes_keyframes(tmp_path: Path):
+    for day in range(1, 5):
+        provider = DeltaSnapshotProvider(
+            tmp_path, snapshot_id=f"2025-01-0{day}T000000", keyframe_interval=2
+        )
+        provider.save("panda1", {"a": day})
+
+    parents = [
+        provider._read_record("panda1", i)["parent"]
+        for i in provider.snapshot_ids("panda1")
+    ]
+
+    assert parents == [None, "2025-01-01T000000", None, "2025-01-03T000000"]
+    assert provider.load("panda1") == {"a": 4}
+
+
+def test_snapshot_provider_refuses_to_overwrite(tmp_path: Path):
+    provider = DeltaSnapshotProvider(tmp_path, snapshot_id="2025-01-01T000000")
+    provider.save("panda1", {"a": 1})
+
+    with pytest.raises(FileExistsError):
+        provider.save("panda1", {"a": 2})
+
+    assert provider.load("panda1") == {"a": 1}
+
+
+def test_new_snapshot_ids_are_unique_within_a_second():
+    ids = [new_snapshot_id() for _ in range(100)]
+
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+
+
+def test_snapshot_provider_load_without_snapshots(tmp_path: Path):
+    with pytest.raises(FileNotFoundError):
+        DeltaSnapshotProvider(tmp_path).load("panda1")
+
+
+def test_snapshot_devices(run_engine: RunEngine, panda: HDFPanda, tmp_path: Path):
+    provider = DeltaSnapshotProvider(tmp_path)
+
+    run_engine(
+        snapshot_devices(provider, {"panda1": panda}, ensure_devices_connected=False)
+    )
+
+    settings = provider.load("panda1")
+
+    assert "seq.1.table" in settings
+
+
+@patch(
+    "saxs_bluesky.stubs.panda_stubs.ensure_connected",
+    side_effect=lambda *devices: bps.null(),
+)
+def test_snapshot_cli(mock_ensure_connected, panda: HDFPanda, tmp_path: Path):
+    with patch(
+        "saxs_bluesky.stubs.panda_stubs.make_beamline_devices",
+        return_value={"panda1": panda},
+    ):
+        provider = snapshot_cli("i22", snapshot_dir=str(tmp_path))
+
+    mock_ensure_connected.assert_called_once_with(panda)
+    assert provider.snapshot_ids("panda1") == [provider.snapshot_id]
+
+    with pytest.raises(ValueError):
+        with patch(
+            "saxs_bluesky.stubs.panda_stubs.make_beamline_devices",
+            return_value={"panda1": panda},
+        ):
+            snapshot_cli("i22", detectors=["saxs"], snapshot_dir=str(tmp_path))
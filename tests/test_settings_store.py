@@ -0,0 +1,93 @@
+import os
+from pathlib import Path
+
+import pytest
+import yaml
+from bluesky import RunEngine
+from ophyd_async.fastcs.panda import HDFPanda
+from ophyd_async.plan_stubs import store_settings
+
+import saxs_bluesky
+from saxs_bluesky.stubs.panda_stubs import load_mode_to_panda
+from saxs_bluesky.utils.settings_store import SettingsStore, settings_digest
+
+PANDA_YAML_DIR = os.path.join(
+    os.path.dirname(saxs_bluesky.__file__), "ophyd_panda_yamls"
+)
+
+MODES = ["i22_panda1", "i22_PandaTrigger_panda1", "i22_TFG_Trigger_panda1"]
+
+
+@pytest.fixture
+def settings_store(tmp_path: Path) -> SettingsStore:
+    return SettingsStore.from_yaml_files(
+        tmp_path, {mode: os.path.join(PANDA_YAML_DIR, f"{mode}.yaml") for mode in MODES}
+    )
+
+
+def read_yaml(mode: str) -> dict:
+    with open(os.path.join(PANDA_YAML_DIR, f"{mode}.yaml")) as file:
+        return yaml.safe_load(file)
+
+
+def test_settings_store_shares_one_base(settings_store: SettingsStore):
+    assert len(settings_store.bases) == 1
+    assert len(list((settings_store.directory / "objects").iterdir())) == 1
+    assert settings_store.modes["i22_PandaTrigger_panda1"]["changed"] == {}
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_settings_store_resolves_modes(settings_store: SettingsStore, mode: str):
+    assert settings_store.resolve(mode) == read_yaml(mode)
+
+
+def test_settings_store_reloads_from_disk(settings_store: SettingsStore):
+    reloaded = SettingsStore(settings_store.directory)
+
+    assert reloaded.resolve("i22_TFG_Trigger_panda1") == read_yaml(
+        "i22_TFG_Trigger_panda1"
+    )
+
+
+def test_settings_store_diff(settings_store: SettingsStore):
+    delta = settings_store.diff("i22_panda1", "i22_TFG_Trigger_panda1")
+
+    assert "seq.1.table" in delta["changed"]
+    assert settings_store.diff("i22_panda1", "i22_PandaTrigger_panda1") == {
+        "changed": {},
+        "removed": [],
+    }
+
+
+def test_settings_store_picks_closest_base(settings_store: SettingsStore):
+    settings = read_yaml("i22_USAXS_panda1")
+    mode = settings_store.add_mode("usaxs", settings)
+
+    assert mode["base"] == settings_digest(read_yaml("i22_panda1"))
+    assert settings_store.resolve("usaxs") == settings
+
+
+def test_settings_store_export(settings_store: SettingsStore, tmp_path: Path):
+    export_dir = tmp_path / "export"
+    export_dir.mkdir()
+
+    settings_store.export("i22_TFG_Trigger_panda1", export_dir)
+
+    with open(export_dir / "i22_TFG_Trigger_panda1.yaml") as file:
+        assert yaml.safe_load(file) == read_yaml("i22_TFG_Trigger_panda1")
+
+
+def test_settings_store_missing_mode(settings_store: SettingsStore):
+    with pytest.raises(KeyError):
+        settings_store.resolve("not_a_mode")
+
+    settings_store.delete_mode("i22_panda1")
+    assert "i22_panda1" not in SettingsStore(settings_store.directory).modes
+
+
+def test_load_mode_to_panda(run_engine: RunEngine, panda: HDFPanda, tmp_path: Path):
+    def save_and_load():
+        yield from store_settings(SettingsStore(tmp_path), "panda", panda)
+        yield from load_mode_to_panda(str(tmp_path), "panda", panda)
+
+    run_engine(save_and_load())
@@ -0,0 +1,171 @@
+import json
+import time
+from collections.abc import Iterator
+
+import pytest
+from stomp.exception import ConnectFailedException
+
+from saxs_bluesky.logging.bluesky_messenger import CONNECT_ERRORS, StompMessenger
+from saxs_bluesky.testing.fake_stomp import (
+    FakeStompBroker,
+    Frame,
+    FrameParser,
+    encode_frame,
+)
+from saxs_bluesky.utils.retry import RetryPolicy
+
+TOPICS = ["/topic/public.worker.event", "/topic/gda.messages.scan"]
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+@pytest.fixture
+def broker() -> Iterator[FakeStompBroker]:
+    with FakeStompBroker(heartbeats=(50, 50)) as broker:
+        yield broker
+
+
+@pytest.fixture
+def messenger(broker: FakeStompBroker) -> Iterator[StompMessenger]:
+    messenger = StompMessenger(
+        host=broker.host,
+        port=broker.port,
+        destination=TOPICS,
+        heartbeats=(50, 50),
+        connect_timeout=0.5,
+        reconnect_policy=RetryPolicy(
+            max_attempts=100,
+            base_delay=0.01,
+            max_delay=0.1,
+            deadline=None,
+            retry_on=CONNECT_ERRORS,
+        ),
+    )
+    for topic in TOPICS:
+        assert broker.wait_for_subscribers(topic)
+
+    yield messenger
+
+    messenger.disconnect()
+
+
+def test_frame_round_trip():
+    frame = Frame("MESSAGE", {"destination": "/topic/a:b", "note": "x\ny"}, b"{}\x00")
+    parser = FrameParser()
+
+    data = b"\n\n" + encode_frame(frame) + b"\n" + encode_frame(Frame("RECEIPT", {}))
+    assert parser.feed(data[:10]) == []
+    message, receipt = parser.feed(data[10:])
+    assert parser.buffer == b""
+
+    # the body holds a null, so is read by its content-length
+    assert message.body == frame.body
+    assert message.headers == {**frame.headers, "content-length": "3"}
+    assert receipt == Frame("RECEIPT", {})
+
+
+def test_messenger_receives_and_sends_through_broker(
+    broker: FakeStompBroker, messenger: StompMessenger
+):
+    assert broker.publish(TOPICS[0], json.dumps({"n": 1})) == 1
+    assert wait_until(lambda: len(messenger.scan_listener) == 1)
+    assert messenger.get_received()[0].topic == TOPICS[0]
+
+    # messages sent are delivered to subscribers, including ourselves
+    messenger.conn.subscribe("/topic/gda.messages.processing", id=99)
+    assert broker.wait_for_subscribers("/topic/gda.messages.processing")
+    messenger.send_start("/data/a.h5")
+
+    assert wait_until(lambda: len(messenger.scan_listener) == 1)
+    assert messenger.get_message()["status"] == "STARTED"
+
+
+def test_messenger_reconnects_and_resubscribes_after_drop(
+    broker: FakeStompBroker, messenger: StompMessenger
+):
+    broker.drop_connections()
+
+    assert wait_until(lambda: messenger.reconnects == 1)
+    for topic in TOPICS:
+        assert broker.wait_for_subscribers(topic)
+
+    broker.publish(TOPICS[1], json.dumps({"n": 2}))
+    assert wait_until(lambda: len(messenger.scan_listener) == 1)
+
+
+def test_messenger_reconnects_after_broker_restart(
+    broker: FakeStompBroker, messenger: StompMessenger
+):
+    broker.restart(downtime=0.2)
+
+    assert wait_until(lambda: messenger.reconnects == 1)
+    assert broker.wait_for_subscribers(TOPICS[0])
+    assert messenger.reconnect_policy.metrics.as_dict()["retries"] >= 1
+
+
+def test_messenger_detects_hung_broker_by_heartbeat(
+    broker: FakeStompBroker, messenger: StompMessenger
+):
+    broker.freeze()
+    assert wait_until(lambda: not messenger.connected.is_set(), timeout=2)
+
+    # reconnecting to a hung broker times out rather than blocking
+    assert wait_until(
+        lambda: messenger.reconnect_policy.metrics.as_dict()["retries"] >= 1
+    )
+
+    broker.freeze(False)
+    assert wait_until(lambda: messenger.reconnects == 1)
+    assert broker.wait_for_subscribers(TOPICS[0])
+
+
+def test_messenger_does_not_reconnect_after_disconnect(broker: FakeStompBroker):
+    messenger = StompMessenger(
+        host=broker.host, port=broker.port, destination=TOPICS, heartbeats=(50, 50)
+    )
+    assert broker.wait_for_subscribers(TOPICS[0])
+
+    messenger.disconnect()
+    assert wait_until(lambda: broker.subscribers(TOPICS[0]) == 0)
+    time.sleep(0.2)
+
+    assert broker.subscribers(TOPICS[0]) == 0
+    assert messenger.reconnects == 0
+
+
+def test_connect_times_out_without_reply(broker: FakeStompBroker):
+    broker.freeze()
+    with pytest.raises(ConnectFailedException):
+        StompMessenger(
+            host=broker.host,
+            port=broker.port,
+            destination=TOPICS,
+            connect_timeout=0.1,
+            reconnect=False,
+        )
+
+
+def test_broker_checks_credentials():
+    with FakeStompBroker(username="user", password="pass") as broker:
+        with pytest.raises(ConnectFailedException):
+            StompMessenger(
+                host=broker.host,
+                port=broker.port,
+                username="user",
+                password="wrong",
+                connect_timeout=0.2,
+                reconnect=False,
+            )
+
+        messenger = StompMessenger(
+            host=broker.host, port=broker.port, username="user", password="pass"
+        )
+        assert messenger.connected.is_set()
+        messenger.disconnect()
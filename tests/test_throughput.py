@@ -0,0 +1,77 @@
+import pytest
+from blueapi.core import DataEvent
+from blueapi.worker import ProgressEvent
+from blueapi.worker.event import StatusView
+
+from saxs_bluesky.utils.throughput import ThroughputMonitor, ThroughputSample
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def event_doc(doc_time: float) -> DataEvent:
+    return DataEvent(name="event", doc={"time": doc_time}, task_id="task")
+
+
+def progress(**status) -> ProgressEvent:
+    return ProgressEvent(
+        task_id="task", statuses={"saxs": StatusView(display_name="saxs", **status)}
+    )
+
+
+def test_throughput_fps_and_latency():
+    clock = FakeClock()
+    monitor = ThroughputMonitor(window=5, clock=clock)
+    samples: list[ThroughputSample] = []
+    monitor.add_callback(samples.append)
+
+    monitor(DataEvent(name="start", doc={}, task_id="task"))
+    for _ in range(11):
+        monitor(event_doc(clock.now - 0.25))
+        clock.now += 0.1
+
+    assert monitor.frames == 11
+    assert samples[-1].fps == pytest.approx(10)
+    assert samples[-1].latency == pytest.approx(0.25)
+    assert list(monitor.series) == samples
+    assert monitor.latest is samples[-1]
+
+
+def test_throughput_fps_window_slides():
+    clock = FakeClock()
+    monitor = ThroughputMonitor(window=1, clock=clock)
+
+    for _ in range(5):
+        monitor(event_doc(clock.now))
+        clock.now += 0.1
+
+    clock.now += 10
+    assert monitor.fps() == 0
+
+
+def test_throughput_eta_from_progress():
+    clock = FakeClock()
+    monitor = ThroughputMonitor(clock=clock)
+
+    monitor(progress(time_remaining=12.0, percentage=0.5))
+    assert monitor.latest is not None
+    assert monitor.latest.eta == 12
+
+    monitor(progress(time_elapsed=10.0, percentage=0.25))
+    assert monitor.latest.eta == pytest.approx(30)
+
+
+def test_throughput_resets_on_new_run():
+    monitor = ThroughputMonitor(clock=FakeClock())
+
+    monitor(event_doc(0))
+    monitor(DataEvent(name="start", doc={}, task_id="task"))
+
+    assert monitor.frames == 0
+    assert monitor.latency is None
+    assert len(monitor.series) == 1
@@ -0,0 +1,124 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from saxs_bluesky.utils.plotter import ProfilePlotter
+from saxs_bluesky.utils.profile_groups import ExperimentLoader, Group, Profile
+from saxs_bluesky.utils.timeline import Timeline
+
+SAXS_bluesky_ROOT = Path(__file__)
+
+yaml_dir = os.path.join(
+    SAXS_bluesky_ROOT.parent.parent, "src", "saxs_bluesky", "profile_yamls"
+)
+
+
+def make_profile(repeats: int, frames: list[int], pulse: int) -> Profile:
+    profile = Profile(repeats=repeats)
+
+    for n_frames in frames:
+        run_pulses = [0, 0, 0, 0]
+        run_pulses[pulse] = 1
+        profile.append_group(
+            Group(
+                frames=n_frames,
+                trigger="IMMEDIATE",
+                wait_time=1,
+                wait_units="S",
+                run_time=1,
+                run_units="S",
+                wait_pulses=[0, 0, 0, 0],
+                run_pulses=run_pulses,
+            )
+        )
+
+    return profile
+
+
+@pytest.fixture
+def experiment() -> ExperimentLoader:
+    return ExperimentLoader(
+        profiles=[
+            make_profile(repeats=3, frames=[2, 1], pulse=0),
+            make_profile(repeats=1_000_000, frames=[5], pulse=2),
+        ],
+        instrument="i22",
+        detectors=[],
+    )
+
+
+def test_timeline_segments(experiment: ExperimentLoader):
+    timeline = Timeline.from_experiment(experiment)
+
+    assert timeline.n_segments == 3 * 2 + 1_000_000
+    np.testing.assert_array_equal(timeline.repeat_index[:6], [0, 0, 1, 1, 2, 2])
+    np.testing.assert_array_equal(timeline.group_index[:6], [0, 1, 0, 1, 0, 1])
+    np.testing.assert_array_equal(timeline.starts[:7], [0, 4, 6, 10, 12, 16, 18])
+    assert timeline.active_pulses == [1, 3]
+
+
+def test_timeline_summary(experiment: ExperimentLoader):
+    summary = Timeline.from_experiment(experiment).summary()
+
+    assert summary["total_frames"] == 3 * 3 + 5_000_000
+    assert summary["total_time"] == pytest.approx(18 + 10_000_000)
+    assert summary["profiles"] == [
+        {"total_time": 18, "total_frames": 9},
+        {"total_time": 10_000_000, "total_frames": 5_000_000},
+    ]
+
+    for profile, profile_summary in zip(
+        experiment.profiles, summary["profiles"], strict=True
+    ):
+        assert profile_summary["total_time"] == pytest.approx(profile.duration)
+
+
+def test_timeline_without_repeats_matches_plotter():
+    profile = make_profile(repeats=4, frames=[3, 2], pulse=1)
+    timeline = Timeline.from_profile(profile, repeats=False)
+
+    trigger_time, signals = timeline.signals([0, 1])
+    expected_time, expected_signals = ProfilePlotter.generate_pulse_signals(
+        profile, [0, 1]
+    )
+
+    np.testing.assert_array_equal(trigger_time, expected_time)
+    np.testing.assert_array_equal(signals, expected_signals)
+    assert timeline.total_frames == profile.total_frames
+
+
+def test_timeline_signals_in_range_across_profiles(experiment: ExperimentLoader):
+    timeline = Timeline.from_experiment(experiment)
+
+    # last frame of the first profile and first frame of the second
+    trigger_time, signals = timeline.signals_in_range([0, 2], 16.5, 19.5)
+
+    np.testing.assert_array_equal(trigger_time, [16, 17, 18, 19, 20])
+    np.testing.assert_array_equal(signals, [[0, 0, 1, 0, 0], [0, 0, 0, 0, 1]])
+
+
+def test_plotter_from_experiment(experiment: ExperimentLoader):
+    plotter = ProfilePlotter.from_experiment(experiment, max_edges=1000)
+    plotter.plot_pulses()
+
+    assert len(plotter.axes) == 2
+    assert not plotter.detailed
+    assert plotter.axes[0].get_xlim()[1] > plotter.timeline.total_time
+
+    plotter.on_close(None)
+
+
+def test_experiment_yaml_timeline():
+    experiment = ExperimentLoader.read_from_yaml(
+        os.path.join(yaml_dir, "i22_default_panda_config.yaml")
+    )
+    summary = Timeline.from_experiment(experiment).summary()
+
+    assert summary["total_frames"] == sum(
+        p.total_frames * p.repeats for p in experiment.profiles
+    )
+    assert summary["total_time"] == pytest.approx(
+        sum(p.duration for p in experiment.profiles)
+    )
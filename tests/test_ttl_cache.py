@@ -0,0 +1,62 @@
+from unittest.mock import Mock
+
+from saxs_bluesky.utils.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_entries_expire():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+
+    cache.put("plans", ["count"])
+    clock.now = 9.9
+    assert cache.get("plans") == ["count"]
+
+    clock.now = 10
+    assert cache.get("plans") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(cache) == 0
+
+
+def test_ttl_cache_get_or_load_only_loads_on_a_miss():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    load = Mock(return_value=["saxs"])
+
+    for _ in range(3):
+        assert cache.get_or_load("devices", load) == ["saxs"]
+    load.assert_called_once()
+
+    clock.now = 20
+    cache.get_or_load("devices", load)
+    assert load.call_count == 2
+
+
+def test_ttl_cache_invalidate():
+    cache = TTLCache()
+    cache.put("plans", ["count"])
+    cache.put("devices", ["saxs"])
+
+    cache.invalidate("plans")
+    assert cache.get("plans") is None
+    assert cache.get("devices") == ["saxs"]
+
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_ttl_cache_zero_ttl_disables_caching():
+    cache = TTLCache(ttl=0)
+    load = Mock(return_value=["count"])
+
+    cache.get_or_load("plans", load)
+    cache.get_or_load("plans", load)
+
+    assert load.call_count == 2
@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 from unittest.mock import patch
 
 import pytest
@@ -99,8 +100,14 @@ def test_authenticate():
     ),
 )
 async def test_save_panda_cli(
-    beamline: str | None, panda_name: str | None, yaml_name: str | None, panda: HDFPanda
+    beamline: str | None,
+    panda_name: str | None,
+    yaml_name: str | None,
+    panda: HDFPanda,
+    tmp_path: Path,
 ):
     with patch("saxs_bluesky.utils.utils.return_connected_device", return_value=panda):
         with patch("saxs_bluesky.utils.utils.input", return_value="test"):
-            save_panda_cli(beamline, panda_name, yaml_name)
+            save_panda_cli(beamline, panda_name, yaml_name, yaml_dir=str(tmp_path))
+
+    assert len(list(tmp_path.glob("*.yaml"))) == 1
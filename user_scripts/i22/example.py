@@ -72,9 +72,11 @@ ys = np.arange(-9.5, -10, -0.1)  # [-9.5 -9.6 -9.7 -9.8 -9.9]
 
 print(xs, ys)
 
-for x, y in zip(xs, ys, strict=True):
-    CLIENT.run(move, moves={"base.x": x, "base.y": y})  # move base to x, y
-    CLIENT.run(sleep, time=1)  # sleep for 1 second
+# sent to BlueAPI as one task when the with block ends, rather than one per plan
+with CLIENT.batch() as batch:
+    for x, y in zip(xs, ys, strict=True):
+        batch.run(move, moves={"base.x": x, "base.y": y})  # move base to x, y
+        batch.run(sleep, time=1)  # sleep for 1 second
 
 
 CLIENT.run(move, moves={"base.x": 0})  # move base.x to 0